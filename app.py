@@ -1,16 +1,45 @@
 # app.py — Slack bot for AppGrowth (Working version - Multiple segments only)
 import os
 import re
+import hmac
+import itertools
+import json
 import logging
+import tempfile
 import threading
 import time
 from dotenv import load_dotenv
 from flask import Flask, request
 from slack_bolt import App
 from slack_bolt.adapter.flask import SlackRequestHandler
+from slack_sdk import WebClient
+
+import requests
 
 import appgrowth
+import metrics
+import shared_state
+from batch_schedule import WINDOWS, parse_run_at, slack_time
+from campaign_watch import start_campaign_watcher
 from countries import POPULAR_COUNTRIES, ALL_VALID_COUNTRY_CODES
+from introspection import WATCH, count_instances, thread_summary
+from known_apps import KNOWN_APPS
+from segment_catalog import CATALOG
+from segment_plan import SEGMENT_TYPES, iter_segment_plan
+from segment_stats import format_stats
+from batch import cancel_job, format_job_line, get_job, list_jobs, pause_job, start_workers, submit_segment_batch
+from bulk_upload import (
+    UploadSummary, format_upload_confirmation, has_upload_header, is_batch_upload, is_direct_message,
+    iter_slack_file_lines, iter_upload_tasks, scan_upload,
+)
+from metrics import timed_ack
+from profiler import MAX_PROFILE_SECONDS, ProfileBusyError, record_profile
+from results import results_path
+from segment_ops import (
+    OPERATIONS, BulkReport, EditPlan, SegmentSelector, describe_change, normalize_option, run_bulk, select_segments
+)
+from shutdown import SHUTDOWN
+from task_queue import DONE
 
 # Logging setup
 logging.basicConfig(
@@ -23,6 +52,16 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET")
+# Optional Slack Web API override (stub server for local load tests)
+SLACK_API_URL = os.getenv("SLACK_API_URL")
+# Slack user IDs allowed to control other people's jobs (comma-separated)
+ADMIN_USER_IDS = {u.strip() for u in os.getenv("ADMIN_USER_IDS", "").split(",") if u.strip()}
+# Bearer token for the /admin introspection endpoint (endpoint disabled when unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Bulk rebuild/delete: segment names shown in a dry run, progress message interval
+BULK_PREVIEW_LIMIT = 20
+BULK_PROGRESS_EVERY = 50
 
 # Check tokens
 if not SLACK_BOT_TOKEN or not SLACK_SIGNING_SECRET:
@@ -33,16 +72,9 @@ logger.info(f"🔑 Token: {SLACK_BOT_TOKEN[:10]}... Secret: {SLACK_SIGNING_SECRE
 
 # Countries imported from countries.py
 
-# Segment types - only 5 options
-SEGMENT_TYPES = [
-    {"text": {"type": "plain_text", "text": "⏱️ Retained 1 day"}, "value": "RetainedAtLeast_1"},
-    {"text": {"type": "plain_text", "text": "⏱️ Retained 7 days"}, "value": "RetainedAtLeast_7"},
-    {"text": {"type": "plain_text", "text": "⏱️ Retained 30 days"}, "value": "RetainedAtLeast_30"},
-    {"text": {"type": "plain_text", "text": "👥 Active Users 80%"}, "value": "ActiveUsers_0.80"},
-    {"text": {"type": "plain_text", "text": "👥 Active Users 95%"}, "value": "ActiveUsers_0.95"}
-]
-
 # Simple auth
+# Each worker process has its own appgrowth.SESSION, so this flag is per process;
+# it is also published to shared_state so any worker can report on all of them.
 auth_logged_in = False
 
 def try_login():
@@ -50,11 +82,42 @@ def try_login():
     try:
         auth_logged_in = appgrowth.login()
         logger.info(f"🔐 Login result: {auth_logged_in}")
-        return auth_logged_in
     except Exception as e:
         logger.error(f"❌ Login error: {e}")
         auth_logged_in = False
-        return False
+    publish_worker_status()
+    return auth_logged_in
+
+def publish_worker_status():
+    try:
+        accounts = appgrowth.POOL.status()
+        shared_state.report_worker(
+            auth=auth_logged_in,
+            accounts_healthy=sum(1 for a in accounts if a["healthy"] and a["logged_in"]),
+            accounts_total=len(accounts),
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not publish worker status: {e}")
+
+def auth_status_summary():
+    """(connected_workers, total_workers) across all worker processes on this machine"""
+    try:
+        statuses = shared_state.workers()
+    except Exception:
+        statuses = {}
+    if not statuses:
+        return int(auth_logged_in), 1
+    return sum(1 for st in statuses.values() if st.get("auth")), len(statuses)
+
+_login_lock = threading.Lock()
+
+def ensure_login():
+    """Log in on demand; True when the AppGrowth session is usable"""
+    if not auth_logged_in:
+        with _login_lock:
+            if not auth_logged_in:
+                try_login()
+    return auth_logged_in
 
 def parse_bulk_countries(bulk_text):
     """
@@ -109,39 +172,588 @@ def parse_bulk_bundle_ids(bulk_text):
 
     return result
 
-def generate_segment_name(app_id, country, seg_type, value):
-    """Generate segment name with UPPERCASE country code"""
-    if seg_type == "RetainedAtLeast":
-        code = str(int(value)) + "d"
-    else:  # ActiveUsers
-        if isinstance(value, str):
-            value = float(value)
-        code = str(int(value * 100))
+def extract_modal_inputs(values):
+    """
+    Read the multiple segments modal state (view.state.values).
+
+    Returns:
+        dict: bundle_ids, countries_dropdown, countries_bulk_valid, countries_bulk_invalid,
+              countries (merged), all_segments_checked, segment_types, plan_only,
+              run_mode ("now" / "offpeak" / "at"), run_at_picked (epoch seconds or None), allow_new_apps
+    """
+    # Get bundle IDs from input (now supports multiple)
+    app_id_data = values.get("app_id_block", {}).get("app_id_input", {})
+    app_id_text = app_id_data.get("value", "").strip() if app_id_data.get("value") else ""
+    bundle_ids = parse_bulk_bundle_ids(app_id_text)
+
+    # Apps AppGrowth has no segments or campaigns for are rejected unless this is ticked
+    allow_new_data = values.get("allow_new_apps_block", {}).get("allow_new_apps_input", {})
+    allow_new_apps = len(allow_new_data.get("selected_options", [])) > 0
+
+    # Get countries from dropdown
+    countries_data = values.get("countries_block", {}).get("countries_input", {})
+    countries_dropdown = [opt["value"] for opt in countries_data.get("selected_options", [])]
+
+    # Get countries from bulk text
+    bulk_data = values.get("bulk_countries_block", {}).get("bulk_countries_input", {})
+    bulk_text = bulk_data.get("value", "") if bulk_data.get("value") else ""
+    countries_bulk_valid, countries_bulk_invalid = parse_bulk_countries(bulk_text)
+
+    # Merge and deduplicate countries
+    countries = list(set(countries_dropdown + countries_bulk_valid))
+
+    # Check if "ALL segments" checkbox is selected
+    all_segments_data = values.get("all_segments_block", {}).get("all_segments_input", {})
+    all_segments_checked = len(all_segments_data.get("selected_options", [])) > 0
+
+    # Get manually selected segment types
+    segment_types_data = values.get("segment_types_block", {}).get("segment_types_input", {})
+    segment_types_manual = [opt["value"] for opt in segment_types_data.get("selected_options", [])]
+
+    # If "ALL" is checked, use all 5 segment types
+    if all_segments_checked:
+        segment_types = [seg["value"] for seg in SEGMENT_TYPES]
+    else:
+        segment_types = segment_types_manual
+
+    # "Plan only": diff against existing segments, create nothing
+    plan_only_data = values.get("plan_only_block", {}).get("plan_only_input", {})
+    plan_only = len(plan_only_data.get("selected_options", [])) > 0
 
-    # Make country uppercase, keep app_id as is, code lowercase
-    country = country.upper()
-    # app_id keeps original case - removed .lower()
-    code = code.lower()
+    # When to run: now, next off-peak window or a picked date/time
+    run_mode_data = values.get("run_when_block", {}).get("run_when_input", {})
+    run_mode = (run_mode_data.get("selected_option") or {}).get("value", "now")
+    run_at_data = values.get("run_at_block", {}).get("run_at_input", {})
+    run_at_picked = run_at_data.get("selected_date_time")
+
+    return {
+        "bundle_ids": bundle_ids,
+        "countries_dropdown": countries_dropdown,
+        "countries_bulk_valid": countries_bulk_valid,
+        "countries_bulk_invalid": countries_bulk_invalid,
+        "countries": countries,
+        "all_segments_checked": all_segments_checked,
+        "segment_types": segment_types,
+        "plan_only": plan_only,
+        "run_mode": run_mode,
+        "run_at_picked": run_at_picked,
+        "allow_new_apps": allow_new_apps,
+    }
+
+def format_plan_preview(inputs):
+    """Build the live preview text for the modal from the cached segment index"""
+    bundle_ids = inputs["bundle_ids"]
+    countries = inputs["countries"]
+    segment_types = inputs["segment_types"]
+    total = len(bundle_ids) * len(countries) * len(segment_types)
+
+    if not total:
+        return "🧮 *Preview:* fill in apps, countries and types to see the plan"
+
+    text = f"🧮 *Preview:* {total} segments (📱 {len(bundle_ids)} × 🌍 {len(countries)} × 📊 {len(segment_types)})"
+    if CATALOG.loaded:
+        existing = CATALOG.count_existing(bundle_ids, countries, segment_types)
+        age_min = int((time.time() - CATALOG.updated_at) / 60)
+        text += f"\n♻️ Already exist: {existing} → {total - existing} new (index updated {age_min} min ago)"
+    else:
+        text += "\n♻️ Already exist: unknown (segment index is still loading)"
+    unknown = KNOWN_APPS.unknown(bundle_ids)
+    if unknown and not inputs["allow_new_apps"]:
+        text += f"\n⚠️ Unknown app IDs: {', '.join(unknown[:10])}" + (f" and {len(unknown) - 10} more" if len(unknown) > 10 else "")
+    if inputs["countries_bulk_invalid"]:
+        text += f"\n⚠️ Ignored invalid country codes: {', '.join(inputs['countries_bulk_invalid'][:10])}"
+    return text
+
+RUN_WHEN_OPTIONS = [
+    {"text": {"type": "plain_text", "text": "Run now"}, "value": "now"},
+    {"text": {"type": "plain_text", "text": "Next off-peak window"}, "value": "offpeak"},
+    {"text": {"type": "plain_text", "text": "At a specific time"}, "value": "at"},
+]
 
-    return f"bloom_{app_id}_{country}_{code}"
+def build_multiple_segments_modal(channel_id, preview_text=None):
+    """Multiple segments modal view; input blocks dispatch actions for the live preview"""
+    return {
+        "type": "modal",
+        "callback_id": "create_multiple_segments_modal",
+        "title": {"type": "plain_text", "text": "📊 Multiple Segments"},
+        "submit": {"type": "plain_text", "text": "Create All"},
+        "close": {"type": "plain_text", "text": "Cancel"},
+        "private_metadata": channel_id,
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "*🚀 Bulk Segment Creation*\nCreate multiple segments for one or more apps across different countries and types:"
+                }
+            },
+            {"type": "divider"},
+            {
+                "type": "input",
+                "block_id": "app_id_block",
+                "dispatch_action": True,
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "app_id_input",
+                    "multiline": True,
+                    "dispatch_action_config": {"trigger_actions_on": ["on_character_entered"]},
+                    "placeholder": {"type": "plain_text", "text": "com.easybrain.number.puzzle.game\ncom.example.another.app"}
+                },
+                "label": {"type": "plain_text", "text": "📱 App ID (Bundle ID)"},
+                "hint": {"type": "plain_text", "text": "Enter one or more Bundle IDs: one per line, with spaces, or with commas"}
+            },
+            {
+                "type": "input",
+                "block_id": "allow_new_apps_block",
+                "optional": True,
+                "dispatch_action": True,
+                "element": {
+                    "type": "checkboxes",
+                    "action_id": "allow_new_apps_input",
+                    "options": [
+                        {
+                            "text": {"type": "plain_text", "text": "Allow apps AppGrowth doesn't know yet"},
+                            "value": "allow_new_apps"
+                        }
+                    ]
+                },
+                "label": {"type": "plain_text", "text": "🆕 New Apps"},
+                "hint": {"type": "plain_text", "text": "IDs not found in existing segments or campaigns are rejected as likely typos"}
+            },
+            {
+                "type": "section",
+                "text": {"type": "mrkdwn", "text": "*🌍 Countries*"}
+            },
+            {
+                "type": "input",
+                "block_id": "countries_block",
+                "optional": True,
+                "dispatch_action": True,
+                "element": {
+                    "type": "multi_static_select",
+                    "action_id": "countries_input",
+                    "placeholder": {"type": "plain_text", "text": "Select countries"},
+                    "options": POPULAR_COUNTRIES,
+                    "max_selected_items": 20
+                },
+                "label": {"type": "plain_text", "text": "Dropdown"},
+                "hint": {"type": "plain_text", "text": "Select multiple countries from list"}
+            },
+            {
+                "type": "input",
+                "block_id": "bulk_countries_block",
+                "optional": True,
+                "dispatch_action": True,
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "bulk_countries_input",
+                    "multiline": True,
+                    "dispatch_action_config": {"trigger_actions_on": ["on_character_entered"]},
+                    "placeholder": {"type": "plain_text", "text": "ARE ZAF ISR or ARE, ZAF, ISR"}
+                },
+                "label": {"type": "plain_text", "text": "Bulk Text"},
+                "hint": {"type": "plain_text", "text": "Paste country codes: one per line, with spaces, or with commas"}
+            },
+            {
+                "type": "section",
+                "text": {"type": "mrkdwn", "text": "*📊 Segment Types*"}
+            },
+            {
+                "type": "input",
+                "block_id": "all_segments_block",
+                "dispatch_action": True,
+                "element": {
+                    "type": "checkboxes",
+                    "action_id": "all_segments_input",
+                    "options": [
+                        {
+                            "text": {"type": "plain_text", "text": "All"},
+                            "value": "all_segments"
+                        }
+                    ],
+                    "initial_options": [
+                        {
+                            "text": {"type": "plain_text", "text": "All"},
+                            "value": "all_segments"
+                        }
+                    ]
+                },
+                "label": {"type": "plain_text", "text": "All Types"},
+                "hint": {"type": "plain_text", "text": "Uncheck to manually select specific types"}
+            },
+            {
+                "type": "input",
+                "block_id": "segment_types_block",
+                "optional": True,
+                "dispatch_action": True,
+                "element": {
+                    "type": "multi_static_select",
+                    "action_id": "segment_types_input",
+                    "placeholder": {"type": "plain_text", "text": "Select specific segment types"},
+                    "options": SEGMENT_TYPES,
+                    "max_selected_items": 5
+                },
+                "label": {"type": "plain_text", "text": "Manual Selection"},
+                "hint": {"type": "plain_text", "text": "Only used when 'All' is unchecked above"}
+            },
+            {
+                "type": "input",
+                "block_id": "plan_only_block",
+                "optional": True,
+                "element": {
+                    "type": "checkboxes",
+                    "action_id": "plan_only_input",
+                    "options": [
+                        {
+                            "text": {"type": "plain_text", "text": "Plan only (don't create anything)"},
+                            "value": "plan_only"
+                        }
+                    ]
+                },
+                "label": {"type": "plain_text", "text": "🧪 Dry Run"},
+                "hint": {"type": "plain_text", "text": "Compare the plan with existing segments: new / already exist / conflicting options"}
+            },
+            {
+                "type": "input",
+                "block_id": "run_when_block",
+                "element": {
+                    "type": "radio_buttons",
+                    "action_id": "run_when_input",
+                    "options": RUN_WHEN_OPTIONS,
+                    "initial_option": RUN_WHEN_OPTIONS[0]
+                },
+                "label": {"type": "plain_text", "text": "🗓️ When"},
+                "hint": {"type": "plain_text", "text": f"Off-peak: {WINDOWS.describe()}; batches run faster then"}
+            },
+            {
+                "type": "input",
+                "block_id": "run_at_block",
+                "optional": True,
+                "element": {
+                    "type": "datetimepicker",
+                    "action_id": "run_at_input"
+                },
+                "label": {"type": "plain_text", "text": "Start At"},
+                "hint": {"type": "plain_text", "text": "Only used with 'At a specific time'"}
+            },
+            {"type": "divider"},
+            {
+                "type": "context",
+                "block_id": "preview_block",
+                "elements": [
+                    {"type": "mrkdwn", "text": preview_text or "🧮 *Preview:* fill in apps, countries and types to see the plan"}
+                ]
+            }
+        ]
+    }
 
 # Initialize Bolt app
 logger.info("🚀 Initializing Slack Bolt app...")
 bolt_app = App(
-    token=SLACK_BOT_TOKEN,
     signing_secret=SLACK_SIGNING_SECRET,
+    client=WebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL or WebClient.BASE_URL),
     process_before_response=True,  # Critical for avoiding timeouts
     logger=logger
 )
 logger.info("✅ Bolt app initialized with process_before_response=True")
 
-@bolt_app.command("/appgrowth")
-def handle_appgrowth_command(ack, respond, command):
-    ack()
-    
+# Ack-first listeners: the ack path only validates, everything that talks to
+# Slack or AppGrowth runs afterwards as a Bolt lazy listener.
+def ack_only(handler):
+    @timed_ack(handler)
+    def ack_listener(ack):
+        ack()
+    return ack_listener
+
+def respond_text(respond, text):
+    respond(blocks=[{"type": "section", "text": {"type": "mrkdwn", "text": text}}])
+
+def handle_jobs_command(respond):
+    jobs = list_jobs()
+    if not jobs:
+        respond_text(respond, "📭 No running or recent jobs")
+        return
+    lines = [format_job_line(job) for job in jobs[:15]]
+    if len(jobs) > 15:
+        lines.append(f"... and {len(jobs) - 15} more")
+    respond_text(
+        respond,
+        "📋 *Jobs (running and last 24h)*\n" + "\n".join(lines)
+        + "\n\n💡 `/appgrowth pause <id>`, `/appgrowth resume <id>`, `/appgrowth cancel <id>`"
+    )
+
+def find_own_job(respond, command, action, job_id):
+    """The job if the caller owns it (or is an admin); otherwise explain why and return None"""
+    if not job_id:
+        respond_text(respond, f"❌ Usage: `/appgrowth {action} <job id>` (see `/appgrowth jobs`)")
+        return None
+    job = get_job(job_id)
+    if job is None:
+        respond_text(respond, f"❌ Job `{job_id}` not found")
+        return None
+    user_id = command.get("user_id")
+    if job["user"] != user_id and user_id not in ADMIN_USER_IDS:
+        respond_text(respond, f"⛔ Job `{job_id}` belongs to <@{job['user']}>")
+        return None
+    return job
+
+def handle_job_control(respond, command, client, action, job_id):
+    """pause / resume / cancel a job (its owner or an admin)"""
+    if find_own_job(respond, command, action, job_id) is None:
+        return
+    user_id = command.get("user_id")
+
+    logger.info(f"🎛️ {action} job {job_id} by {user_id}")
+    if action == "cancel":
+        done = cancel_job(client, job_id)
+        msg = f"🛑 Job `{job_id}` cancelled — segments in progress will finish, the rest are skipped" if done else None
+    elif action == "pause":
+        done = pause_job(job_id, True)
+        msg = f"⏸️ Job `{job_id}` paused — use `/appgrowth resume {job_id}` to continue" if done else None
+    else:
+        done = pause_job(job_id, False)
+        msg = f"▶️ Job `{job_id}` resumed" if done else None
+    respond_text(respond, msg or f"⚠️ Job `{job_id}` has already finished")
+
+def handle_results_command(respond, command, client, job_id):
+    """Send the full per-segment CSV of a finished job as a DM"""
+    job = find_own_job(respond, command, "results", job_id)
+    if job is None:
+        return
+    path = results_path(job_id)
+    if not os.path.exists(path):
+        respond_text(respond, f"⏳ Job `{job_id}` is still running — results are available once it finishes")
+        return
+    try:
+        send_file_dm(
+            client,
+            command["user_id"],
+            path,
+            filename=f"appgrowth-job-{job_id}.csv",
+            title=f"AppGrowth job {job_id} results",
+            comment=f"📄 Job `{job_id}`: {job['created']} created, {job['failed']} failed",
+        )
+        respond_text(respond, f"📄 Results of job `{job_id}` sent to you as a direct message")
+    except Exception as e:
+        logger.error(f"❌ Could not upload results of {job_id}: {e}")
+        respond_text(respond, f"❌ Could not send the results file: {e}")
+
+def send_file_dm(client, user_id, path, filename, title, comment):
+    dm = client.conversations_open(users=user_id)["channel"]["id"]
+    client.files_upload_v2(channel=dm, file=path, filename=filename, title=title, initial_comment=comment)
+
+def handle_bulk_command(respond, command, client, action, args):
+    """
+    /appgrowth rebuild|delete <name pattern> [app=...] [country=...] [--confirm]
+    /appgrowth edit <name pattern> [app=...] [country=...] <option>=<value>... [--confirm]
+
+    Without --confirm only lists what would be touched (dry run). Edit
+    diffs every matching segment against the given options and only
+    submits the ones that differ.
+    """
+    confirm = "--confirm" in args
+    args = [a for a in args if a != "--confirm"]
+    desired = {} if action == "edit" else None
+    try:
+        selector = SegmentSelector.parse(args, desired)
+        if desired is not None:
+            if not desired:
+                raise ValueError("give at least one option to set, e.g. `audience=0.90` or `age=14`")
+            desired = {key: normalize_option(key, value) for key, value in desired.items()}
+    except ValueError as e:
+        options = " <option>=<value>..." if action == "edit" else ""
+        example = " audience=0.90" if action == "edit" else ""
+        respond_text(
+            respond,
+            f"❌ {e}\nUsage: `/appgrowth {action} <name pattern> [app=<bundle id>] [country=<ISO3>]{options} [--confirm]`\n"
+            f"Example: `/appgrowth {action} bloom_com.easybrain.sudoku_* country=USA{example}`"
+        )
+        return
+    user_id = command.get("user_id")
+    if action == "delete" and not selector.pattern.startswith("bloom_"):
+        respond_text(respond, "⛔ Bulk delete only works on the bot's own `bloom_*` segments")
+        return
+    if confirm and action == "delete" and user_id not in ADMIN_USER_IDS:
+        # Fails closed like /appgrowth profile: no ADMIN_USER_IDS, no bulk delete
+        respond_text(respond, "⛔ Only admins can bulk delete segments (set `ADMIN_USER_IDS`)")
+        return
+
+    respond_text(respond, f"🔎 Looking up segments matching {selector.describe()}...")
+    try:
+        if action == "edit":
+            plan = EditPlan(select_segments(selector), desired)
+            rows = plan.changes
+        else:
+            plan = None
+            rows = [{"id": row["id"], "name": row["name"]} for row in select_segments(selector)]
+    except Exception as e:
+        logger.error(f"❌ Segment listing failed: {e}")
+        respond_text(respond, f"❌ Could not read the segment list from AppGrowth: {e}")
+        return
+    if not rows and not (plan and (plan.unchanged or plan.skipped)):
+        respond_text(respond, f"📭 No segments match {selector.describe()}")
+        return
+
+    _, verb = OPERATIONS[action]
+    if plan is not None and (not confirm or not rows):
+        respond_text(respond, format_edit_plan(plan, selector))
+        return
+    if not confirm:
+        names = "\n".join(f"• `{row['name']}` (#{row['id']})" for row in rows[:BULK_PREVIEW_LIMIT])
+        if len(rows) > BULK_PREVIEW_LIMIT:
+            names += f"\n... and {len(rows) - BULK_PREVIEW_LIMIT} more"
+        respond_text(
+            respond,
+            f"🧪 *Dry run: {len(rows)} segments would be {verb}*\nMatching {selector.describe()}\n\n{names}\n\n"
+            f"Run the same command with `--confirm` to {action} them."
+        )
+        return
+
+    logger.info(f"🧹 Bulk {action} of {len(rows)} segments by {user_id}: {selector.describe()}")
+    respond_text(respond, f"🔄 *Starting bulk {action} of {len(rows)} segments...*")
+    threading.Thread(
+        target=run_bulk_operation,
+        args=(client, command.get("channel_id"), user_id, action, selector, rows, plan),
+        name=f"bulk-{action}",
+        daemon=True,
+    ).start()
+
+def format_edit_plan(plan, selector):
+    """Dry-run text of a bulk edit: what changes (with the diff), what is already up to date"""
+    if plan.changes:
+        text = f"🧪 *Dry run: {len(plan.changes)} segments would be updated*"
+    else:
+        text = "✅ *Nothing to update*"
+    text += f"\nMatching {selector.describe()}"
+    if plan.unchanged:
+        text += f"\n⏸️ Already up to date: {len(plan.unchanged)}"
+    if plan.skipped:
+        text += f"\n⏭️ Skipped: {len(plan.skipped)} ({plan.skipped[0][1]})"
+    if not plan.changes:
+        return text
+    changes = "\n".join(f"• {describe_change(row)}" for row in plan.changes[:BULK_PREVIEW_LIMIT])
+    if len(plan.changes) > BULK_PREVIEW_LIMIT:
+        changes += f"\n... and {len(plan.changes) - BULK_PREVIEW_LIMIT} more"
+    return f"{text}\n\n{changes}\n\nRun the same command with `--confirm` to apply the changes."
+
+def run_bulk_operation(client, channel_id, user_id, action, selector, rows, plan=None):
+    operation, verb = OPERATIONS[action]
+    report = BulkReport(action)
+    if plan is not None:
+        plan.record_untouched(report)
+
+    total = report.processed + len(rows)
+
+    def progress(report):
+        if report.processed % BULK_PROGRESS_EVERY == 0 and report.processed < total:
+            try:
+                client.chat_postEphemeral(
+                    channel=channel_id,
+                    user=user_id,
+                    text=f"🔄 Bulk {action}: {report.processed}/{total} processed..."
+                )
+            except Exception:
+                pass
+
+    error = None
+    try:
+        run_bulk(report, rows, operation, progress=progress)
+    except Exception as e:
+        logger.error(f"❌ Bulk {action} failed: {e}")
+        error = e
+    finally:
+        # Flush and close the CSV before it is sent, also when the run stopped midway
+        report.close()
+    icon = "✅" if report.counts["failed"] == 0 and report.counts["skipped"] == 0 and error is None else "⚠️"
+    msg = f"{icon} *Bulk {action} finished* — {total} segments matching {selector.describe()}\n\n{report.format(verb)}"
+    if error is not None:
+        msg += f"\n\n❌ Stopped after {report.processed} segments: {error}"
+    try:
+        send_file_dm(
+            client, user_id, report.path,
+            filename=f"appgrowth-{report.op_id}.csv",
+            title=f"AppGrowth bulk {action} report",
+            comment=f"📄 Per-segment report of bulk {action} `{report.op_id}`",
+        )
+        msg += "\n\n📄 Per-segment report sent as a direct message"
+    except Exception as e:
+        logger.warning(f"⚠️ Could not send bulk report file: {e}")
+    client.chat_postEphemeral(
+        channel=channel_id,
+        user=user_id,
+        text=msg,
+        blocks=[{"type": "section", "text": {"type": "mrkdwn", "text": msg}}]
+    )
+
+def handle_stats_command(respond, args):
+    if len(args) != 1:
+        respond_text(respond, "❓ Usage: `/appgrowth stats <bundle id|pattern>`, e.g. `/appgrowth stats com.easybrain.sudoku` or `/appgrowth stats bloom_*_USA_*`")
+        return
+    table = CATALOG.table
+    if table is None:
+        respond_text(respond, "⏳ The segment list is still loading, try again in a minute")
+        return
+    started = time.perf_counter()
+    text = format_stats(table, args[0])
+    logger.info(f"📈 Stats for {args[0]} over {len(table)} segments in {(time.perf_counter() - started) * 1000:.0f}ms")
+    if text is None:
+        respond_text(respond, f"🔍 No segments match `{args[0]}`")
+        return
+    age_min = int((time.time() - CATALOG.updated_at) / 60)
+    respond_text(respond, text + f"\n\n_Listing read {age_min} min ago_")
+
+def handle_profile_command(respond, command, client, args):
+    """/appgrowth profile [seconds] — admins only; sample this worker and DM the folded stacks"""
+    user_id = command.get("user_id")
+    if user_id not in ADMIN_USER_IDS:
+        respond_text(respond, "⛔ Only admins can profile the bot (set `ADMIN_USER_IDS`)")
+        return
+    try:
+        seconds = int(args[0]) if args else 30
+        if not 1 <= seconds <= MAX_PROFILE_SECONDS or len(args) > 1:
+            raise ValueError
+    except ValueError:
+        respond_text(respond, f"❌ Usage: `/appgrowth profile [seconds]` (1-{MAX_PROFILE_SECONDS}, default 30)")
+        return
+    respond_text(respond, f"🔬 Profiling worker pid {os.getpid()} for {seconds}s — results will arrive as a direct message")
+    threading.Thread(
+        target=run_profile,
+        args=(respond, client, user_id, seconds),
+        name="profile",
+        daemon=True,
+    ).start()
+
+def run_profile(respond, client, user_id, seconds):
+    try:
+        profile = record_profile(seconds, stop=SHUTDOWN.stopping)
+    except ProfileBusyError as e:
+        respond_text(respond, f"⚠️ Not started: {e}")
+        return
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    comments = {
+        "cpu": f"🔥 CPU profile, folded stacks (flamegraph.pl / speedscope)\n{profile.summary()}",
+        "wall": "🔥 Wall-clock profile, folded stacks — includes time spent waiting on the network and locks",
+    }
+    with tempfile.TemporaryDirectory(prefix="appgrowth-profile-") as tmp:
+        for kind, comment in comments.items():
+            filename = f"appgrowth-{kind}-{os.getpid()}-{stamp}.folded"
+            try:
+                send_file_dm(
+                    client, user_id, profile.write_folded(os.path.join(tmp, filename), kind),
+                    filename=filename,
+                    title=f"AppGrowth {kind} profile",
+                    comment=comment,
+                )
+            except Exception as e:
+                logger.error(f"❌ Could not upload the {kind} profile: {e}")
+                respond_text(respond, f"❌ Could not send the {kind} profile: {e}")
+                return
+
+def handle_appgrowth_command(respond, command, client):
     logger.info("🎯 Processing /appgrowth command")
     
     text = command.get("text", "").strip()
+    words = text.split()
     
     if not text:
         logger.info("📋 Showing main menu")
@@ -179,7 +791,12 @@ def handle_appgrowth_command(ack, respond, command):
         return
     
     if text.lower() == 'ping':
+        connected, workers = auth_status_summary()
         auth_status = "🟢 Connected" if auth_logged_in else "🔴 Disconnected"
+        if workers > 1:
+            auth_status += f" ({connected}/{workers} workers connected)"
+        if not appgrowth.BREAKER.is_closed:
+            auth_status += f"\n⛔ AppGrowth looks down, segment creation paused (next check in ~{appgrowth.BREAKER.retry_in():.0f}s)"
         logger.info(f"📊 Ping command - auth status: {auth_status}")
         respond(
             blocks=[
@@ -194,6 +811,30 @@ def handle_appgrowth_command(ack, respond, command):
         )
         return
     
+    if text.lower() == 'jobs':
+        handle_jobs_command(respond)
+        return
+
+    if words and words[0].lower() in OPERATIONS:
+        handle_bulk_command(respond, command, client, words[0].lower(), words[1:])
+        return
+
+    if words and words[0].lower() == 'profile':
+        handle_profile_command(respond, command, client, words[1:])
+        return
+
+    if words and words[0].lower() == 'stats':
+        handle_stats_command(respond, words[1:])
+        return
+
+    if words and words[0].lower() == 'results' and len(words) <= 2:
+        handle_results_command(respond, command, client, words[1] if len(words) > 1 else None)
+        return
+
+    if words and words[0].lower() in ('cancel', 'pause', 'resume') and len(words) <= 2:
+        handle_job_control(respond, command, client, words[0].lower(), words[1] if len(words) > 1 else None)
+        return
+    
     # For any other commands
     respond(
         blocks=[
@@ -201,17 +842,16 @@ def handle_appgrowth_command(ack, respond, command):
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text": f"🤖 Unknown command: `{text}`\n\nUse:\n• `/appgrowth` - main menu\n• `/appgrowth ping` - status check"
+                    "text": f"🤖 Unknown command: `{text}`\n\nUse:\n• `/appgrowth` - main menu\n• `/appgrowth ping` - status check\n• `/appgrowth jobs` - running batches\n• `/appgrowth pause|resume|cancel <id>` - control a batch\n• `/appgrowth results <id>` - full results as CSV\n• `/appgrowth stats <app|pattern>` - installs and profit by type, country and app\n• `/appgrowth rebuild|delete <pattern> [app=...] [country=...]` - bulk actions (dry run first)\n• `/appgrowth edit <pattern> [app=...] [country=...] audience=0.90|age=14` - bulk edit options (dry run first)"
                 }
             }
         ]
     )
 
+bolt_app.command("/appgrowth")(ack=ack_only("/appgrowth"), lazy=[handle_appgrowth_command])
+
 # Multiple segments creation button handler  
-@bolt_app.action("multiple_segments_btn")
-def open_multiple_segments_modal(ack, body, client):
-    ack()
-    
+def open_multiple_segments_modal(body, client):
     logger.info("📊 Opening multiple segments creation modal")
     
     try:
@@ -233,326 +873,352 @@ def open_multiple_segments_modal(ack, body, client):
         trigger_id = body["trigger_id"]
         client.views_open(
             trigger_id=trigger_id,
-            view={
-                "type": "modal",
-                "callback_id": "create_multiple_segments_modal",
-                "title": {"type": "plain_text", "text": "📊 Multiple Segments"},
-                "submit": {"type": "plain_text", "text": "Create All"},
-                "close": {"type": "plain_text", "text": "Cancel"},
-                "private_metadata": channel_id,
-                "blocks": [
-                    {
-                        "type": "section",
-                        "text": {
-                            "type": "mrkdwn",
-                            "text": "*🚀 Bulk Segment Creation*\nCreate multiple segments for one or more apps across different countries and types:"
-                        }
-                    },
-                    {"type": "divider"},
-                    {
-                        "type": "input",
-                        "block_id": "app_id_block",
-                        "element": {
-                            "type": "plain_text_input",
-                            "action_id": "app_id_input",
-                            "multiline": True,
-                            "placeholder": {"type": "plain_text", "text": "com.easybrain.number.puzzle.game\ncom.example.another.app"}
-                        },
-                        "label": {"type": "plain_text", "text": "📱 App ID (Bundle ID)"},
-                        "hint": {"type": "plain_text", "text": "Enter one or more Bundle IDs: one per line, with spaces, or with commas"}
-                    },
-                    {
-                        "type": "section",
-                        "text": {"type": "mrkdwn", "text": "*🌍 Countries*"}
-                    },
-                    {
-                        "type": "input",
-                        "block_id": "countries_block",
-                        "optional": True,
-                        "element": {
-                            "type": "multi_static_select",
-                            "action_id": "countries_input",
-                            "placeholder": {"type": "plain_text", "text": "Select countries"},
-                            "options": POPULAR_COUNTRIES,
-                            "max_selected_items": 20
-                        },
-                        "label": {"type": "plain_text", "text": "Dropdown"},
-                        "hint": {"type": "plain_text", "text": "Select multiple countries from list"}
-                    },
-                    {
-                        "type": "input",
-                        "block_id": "bulk_countries_block",
-                        "optional": True,
-                        "element": {
-                            "type": "plain_text_input",
-                            "action_id": "bulk_countries_input",
-                            "multiline": True,
-                            "placeholder": {"type": "plain_text", "text": "ARE ZAF ISR or ARE, ZAF, ISR"}
-                        },
-                        "label": {"type": "plain_text", "text": "Bulk Text"},
-                        "hint": {"type": "plain_text", "text": "Paste country codes: one per line, with spaces, or with commas"}
-                    },
-                    {
-                        "type": "section",
-                        "text": {"type": "mrkdwn", "text": "*📊 Segment Types*"}
-                    },
-                    {
-                        "type": "input",
-                        "block_id": "all_segments_block",
-                        "element": {
-                            "type": "checkboxes",
-                            "action_id": "all_segments_input",
-                            "options": [
-                                {
-                                    "text": {"type": "plain_text", "text": "All"},
-                                    "value": "all_segments"
-                                }
-                            ],
-                            "initial_options": [
-                                {
-                                    "text": {"type": "plain_text", "text": "All"},
-                                    "value": "all_segments"
-                                }
-                            ]
-                        },
-                        "label": {"type": "plain_text", "text": "All Types"},
-                        "hint": {"type": "plain_text", "text": "Uncheck to manually select specific types"}
-                    },
-                    {
-                        "type": "input",
-                        "block_id": "segment_types_block",
-                        "optional": True,
-                        "element": {
-                            "type": "multi_static_select",
-                            "action_id": "segment_types_input",
-                            "placeholder": {"type": "plain_text", "text": "Select specific segment types"},
-                            "options": SEGMENT_TYPES,
-                            "max_selected_items": 5
-                        },
-                        "label": {"type": "plain_text", "text": "Manual Selection"},
-                        "hint": {"type": "plain_text", "text": "Only used when 'All' is unchecked above"}
-                    }
-                ]
-            }
+            view=build_multiple_segments_modal(channel_id)
         )
         logger.info("✅ Multiple segments modal opened successfully")
     except Exception as e:
         logger.error(f"❌ Error opening multiple segments modal: {e}")
 
-# Handle form inputs to prevent warnings
-@bolt_app.action(re.compile("app_id_input|countries_input|bulk_countries_input|all_segments_input|segment_types_input"))
-def handle_form_inputs(ack, body):
-    ack()
-    # Just acknowledge, no preview needed
+bolt_app.action("multiple_segments_btn")(ack=ack_only("multiple_segments_btn"), lazy=[open_multiple_segments_modal])
 
-# Multiple segments submission handler
-@bolt_app.view("create_multiple_segments_modal")
-def handle_multiple_segments_submission(ack, body, client):
-    logger.info("🔥 START: Processing multiple segments submission")
-    
+# Live preview: recompute the plan on every input change and push it into the modal
+def handle_form_inputs(body, client):
     try:
-        values = body["view"]["state"]["values"]
-
-        # Get bundle IDs from input (now supports multiple)
-        app_id_data = values.get("app_id_block", {}).get("app_id_input", {})
-        app_id_text = app_id_data.get("value", "").strip() if app_id_data.get("value") else ""
-        bundle_ids = parse_bulk_bundle_ids(app_id_text)
+        started = time.time()
+        view = body["view"]
+        inputs = extract_modal_inputs(view["state"]["values"])
+        preview_text = format_plan_preview(inputs)
+        client.views_update(
+            view_id=view["id"],
+            hash=view["hash"],
+            view=build_multiple_segments_modal(view["private_metadata"], preview_text)
+        )
+        logger.info(f"🧮 Preview updated in {(time.time() - started) * 1000:.0f}ms")
+    except Exception as e:
+        # hash_conflict just means a newer keystroke already updated the view
+        logger.warning(f"⚠️ Preview update skipped: {e}")
 
-        # Get countries from dropdown
-        countries_data = values.get("countries_block", {}).get("countries_input", {})
-        countries_dropdown = [opt["value"] for opt in countries_data.get("selected_options", [])]
+bolt_app.action(re.compile("app_id_input|allow_new_apps_input|countries_input|bulk_countries_input|all_segments_input|segment_types_input"))(
+    ack=ack_only("form_inputs"), lazy=[handle_form_inputs]
+)
 
-        # Get countries from bulk text
-        bulk_data = values.get("bulk_countries_block", {}).get("bulk_countries_input", {})
-        bulk_text = bulk_data.get("value", "") if bulk_data.get("value") else ""
-        countries_bulk_valid, countries_bulk_invalid = parse_bulk_countries(bulk_text)
+def validate_modal_inputs(inputs, now=None):
+    """Field errors for the multiple segments modal (block_id -> message); empty when valid"""
+    now = time.time() if now is None else now
+    bundle_ids = inputs["bundle_ids"]
+    countries_bulk_invalid = inputs["countries_bulk_invalid"]
+    countries = inputs["countries"]
+    segment_types = inputs["segment_types"]
 
-        # Merge and deduplicate countries
-        countries = list(set(countries_dropdown + countries_bulk_valid))
+    errors = {}
 
-        # Check if "ALL segments" checkbox is selected
-        all_segments_data = values.get("all_segments_block", {}).get("all_segments_input", {})
-        all_segments_checked = len(all_segments_data.get("selected_options", [])) > 0
+    if not bundle_ids:
+        errors["app_id_block"] = "Enter at least one Bundle ID"
+    else:
+        # Validate that each bundle ID is not too short
+        invalid_bundles = [bid for bid in bundle_ids if len(bid) < 5]
+        if invalid_bundles:
+            errors["app_id_block"] = f"Bundle IDs too short: {', '.join(invalid_bundles)}"
+        elif not inputs["allow_new_apps"]:
+            # Set lookups against the cached known apps: no AppGrowth call on the ack path
+            unknown = KNOWN_APPS.unknown(bundle_ids)
+            if unknown:
+                more = f" and {len(unknown) - 10} more" if len(unknown) > 10 else ""
+                errors["app_id_block"] = (
+                    f"Unknown app IDs: {', '.join(unknown[:10])}{more}. No segment or campaign uses them — "
+                    f"check for typos, or tick 'Allow apps AppGrowth doesn't know yet'"
+                )
 
-        # Get manually selected segment types
-        segment_types_data = values.get("segment_types_block", {}).get("segment_types_input", {})
-        segment_types_manual = [opt["value"] for opt in segment_types_data.get("selected_options", [])]
+    # Check for invalid country codes in bulk input
+    if countries_bulk_invalid:
+        invalid_codes_str = ", ".join(countries_bulk_invalid)
+        errors["bulk_countries_block"] = f"Invalid country codes: {invalid_codes_str}. Use valid ISO 3166-1 alpha-3 codes (e.g., USA, GBR, DEU)"
 
-        # If "ALL" is checked, use all 5 segment types
-        if all_segments_checked:
-            segment_types = [seg["value"] for seg in SEGMENT_TYPES]
-        else:
-            segment_types = segment_types_manual
+    if not countries:
+        errors["countries_block"] = "Select countries from dropdown or enter bulk text"
 
-        logger.info(f"📱 Bundle IDs: {bundle_ids}, 🌍 Countries (dropdown): {countries_dropdown}, 🌍 Countries (bulk valid): {countries_bulk_valid}, 🌍 Countries (bulk invalid): {countries_bulk_invalid}, 🌍 Total: {countries}, ✅ ALL segments: {all_segments_checked}, 📊 Types: {segment_types}")
+    if not segment_types:
+        errors["all_segments_block"] = "Check 'ALL segments' or select at least one segment type"
 
-        errors = {}
+    if not inputs["plan_only"]:
+        try:
+            parse_run_at(inputs["run_mode"], inputs["run_at_picked"], now, WINDOWS)
+        except ValueError as e:
+            errors["run_at_block" if inputs["run_mode"] == "at" else "run_when_block"] = str(e)
 
-        if not bundle_ids:
-            errors["app_id_block"] = "Enter at least one Bundle ID"
-        else:
-            # Validate that each bundle ID is not too short
-            invalid_bundles = [bid for bid in bundle_ids if len(bid) < 5]
-            if invalid_bundles:
-                errors["app_id_block"] = f"Bundle IDs too short: {', '.join(invalid_bundles)}"
+    return errors
 
-        # Check for invalid country codes in bulk input
-        if countries_bulk_invalid:
-            invalid_codes_str = ", ".join(countries_bulk_invalid)
-            errors["bulk_countries_block"] = f"Invalid country codes: {invalid_codes_str}. Use valid ISO 3166-1 alpha-3 codes (e.g., USA, GBR, DEU)"
+def accepted_submission(inputs, now):
+    """(inputs, run_at) of a submission that passed validation at `now`"""
+    run_at = 0 if inputs["plan_only"] else parse_run_at(inputs["run_mode"], inputs["run_at_picked"], now, WINDOWS)
+    return inputs, run_at
 
-        if not countries:
-            errors["countries_block"] = "Select countries from dropdown or enter bulk text"
+# Multiple segments submission: validation in the ack path, batch start in a lazy listener
+@timed_ack("create_multiple_segments_modal")
+def validate_multiple_segments_submission(ack, body, context):
+    logger.info("🔥 START: Processing multiple segments submission")
+    
+    try:
+        inputs = extract_modal_inputs(body["view"]["state"]["values"])
+        logger.info(f"📱 Bundle IDs: {inputs['bundle_ids']}, 🌍 Countries (dropdown): {inputs['countries_dropdown']}, 🌍 Countries (bulk valid): {inputs['countries_bulk_valid']}, 🌍 Countries (bulk invalid): {inputs['countries_bulk_invalid']}, 🌍 Total: {inputs['countries']}, ✅ ALL segments: {inputs['all_segments_checked']}, 📊 Types: {inputs['segment_types']}")
 
-        if not segment_types:
-            errors["all_segments_block"] = "Check 'ALL segments' or select at least one segment type"
-        
+        now = time.time()
+        errors = validate_modal_inputs(inputs, now)
         if errors:
             logger.warning(f"❌ Multiple segments validation failed: {errors}")
+            context["submission_errors"] = errors
             ack(response_action="errors", errors=errors)
             return
         
+        # Handed to the lazy listener (Bolt copies the context): the batch starts
+        # exactly as validated, even if the clock or the known apps move on meanwhile
+        context["accepted_submission"] = accepted_submission(inputs, now)
         logger.info("✅ Multiple segments validation passed")
         ack()
-        
-        channel_id = body["view"]["private_metadata"]
-        user_id = body["user"]["id"]
+    except Exception as e:
+        logger.error(f"❌ Error in multiple segments handler: {e}")
+        ack()
+
+def start_multiple_segments(body, client, context):
+    channel_id = body["view"]["private_metadata"]
+    user_id = body["user"]["id"]
+    try:
+        accepted = context.get("accepted_submission")
+        if accepted is None:
+            if context.get("submission_errors"):
+                # Rejected in the ack path (lazy listeners run regardless): the errors are in the open modal
+                return
+            # The ack closed the modal without a validated result (it failed): validate here
+            # and tell the user what's wrong instead of dropping the submission
+            inputs = extract_modal_inputs(body["view"]["state"]["values"])
+            now = time.time()
+            errors = validate_modal_inputs(inputs, now)
+            if errors:
+                msg = "❌ *Segments not created:*\n" + "\n".join(f"• {error}" for error in errors.values())
+                client.chat_postEphemeral(channel=channel_id, user=user_id, text=msg)
+                return
+            accepted = accepted_submission(inputs, now)
+        inputs, run_at = accepted
+
+        bundle_ids = inputs["bundle_ids"]
+        countries = inputs["countries"]
+        segment_types = inputs["segment_types"]
 
         total_segments = len(bundle_ids) * len(countries) * len(segment_types)
 
+        if inputs["plan_only"]:
+            threading.Thread(
+                target=post_plan_report,
+                args=(client, channel_id, user_id, bundle_ids, countries, segment_types),
+                name="plan-report",
+                daemon=True,
+            ).start()
+            return
+
+        if run_at > time.time():
+            msg = f"🗓️ *Scheduling {total_segments} segments for {slack_time(run_at)}...*\n📱 Apps: {len(bundle_ids)}, 🌍 Countries: {len(countries)}, 📊 Types: {len(segment_types)}"
+        else:
+            msg = f"🔄 *Creating {total_segments} segments...*\n📱 Apps: {len(bundle_ids)}, 🌍 Countries: {len(countries)}, 📊 Types: {len(segment_types)}\nPlease wait, this may take a minute."
         client.chat_postEphemeral(
             channel=channel_id,
             user=user_id,
-            text=f"🔄 *Creating {total_segments} segments...*\n📱 Apps: {len(bundle_ids)}, 🌍 Countries: {len(countries)}, 📊 Types: {len(segment_types)}\nPlease wait, this may take a minute.",
-            blocks=[
-                {
-                    "type": "section",
-                    "text": {"type": "mrkdwn", "text": f"🔄 *Creating {total_segments} segments...*\n📱 Apps: {len(bundle_ids)}, 🌍 Countries: {len(countries)}, 📊 Types: {len(segment_types)}\nPlease wait, this may take a minute."}
-                }
-            ]
+            text=msg,
+            blocks=[{"type": "section", "text": {"type": "mrkdwn", "text": msg}}]
         )
         
-        def create_multiple_segments_async():
+        def queue_multiple_segments_async():
             try:
-                logger.info(f"🎯 Starting creation of {total_segments} segments")
-                
-                if not auth_logged_in:
-                    try_login()
-                
-                if not auth_logged_in:
-                    msg = "❌ *AppGrowth authorization error*\n🔧 Please try again later"
-                    client.chat_postEphemeral(channel=channel_id, user=user_id, text=msg)
-                    return
-                
-                created_segments = []
-                failed_segments = []
-                processed = 0
-
-                for app_id in bundle_ids:
-                    logger.info(f"📱 Processing bundle ID: {app_id}")
-                    for country in countries:
-                        for seg_type_value in segment_types:
-                            seg_type, value = seg_type_value.split("_")
-
-                            try:
-                                name = generate_segment_name(app_id, country, seg_type, value)
-                                logger.info(f"🎯 Creating segment: {name}")
-
-                                if seg_type == "RetainedAtLeast":
-                                    val = int(value)
-                                else:  # ActiveUsers
-                                    val = float(value)
-
-                                ok = appgrowth.create_segment(
-                                    name=name,
-                                    title=app_id,
-                                    app=app_id,
-                                    country=country,
-                                    value=val,
-                                    seg_type=seg_type
-                                )
-
-                                if ok:
-                                    created_segments.append(name)
-                                    logger.info(f"✅ Created: {name}")
-                                else:
-                                    failed_segments.append(name)
-                                    logger.error(f"❌ Failed: {name} (probably already exists or server error)")
-
-                            except Exception as e:
-                                failed_segments.append(f"{app_id}_{country}_{seg_type}_{value}")
-                                logger.error(f"❌ Exception creating {app_id}_{country}_{seg_type}_{value}: {e}")
-
-                            processed += 1
-                            # Send progress update every 5 segments
-                            if processed % 5 == 0:
-                                try:
-                                    client.chat_postEphemeral(
-                                        channel=channel_id,
-                                        user=user_id,
-                                        text=f"🔄 Progress: {processed}/{total_segments} processed, {len(created_segments)} created so far..."
-                                    )
-                                except:
-                                    pass
-
-                            time.sleep(0.5)
-                
-                success_count = len(created_segments)
-                fail_count = len(failed_segments)
-
+                tasks = (
+                    (app_id, country, seg_type, value)
+                    for app_id, country, seg_type, value, _name in iter_segment_plan(bundle_ids, countries, segment_types)
+                )
                 apps_summary = f"📱 {len(bundle_ids)} app(s), 🌍 {len(countries)} country(ies), 📊 {len(segment_types)} type(s)"
-
-                if success_count > 0 and fail_count == 0:
-                    msg = f"🎉 *All {success_count} segments created successfully!*\n{apps_summary}\n\n📋 Created segments:\n" + "\n".join([f"• `{name}`" for name in created_segments[:20]])
-                    if len(created_segments) > 20:
-                        msg += f"\n... and {len(created_segments) - 20} more"
-                elif success_count > 0 and fail_count > 0:
-                    msg = f"⚠️ *Partially completed: {success_count}/{total_segments} segments created*\n{apps_summary}\n\n"
-                    if created_segments:
-                        msg += f"✅ *Created ({success_count}):*\n" + "\n".join([f"• `{name}`" for name in created_segments[:10]])
-                        if len(created_segments) > 10:
-                            msg += f"\n... and {len(created_segments) - 10} more"
-                    if failed_segments:
-                        msg += f"\n\n❌ *Failed ({fail_count}):*\n" + "\n".join([f"• `{name}`" for name in failed_segments[:10]])
-                        if len(failed_segments) > 10:
-                            msg += f"\n... and {len(failed_segments) - 10} more"
-                else:
-                    msg = f"❌ *Failed to create any segments ({total_segments} total)*\n{apps_summary}\n\n"
-                    if failed_segments:
-                        msg += f"📋 *Failed segments:*\n" + "\n".join([f"• `{name}`" for name in failed_segments[:20]])
-                        if len(failed_segments) > 20:
-                            msg += f"\n... and {len(failed_segments) - 20} more"
-                    msg += f"\n\n🔧 *Possible reasons:*\n• Segments already exist\n• Invalid app ID\n• Server errors"
-                
-                client.chat_postEphemeral(
-                    channel=channel_id,
-                    user=user_id,
-                    text=msg,
-                    blocks=[{"type": "section", "text": {"type": "mrkdwn", "text": msg}}]
+                submit_segment_batch(
+                    client, channel_id, user_id, tasks, total=total_segments, scope=apps_summary, run_at=run_at
                 )
-                
-                logger.info(f"✅ Multiple segments process completed: {success_count} success, {fail_count} failed")
-                
             except Exception as e:
                 logger.error(f"❌ Multiple segments creation error: {e}")
-                client.chat_postEphemeral(
-                    channel=channel_id,
-                    user=user_id,
-                    text=f"❌ *Error creating segments:* {e}"
-                )
+                client.chat_postEphemeral(channel=channel_id, user=user_id, text=f"❌ *Error creating segments:* {e}")
         
-        thread = threading.Thread(target=create_multiple_segments_async, daemon=True)
+        thread = threading.Thread(target=queue_multiple_segments_async, daemon=True)
         thread.start()
-        logger.info("🚀 Background multiple segments creation started")
+        logger.info("🚀 Multiple segments batch queued")
         
     except Exception as e:
-        logger.error(f"❌ Error in multiple segments handler: {e}")
-        ack()
+        logger.error(f"❌ Error starting multiple segments batch: {e}")
+        client.chat_postEphemeral(channel=channel_id, user=user_id, text=f"❌ *Error creating segments:* {e}")
+
+def post_plan_report(client, channel_id, user_id, bundle_ids, countries, segment_types):
+    """Plan-only submission: diff the plan against the segment index, no writes to AppGrowth"""
+    try:
+        if not CATALOG.loaded:
+            # The listing read is the only AppGrowth call of a plan
+            CATALOG.refresh()
+        if not CATALOG.loaded:
+            raise RuntimeError("the segment list could not be read from AppGrowth")
+        started = time.perf_counter()
+        diff = CATALOG.diff_plan(bundle_ids, countries, segment_types)
+        age_min = int((time.time() - CATALOG.updated_at) / 60)
+        msg = (
+            f"🧪 *Plan only: {diff.total} segments* (📱 {len(bundle_ids)} × 🌍 {len(countries)} × 📊 {len(segment_types)})\n"
+            f"Nothing was created. Compared with {len(CATALOG)} existing bot segments "
+            f"(index updated {age_min} min ago, diff took {(time.perf_counter() - started) * 1000:.0f} ms)\n\n"
+            f"{diff.format()}"
+        )
+    except Exception as e:
+        logger.error(f"❌ Plan report failed: {e}")
+        msg = f"❌ *Could not build the plan:* {e}"
+    client.chat_postEphemeral(
+        channel=channel_id,
+        user=user_id,
+        text=msg,
+        blocks=[{"type": "section", "text": {"type": "mrkdwn", "text": msg}}]
+    )
+
+bolt_app.view("create_multiple_segments_modal")(
+    ack=validate_multiple_segments_submission, lazy=[start_multiple_segments]
+)
+
+# Batch upload: a CSV/TSV (app, country, type) shared in a DM with the bot, or anywhere
+# with an explicit app,country,type header, is scanned and queued once the uploader confirms
+def handle_file_shared(event, client, context):
+    file_id = event.get("file_id")
+    channel_id = event.get("channel_id")
+    user_id = event.get("user_id")
+    bot_user_id = context.get("bot_user_id")
+
+    if not user_id or user_id == bot_user_id:
+        return  # the bot's own result and report CSVs
+
+    try:
+        file_info = client.files_info(file=file_id)["file"]
+    except Exception as e:
+        logger.error(f"❌ Could not read shared file {file_id}: {e}")
+        return
+
+    if not is_batch_upload(file_info) or file_info.get("user") == bot_user_id:
+        return
+
+    def scan_upload_async():
+        # Streamed twice: once here for the prompt, again after confirmation
+        download = lines = iter_slack_file_lines(file_info["url_private_download"], SLACK_BOT_TOKEN)
+        try:
+            if not is_direct_message(channel_id):
+                first = next(lines, "")
+                if not has_upload_header(first):
+                    logger.info(f"📎 Ignoring {file_info.get('name')} in {channel_id}: no app,country,type header")
+                    return
+                lines = itertools.chain([first], lines)
+            logger.info(f"📎 Batch upload received: {file_info.get('name')} ({file_info.get('size')} bytes) from {user_id}")
+            summary = UploadSummary()
+            preview = scan_upload(lines, summary)
+        except Exception as e:
+            logger.error(f"❌ Batch upload error: {e}")
+            client.chat_postEphemeral(channel=channel_id, user=user_id, text=f"❌ *Error reading upload:* {e}")
+            return
+        finally:
+            download.close()
+
+        text = format_upload_confirmation(file_info.get("name"), summary, preview)
+        blocks = [{"type": "section", "text": {"type": "mrkdwn", "text": text}}]
+        if summary.tasks:
+            value = json.dumps({"file": file_id, "channel": channel_id})
+            blocks.append({
+                "type": "actions",
+                "elements": [
+                    {
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": f"✅ Create {summary.tasks} segments"},
+                        "action_id": "upload_confirm_btn",
+                        "value": value,
+                        "style": "primary"
+                    },
+                    {
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": "Cancel"},
+                        "action_id": "upload_cancel_btn",
+                        "value": value
+                    }
+                ]
+            })
+        client.chat_postEphemeral(channel=channel_id, user=user_id, text=text, blocks=blocks)
+
+    thread = threading.Thread(target=scan_upload_async, daemon=True)
+    thread.start()
+
+bolt_app.event("file_shared")(ack=ack_only("file_shared"), lazy=[handle_file_shared])
+
+def handle_upload_confirm(body, client, respond):
+    upload = json.loads(body["actions"][0]["value"])
+    channel_id, user_id = upload["channel"], body["user"]["id"]
+    try:
+        file_info = client.files_info(file=upload["file"])["file"]
+    except Exception as e:
+        respond(replace_original=True, text=f"❌ *Could not read the upload:* {e}")
+        return
+    if file_info.get("user") != user_id:
+        respond(replace_original=True, text="⛔ Only the person who shared the file can start this batch")
+        return
+
+    respond(
+        replace_original=True,
+        text=f"🔄 *Creating segments from `{file_info.get('name')}`...*\nRows are validated as they are read; invalid ones are reported at the end."
+    )
+
+    def queue_uploaded_segments_async():
+        # Download and parsing are lazy: rows flow one at a time into the task queue
+        try:
+            summary = UploadSummary()
+            lines = iter_slack_file_lines(file_info["url_private_download"], SLACK_BOT_TOKEN)
+            tasks = iter_upload_tasks(lines, summary)
+            submit_segment_batch(
+                client, channel_id, user_id, tasks,
+                scope=f"📎 From `{file_info.get('name')}`",
+                notes=summary.format
+            )
+        except Exception as e:
+            logger.error(f"❌ Batch upload error: {e}")
+            client.chat_postEphemeral(channel=channel_id, user=user_id, text=f"❌ *Error reading upload:* {e}")
+
+    thread = threading.Thread(target=queue_uploaded_segments_async, daemon=True)
+    thread.start()
+
+def handle_upload_cancel(respond):
+    respond(replace_original=True, text="🚫 Upload ignored, nothing was created")
+
+bolt_app.action("upload_confirm_btn")(ack=ack_only("upload_confirm_btn"), lazy=[handle_upload_confirm])
+bolt_app.action("upload_cancel_btn")(ack=ack_only("upload_cancel_btn"), lazy=[handle_upload_cancel])
 
 # Background login
 def background_login():
     time.sleep(3)
     try_login()
+    # Segment index for previews is refreshed in the background only
+    CATALOG.start_background_refresh()
+    # Keep this worker visible in shared_state
+    while not SHUTDOWN.stopping.wait(60):
+        publish_worker_status()
+
+_background_started = False
+
+def start_background_tasks():
+    """Start per-process background work; called once per worker (see gunicorn.conf.py)"""
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+    login_thread = threading.Thread(target=background_login, name="background-login", daemon=True)
+    login_thread.start()
+    WATCH.start(SHUTDOWN.stopping)
+    # Segment tasks are leased from the shared queue by every worker process
+    start_workers(bolt_app.client, ensure_login)
+    # Budget/status alerts for WATCH_CAMPAIGNS; one worker polls per cycle
+    start_campaign_watcher(bolt_app.client, ensure_login)
+
+def stop_background_tasks(reason):
+    """Drain batch workers, checkpoint unfinished jobs and report them (see shutdown.py)"""
+    if _background_started:
+        SHUTDOWN.shutdown(reason)
 
 # Flask wrapper
 flask_app = Flask(__name__)
@@ -564,6 +1230,7 @@ def home():
 
 @flask_app.route("/slack/events", methods=["POST"])
 def slack_events():
+    metrics.mark_received()
     logger.info("📨 Slack event received")
     try:
         return handler.handle(request)
@@ -571,20 +1238,60 @@ def slack_events():
         logger.error(f"❌ Event handling error: {e}")
         return {"error": str(e)}, 500
 
+@flask_app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return {"worker": shared_state.worker_id(), **metrics.snapshot()}
+
 @flask_app.route("/health", methods=["GET"])
 def health():
     return {
         "status": "ok",
         "appgrowth_auth": "connected" if auth_logged_in else "disconnected",
+        "circuit": appgrowth.BREAKER.status(),
+        "accounts": appgrowth.POOL.status(),
+        "workers": shared_state.workers(),
         "timestamp": time.time()
     }
 
+@flask_app.route("/admin", methods=["GET"])
+def admin():
+    """
+    Threads, jobs, RSS and top allocation growth of this worker.
+    ?snapshot=1 takes a tracemalloc snapshot now, ?objects=1 counts live
+    HTTP sessions (walks the heap).
+    """
+    if not ADMIN_TOKEN:
+        return {"error": "not found"}, 404
+    # Constant-time comparison: response timing must not reveal how much of the token matched
+    supplied = request.headers.get("Authorization", "").encode()
+    if not hmac.compare_digest(supplied, f"Bearer {ADMIN_TOKEN}".encode()):
+        return {"error": "unauthorized"}, 401
+    if request.args.get("snapshot"):
+        WATCH.take_snapshot()
+    jobs = list_jobs()
+    report = {
+        "worker": shared_state.worker_id(),
+        "pid": os.getpid(),
+        "threads": thread_summary(),
+        "jobs": {
+            "unfinished": sum(1 for job in jobs if job["state"] != DONE),
+            "paused": sum(1 for job in jobs if job["paused"] and job["state"] != DONE),
+            "recent": len(jobs),
+        },
+        "accounts": appgrowth.POOL.status(),
+        "memory": WATCH.report(),
+        "timestamp": time.time(),
+    }
+    if request.args.get("objects"):
+        report["objects"] = count_instances(requests.Session, requests.adapters.HTTPAdapter)
+    return report
+
 if __name__ == "__main__":
-    # Start background login
-    login_thread = threading.Thread(target=background_login, daemon=True)
-    login_thread.start()
+    # Local development only; production runs under gunicorn (see gunicorn.conf.py)
+    start_background_tasks()
+    SHUTDOWN.install_signal_handler()
     
     # Start Flask app
     port = int(os.environ.get("PORT", 8080))
-    logger.info(f"🚀 Starting Flask app on port {port}")
+    logger.info(f"🚀 Starting Flask dev server on port {port}")
     flask_app.run(host="0.0.0.0", port=port, debug=False, threaded=True)
\ No newline at end of file
@@ -1,60 +1,567 @@
 # appgrowth.py
 # Логин в AppGrowth, чтение кампаний, создание сегментов (Python-3.9 совместим)
 # Зависимости:  pip install requests beautifulsoup4 python-dotenv
-import os, time, json, re
-from typing import Optional
+import codecs, os, time, json, re, threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Iterator, Optional
 
 import requests
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+import cassette
+import metrics
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from session_store import discard_cookies, load_cookies, save_cookies
+
 # ───────── конфиг ─────────
 load_dotenv()
 BASE = os.getenv("APPGROWTH_BASE_URL", "https://app.appgrowth.com")
 USER = os.getenv("APPGROWTH_USERNAME")
 PW   = os.getenv("APPGROWTH_PASSWORD")
 
-SESSION = requests.Session()
-SESSION.headers.update(
-    {
-        "User-Agent": "Mozilla/5.0 (AppGrowthBot)",
-        "Accept": "text/html,application/json",
-    }
+# Несколько сервисных аккаунтов: APPGROWTH_ACCOUNTS="user1:pass1 user2:pass2"
+# (через пробел/перевод строки); без него — один аккаунт USER/PW
+ACCOUNTS_SPEC = os.getenv("APPGROWTH_ACCOUNTS", "")
+# Минимальный интервал между запросами на один аккаунт
+ACCOUNT_MIN_INTERVAL = float(os.getenv("APPGROWTH_ACCOUNT_MIN_INTERVAL", "0.5"))
+# Сколько запросов один аккаунт может держать одновременно
+ACCOUNT_CONCURRENCY = int(os.getenv("APPGROWTH_ACCOUNT_CONCURRENCY", "2"))
+# CSRF-токен сессии переиспользуется столько секунд (при отказе берется свежий)
+CSRF_TTL_SECONDS = 1800
+# Сколько подряд ошибок выводят аккаунт из ротации и на сколько
+MAX_CONSECUTIVE_FAILURES = 3
+FAILURE_COOLDOWN_SECONDS = 60
+LOGIN_LOCKOUT_SECONDS = 900
+# Пауза перед повторной попыткой логина: LOGIN_RETRY_BACKOFF * номер попытки
+LOGIN_RETRY_BACKOFF = 3
+
+# Листинг /segments/ постранично: параметры страницы (auto — определить, off — один
+# большой ответ, "page,per_page" — задать явно), размер страницы и число параллельных запросов
+LISTING_PAGINATION = os.getenv("APPGROWTH_LISTING_PAGINATION", "auto")
+LISTING_PAGE_SIZE = int(os.getenv("APPGROWTH_LISTING_PAGE_SIZE", "500"))
+LISTING_CONCURRENCY = int(os.getenv("APPGROWTH_LISTING_CONCURRENCY", "4"))
+
+# Circuit breaker перед AppGrowth: при массовых ошибках/таймаутах запросы не идут,
+# пока пробный запрос не покажет, что сервис ожил
+BREAKER = CircuitBreaker(
+    "appgrowth",
+    slow_call_seconds=float(os.getenv("APPGROWTH_SLOW_CALL_SECONDS", "8")),
+    open_seconds=float(os.getenv("APPGROWTH_CIRCUIT_OPEN_SECONDS", "60")),
 )
 
-# ───────── авторизация ─────────
-def login(max_attempts: int = 3) -> bool:
-    for attempt in range(1, max_attempts + 1):
+# Сжатие ответов: brotli, если установлен пакет brotli (urllib3 его декодирует), иначе gzip
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip"
+except ImportError:
+    ACCEPT_ENCODING = "gzip"
+
+_ID_IN_PATH = re.compile(r"/\d+(?=/|$)")
+
+def _endpoint(r: requests.Response) -> str:
+    """"GET /segments/{id}/edit" — путь без query и id, чтобы счетчики не плодились"""
+    path = requests.utils.urlparse(r.url).path or "/"
+    return f"{r.request.method} {_ID_IN_PATH.sub('/{id}', path)}"
+
+def _count_transfer(r: requests.Response, *args, **kwargs) -> requests.Response:
+    """
+    Response hook: байты по сети (r.raw.tell(), до распаковки) против байтов
+    после распаковки — в metrics. Потоковые ответы считает _iter_text.
+    """
+    if kwargs.get("stream"):
+        return r
+    try:
+        decoded = len(r.content)  # тело читается здесь, а не сразу после хука
+        metrics.observe_transfer(_endpoint(r), r.raw.tell(), decoded, r.headers.get("Content-Encoding"))
+    except Exception:
+        pass  # учет байтов не должен ломать запрос
+    return r
+
+def _iter_text(r: requests.Response, chunk_size: int) -> Iterator[str]:
+    """Текст потокового ответа кусками; по окончании учитывает его байты (как _count_transfer)"""
+    decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+    decoded = 0
+    try:
+        for chunk in r.iter_content(chunk_size=chunk_size):
+            decoded += len(chunk)
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+    finally:
+        try:
+            metrics.observe_transfer(_endpoint(r), r.raw.tell(), decoded, r.headers.get("Content-Encoding"))
+        except Exception:
+            pass
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update(
+        {
+            "User-Agent": "Mozilla/5.0 (AppGrowthBot)",
+            "Accept": "text/html,application/json",
+            "Accept-Encoding": ACCEPT_ENCODING,
+        }
+    )
+    session.hooks["response"].append(_count_transfer)
+    # APPGROWTH_RECORD / APPGROWTH_REPLAY: запись обменов в кассету или ответы из нее (см. cassette.py)
+    return cassette.mount(session, _credentials())
+
+def _credentials() -> list:
+    """Логины и пароли всех аккаунтов — их вычищают из записанных кассет"""
+    values = [USER, PW]
+    for username, password in _parse_credentials(ACCOUNTS_SPEC):
+        values += [username, password]
+    return [v for v in values if v]
+
+class AppGrowthAccount:
+    """
+    Один сервисный аккаунт: своя сессия (cookie jar), свой CSRF-кэш,
+    свой бюджет запросов и учет здоровья.
+    """
+
+    def __init__(self, username: Optional[str], password: Optional[str]):
+        self.username = username
+        self.password = password
+        self.session = _new_session()
+        self.logged_in = False
+        self.csrf = None
+        self.csrf_at = 0.0
+        self.next_at = 0.0
+        self.inflight = 0
+        self.login_lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.disabled_until = 0.0
+        self.last_error = None
+        self.created = 0
+        self.failed = 0
+        self.pool = None
+
+    @property
+    def busy(self) -> bool:
+        return self.inflight >= ACCOUNT_CONCURRENCY
+
+    @property
+    def healthy(self) -> bool:
+        return time.time() >= self.disabled_until
+
+    def status(self) -> dict:
+        return {
+            "username": self.username,
+            "logged_in": self.logged_in,
+            "healthy": self.healthy,
+            "disabled_for": max(0, int(self.disabled_until - time.time())),
+            "consecutive_failures": self.consecutive_failures,
+            "created": self.created,
+            "failed": self.failed,
+            "last_error": self.last_error,
+        }
+
+    # ───────── авторизация ─────────
+    def login(self, max_attempts: int = 3) -> bool:
+        rejected = False
+        for attempt in range(1, max_attempts + 1):
+            if not BREAKER.is_closed and attempt > 1:
+                # AppGrowth недоступен — не тратим время на оставшиеся попытки
+                break
+            started = time.time()
+            try:
+                r = self.session.get(f"{BASE}/auth/", timeout=10)
+                r.raise_for_status()
+
+                soup = BeautifulSoup(r.text, "html.parser")
+                token = soup.find("input", attrs={"name": "csrf_token"})
+                if not token:
+                    raise ValueError("CSRF not found on /auth/")
+                csrf = token["value"]
+
+                payload = {
+                    "csrf_token": csrf,
+                    "username": self.username,
+                    "password": self.password,
+                    "remember": "y",
+                }
+                res = self.session.post(
+                    f"{BASE}/auth/",
+                    data=payload,
+                    allow_redirects=False,
+                    timeout=10,
+                )
+                if res.status_code >= 500 or res.status_code == 429:
+                    # AppGrowth перегружен или лежит — аккаунт не виноват, как и при сетевой ошибке
+                    raise requests.HTTPError(f"login status {res.status_code}")
+                BREAKER.record_success(time.time() - started)
+                if res.status_code == 302:
+                    print(f"✅  AppGrowth login OK ({self.username})")
+                    self.logged_in = True
+                    self.csrf = None
+                    self._save_session()
+                    return True
+                print(f"⚠️  Login status {res.status_code} ({self.username})")
+                # Отказ в логине — только форма, отрисованная заново (200)
+                rejected = rejected or res.status_code == 200
+            except Exception as e:
+                print(f"❌  Attempt {attempt} ({self.username}): {e}")
+                BREAKER.record_failure(time.time() - started, f"login: {e}")
+                if attempt < max_attempts:
+                    time.sleep(LOGIN_RETRY_BACKOFF * attempt)
+        self.logged_in = False
+        self.last_error = "login failed"
+        if rejected:
+            # Аккаунт, который не логинится (заблокирован / сменили пароль), убираем надолго;
+            # при недоступном AppGrowth аккаунт не виноват
+            self.disabled_until = time.time() + LOGIN_LOCKOUT_SECONDS
+        return False
+
+    # ───────── сохраненная сессия ─────────
+    def resume(self) -> bool:
+        """
+        Поднимает сохраненные cookies (логин с remember=y) и проверяет их одним
+        GET /segments/new: 200 — сессия жива (заодно кэшируем CSRF), редирект
+        на /auth — cookie отвергнут, нужен обычный login().
+        """
+        if not load_cookies(self.username, self.session.cookies):
+            return False
+        started = time.time()
+        try:
+            r = self.session.get(f"{BASE}/segments/new", timeout=10, allow_redirects=False)
+        except Exception as e:
+            BREAKER.record_failure(time.time() - started, f"session probe: {e}")
+            return False
+        if r.status_code >= 500:
+            BREAKER.record_failure(time.time() - started, f"session probe status {r.status_code}")
+            return False
+        BREAKER.record_success(time.time() - started)
+        if r.status_code == 200:
+            print(f"♻️  AppGrowth session restored ({self.username})")
+            self.logged_in = True
+            self.csrf = _find_csrf(r.text)
+            self.csrf_at = time.time()
+            self._save_session()
+            return True
+        print(f"🔑 Saved session rejected ({r.status_code}), logging in ({self.username})")
+        self.session.cookies.clear()
+        discard_cookies(self.username)
+        return False
+
+    def _save_session(self):
+        try:
+            save_cookies(self.username, self.session.cookies)
+        except Exception as e:
+            print(f"⚠️  Could not save session ({self.username}): {e}")
+
+    # ───────── CSRF кэш ─────────
+    def get_csrf(self, force: bool = False) -> Optional[str]:
+        """CSRF с формы /segments/new; кэшируется на CSRF_TTL_SECONDS."""
+        if not force and self.csrf and time.time() - self.csrf_at < CSRF_TTL_SECONDS:
+            return self.csrf
+        r = self.session.get(f"{BASE}/segments/new", timeout=10, allow_redirects=False)
+        if r.status_code in (301, 302, 303) and "/auth" in r.headers.get("Location", ""):
+            # Сессия протухла — перелогиниваемся один раз
+            if not self.login():
+                return None
+            r = self.session.get(f"{BASE}/segments/new", timeout=10)
+        r.raise_for_status()
+        self.csrf = _find_csrf(r.text)
+        self.csrf_at = time.time()
+        return self.csrf
+
+    def _record(self, ok: bool, error: Optional[str] = None, server_fault: bool = False,
+                started: Optional[float] = None, outage: Optional[bool] = None):
+        # Breaker считает только сбои самого AppGrowth (5xx, таймауты), не "уже существует"
+        elapsed = time.time() - started if started else 0.0
+        if server_fault if outage is None else outage:
+            BREAKER.record_failure(elapsed, error)
+        else:
+            BREAKER.record_success(elapsed)
+        if ok:
+            self.created += 1
+            self.consecutive_failures = 0
+            return
+        self.failed += 1
+        self.last_error = error
+        if server_fault:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                self.consecutive_failures = 0
+                # Последний здоровый аккаунт не выводим: когда сбоят все, это сбой AppGrowth — его ловит BREAKER
+                if self.pool is None or self.pool.has_other_healthy(self):
+                    print(f"🚫 Account {self.username} out of rotation for {FAILURE_COOLDOWN_SECONDS}s: {error}")
+                    self.disabled_until = time.time() + FAILURE_COOLDOWN_SECONDS
+
+    # ───────── создание сегмента ─────────
+    def create_segment(self, name, title, app, country, value=0.95, seg_type="ActiveUsers") -> bool:
+        print(f"🎯 Creating segment: {name}, type: {seg_type}, value: {value} ({self.username})")
+        started = time.time()
+
+        try:
+            # 1) CSRF из кэша аккаунта (GET /segments/new только при промахе)
+            csrf = self.get_csrf()
+            if not csrf:
+                print("❌ CSRF token not found")
+                self._record(False, "CSRF token not found", server_fault=True, started=started)
+                return False
+
+            # 2) Подготовка options в зависимости от типа сегмента
+            options = segment_options(seg_type, value, app, country)
+            print(f"🔧 Options: {options}")
+
+            for attempt in (1, 2):
+                # 3) payload
+                payload = {
+                    "csrf_token": csrf,
+                    "name": name,
+                    "title": title,
+                    "type": seg_type,
+                    "options": json.dumps(options),
+                }
+
+                print(f"📤 Payload: {payload}")
+
+                # 4) POST /segments/
+                res = self.session.post(
+                    f"{BASE}/segments/",
+                    data=payload,
+                    headers={"Content-Type": "application/x-www-form-urlencoded"},
+                    allow_redirects=False,
+                    timeout=15,
+                )
+                # 400 — устаревший CSRF: берем свежий и пробуем еще раз
+                if res.status_code == 400 and attempt == 1:
+                    print("♻️ CSRF rejected, refreshing")
+                    csrf = self.get_csrf(force=True)
+                    if csrf:
+                        continue
+                break
+
+            location = res.headers.get("Location", "")
+            success = res.status_code == 302 and "/auth" not in location
+            print(f"📊 Response status: {res.status_code}, success: {success}")
+
+            if not success:
+                # Check if it's a duplicate/existing segment error
+                if res.status_code == 302:
+                    print("❌ Session expired (redirected to login)")
+                    self.logged_in = False
+                    self.csrf = None
+                    self._record(False, "session expired", server_fault=True, started=started, outage=False)
+                elif res.status_code == 500:
+                    response_text = res.text[:500]
+                    if "already exists" in response_text.lower() or "duplicate" in response_text.lower():
+                        print(f"⚠️ Segment may already exist")
+                        self._record(False, "already exists", started=started)
+                    else:
+                        print(f"❌ Server error: {response_text}")
+                        self._record(False, f"server error {res.status_code}", server_fault=True, started=started)
+                else:
+                    print(f"❌ Response ({res.status_code}): {res.text[:500]}...")
+                    self._record(False, f"status {res.status_code}", server_fault=res.status_code >= 500, started=started)
+            else:
+                self._record(True, started=started)
+
+            return success
+
+        except Exception as e:
+            print(f"❌ Exception in create_segment: {e}")
+            self._record(False, str(e), server_fault=True, started=started)
+            return False
+
+    # ───────── действия над существующими сегментами ─────────
+    def segment_action(self, segment_id, action: str, data: Optional[dict] = None) -> tuple:
+        """
+        rebuild (POST /segments/<id>/rebuild), delete (DELETE /segments/<id>),
+        edit (POST /segments/<id>/edit с data). CSRF берется из кэша аккаунта.
+        Возвращает (ok, detail).
+        """
+        method, path = SEGMENT_ACTIONS[action]
+        url = f"{BASE}{path.format(id=segment_id)}"
+        started = time.time()
         try:
-            r = SESSION.get(f"{BASE}/auth/", timeout=10)
-            r.raise_for_status()
-
-            soup = BeautifulSoup(r.text, "html.parser")
-            token = soup.find("input", attrs={"name": "csrf_token"})
-            if not token:
-                raise ValueError("CSRF not found on /auth/")
-            csrf = token["value"]
-
-            payload = {
-                "csrf_token": csrf,
-                "username": USER,
-                "password": PW,
-                "remember": "y",
-            }
-            res = SESSION.post(
-                f"{BASE}/auth/",
-                data=payload,
-                allow_redirects=False,
-                timeout=10,
-            )
-            if res.status_code == 302:
-                print("✅  AppGrowth login OK")
-                return True
-            print(f"⚠️  Login status {res.status_code}")
+            csrf = self.get_csrf()
+            if not csrf:
+                self._record(False, "CSRF token not found", server_fault=True, started=started)
+                return False, "CSRF token not found"
+            for attempt in (1, 2):
+                res = self.session.request(
+                    method,
+                    url,
+                    data={"csrf_token": csrf, **(data or {})},
+                    headers={"X-CSRFToken": csrf},
+                    allow_redirects=False,
+                    timeout=15,
+                )
+                # 400 — устаревший CSRF: берем свежий и пробуем еще раз
+                if res.status_code == 400 and attempt == 1:
+                    csrf = self.get_csrf(force=True)
+                    if csrf:
+                        continue
+                break
+
+            location = res.headers.get("Location", "")
+            if res.status_code in (301, 302, 303) and "/auth" in location:
+                self.logged_in = False
+                self.csrf = None
+                self._record(False, "session expired", server_fault=True, started=started, outage=False)
+                return False, "session expired"
+            # edit, как и создание, успешен только редиректом; 200 — форма с ошибками валидации
+            ok_statuses = (302,) if action == "edit" else (200, 204, 301, 302, 303)
+            if res.status_code in ok_statuses:
+                self._record(True, started=started)
+                return True, SEGMENT_ACTION_DONE[action]
+            if action == "edit" and res.status_code == 200:
+                self._record(False, "edit rejected by the form", server_fault=False, started=started)
+                return False, "edit rejected by the form"
+            detail = "not found" if res.status_code == 404 else f"status {res.status_code}"
+            self._record(False, detail, server_fault=res.status_code >= 500, started=started)
+            return False, detail
         except Exception as e:
-            print(f"❌  Attempt {attempt}: {e}")
-            time.sleep(3 * attempt)
-    return False
+            print(f"❌ Exception in {action} {segment_id}: {e}")
+            self._record(False, str(e), server_fault=True, started=started)
+            return False, str(e)
+
+class SessionPool:
+    """
+    Пул независимо залогиненных аккаунтов. Каждый сегмент берет свободный
+    здоровый аккаунт с ближайшим бюджетом; аккаунты вне ротации пропускаются,
+    поэтому батч продолжает работать на оставшихся.
+    """
+
+    def __init__(self, accounts):
+        self.accounts = list(accounts)
+        self._cond = threading.Condition()
+        self._rr = 0
+        # Интервал между запросами одного аккаунта: callable -> секунды или None
+        # (батч ставит бюджет пиковых/непиковых часов); без него — ACCOUNT_MIN_INTERVAL
+        self.spacing = None
+        for account in self.accounts:
+            account.pool = self
+
+    def account_interval(self) -> float:
+        interval = self.spacing() if self.spacing else None
+        return ACCOUNT_MIN_INTERVAL if interval is None else interval
+
+    def has_other_healthy(self, account: AppGrowthAccount) -> bool:
+        return any(a.healthy for a in self.accounts if a is not account)
+
+    def login_all(self) -> bool:
+        results = [account.resume() or account.login() for account in self.accounts]
+        return any(results)
+
+    def acquire(self, timeout: float = 300) -> AppGrowthAccount:
+        """Берет аккаунт со свободным слотом (ждет бюджет); release() обязателен."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                now = time.time()
+                free = [a for a in self.accounts if not a.busy and a.healthy and a.logged_in]
+                if not free:
+                    # Никто не залогинен/здоров — пробуем тех, кто здоров, но без логина
+                    free = [a for a in self.accounts if not a.busy and a.healthy]
+                if free:
+                    # Round-robin среди аккаунтов с ближайшим бюджетом
+                    self._rr += 1
+                    free.sort(key=lambda a: (a.next_at, (self.accounts.index(a) - self._rr) % len(self.accounts)))
+                    account = free[0]
+                    wait = account.next_at - now
+                    if wait <= 0:
+                        account.inflight += 1
+                        account.next_at = now + self.account_interval()
+                        return account
+                elif not any(a.healthy for a in self.accounts):
+                    # Все аккаунты вне ротации — не ждем, падаем сразу
+                    if not BREAKER.is_closed:
+                        raise CircuitOpenError(BREAKER.name, BREAKER.retry_in())
+                    raise RuntimeError("no healthy AppGrowth account available")
+                else:
+                    # Все здоровые аккаунты заняты — ждем release()
+                    wait = 1.0
+                if now + wait > deadline:
+                    raise RuntimeError("no healthy AppGrowth account available")
+                self._cond.wait(min(wait, 1.0))
+
+    def release(self, account: AppGrowthAccount):
+        with self._cond:
+            account.inflight -= 1
+            self._cond.notify()
+
+    def call(self, method: str, failure, **kwargs):
+        """
+        Вызывает метод аккаунта на свободном аккаунте пула. Аккаунт, который
+        не смог залогиниться и выбыл из ротации, заменяется следующим;
+        failure — результат, если залогиниться не смог ни один. CircuitOpenError,
+        если AppGrowth сейчас считается недоступным.
+        """
+        for _ in range(len(self.accounts)):
+            account = self.acquire()
+            try:
+                BREAKER.before_call()
+                if not account.logged_in:
+                    with account.login_lock:
+                        if not account.logged_in and not account.resume() and not account.login():
+                            if account.healthy or not any(a.healthy for a in self.accounts):
+                                # Сбой сети (дальше решает breaker) или здоровых аккаунтов не осталось
+                                return failure
+                            print(f"🔁 {account.username} out of rotation, retrying on another account")
+                            continue
+                return getattr(account, method)(**kwargs)
+            finally:
+                self.release(account)
+        return failure
+
+    def create_segment(self, **kwargs) -> bool:
+        """Создает сегмент; CircuitOpenError, если AppGrowth сейчас считается недоступным"""
+        return self.call("create_segment", False, **kwargs)
+
+    def status(self) -> list:
+        return [account.status() for account in self.accounts]
+
+def _parse_credentials(spec: str) -> list:
+    credentials = []
+    for item in spec.split():
+        username, sep, password = item.partition(":")
+        if sep and username:
+            credentials.append((username, password))
+    return credentials
+
+def _parse_accounts(spec: str) -> list:
+    accounts = [AppGrowthAccount(username, password) for username, password in _parse_credentials(spec)]
+    return accounts or [AppGrowthAccount(USER, PW)]
+
+POOL = SessionPool(_parse_accounts(ACCOUNTS_SPEC))
+# Сессия первого аккаунта — для чтения (листинг, кампании) и старых скриптов
+SESSION = POOL.accounts[0].session
+
+# ───────── авторизация ─────────
+def login(max_attempts: int = 3) -> bool:
+    """
+    Логинит все аккаунты пула (сначала пробует сохраненную сессию);
+    True, если хотя бы один готов к работе.
+    """
+    if not BREAKER.allow():
+        print(f"⛔ AppGrowth circuit open, login skipped (retry in {BREAKER.retry_in():.0f}s)")
+        return False
+    return any([account.resume() or account.login(max_attempts) for account in POOL.accounts])
+
+def probe() -> bool:
+    """
+    Пробный запрос к AppGrowth (GET /auth/, ничего не меняет) — для
+    полуоткрытого breaker. True, если сервис отвечает.
+    """
+    if not BREAKER.allow():
+        return False
+    started = time.time()
+    try:
+        r = SESSION.get(f"{BASE}/auth/", timeout=10)
+        ok = r.status_code < 500
+        reason = f"probe status {r.status_code}"
+    except Exception as e:
+        ok, reason = False, f"probe: {e}"
+    if ok:
+        BREAKER.record_success(time.time() - started)
+    else:
+        BREAKER.record_failure(time.time() - started, reason)
+    print(f"🩺 AppGrowth probe: {'ok' if ok else reason}")
+    return ok
 
 # ───────── кампании (пример) ─────────
 def get_campaign_page(campaign_id: str) -> str:
@@ -62,6 +569,25 @@ def get_campaign_page(campaign_id: str) -> str:
     r.raise_for_status()
     return r.text
 
+def get_campaign_page_if_changed(campaign_id: str, etag: Optional[str] = None,
+                                 last_modified: Optional[str] = None) -> tuple:
+    """
+    Условный GET страницы кампании: (html или None, если 304 Not Modified, etag, last_modified).
+    Бросает PermissionError, если сессия разлогинена (редирект на /auth).
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    r = SESSION.get(f"{BASE}/campaigns/{campaign_id}", headers=headers, timeout=15, allow_redirects=False)
+    if r.status_code in (301, 302, 303) and "/auth" in r.headers.get("Location", ""):
+        raise PermissionError("AppGrowth session expired")
+    if r.status_code == 304:
+        return None, etag, last_modified
+    r.raise_for_status()
+    return r.text, r.headers.get("ETag"), r.headers.get("Last-Modified")
+
 def parse_campaign_info(html: str) -> dict:
     m = re.search(r"window\.__DATA__\s*=\s*({.+?});", html, re.S)
     if not m:
@@ -74,10 +600,212 @@ def parse_campaign_info(html: str) -> dict:
             "title": camp.get("title"),
             "status": camp.get("status") or camp.get("paused_reason"),
             "out_of_budget": camp.get("out_of_budget", False),
+            # Идентификатор приложения кампании (bundle ID / store id), если страница его отдает
+            "app": camp.get("bundle_id") or camp.get("app_id") or camp.get("app"),
         }
     except Exception:
         return {}
 
+# ───────── список сегментов ─────────
+# Колонки #segments-table на /segments/ (последняя — кнопки действий, пропускаем)
+SEGMENT_COLUMNS = (
+    "id", "name", "title", "type", "options", "size", "file_size",
+    "created", "updated", "active_campaigns", "installs", "profit", "profit_per_mb",
+)
+
+class SegmentTableParser(HTMLParser):
+    """
+    Потоковый парсер таблицы сегментов: feed() можно звать кусками,
+    готовые строки копятся в self.rows (забирать и очищать снаружи).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self.found_table = False
+        self._in_table = False
+        self._in_body = False
+        self._cells = None
+        self._text = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table" and ("id", "segments-table") in attrs:
+            self.found_table = self._in_table = True
+        elif not self._in_table:
+            return
+        elif tag == "tbody":
+            self._in_body = True
+        elif tag == "tr" and self._in_body:
+            self._cells = []
+        elif tag == "td" and self._cells is not None:
+            self._text = []
+        elif tag == "br" and self._text is not None:
+            self._text.append("\n")
+
+    def handle_endtag(self, tag):
+        if not self._in_table:
+            return
+        if tag == "td" and self._text is not None:
+            self._cells.append("".join(self._text).strip())
+            self._text = None
+        elif tag == "tr" and self._cells is not None:
+            if len(self._cells) >= len(SEGMENT_COLUMNS):
+                self.rows.append(_segment_row(self._cells))
+            self._cells = None
+        elif tag == "tbody":
+            self._in_body = False
+        elif tag == "table":
+            self._in_table = False
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+def _parse_options(text: str) -> dict:
+    options = {}
+    for line in text.split("\n"):
+        key, sep, value = line.strip().partition(":")
+        if sep and key:
+            options[key.strip()] = value.strip()
+    return options
+
+def _segment_row(cells: list) -> dict:
+    row = dict(zip(SEGMENT_COLUMNS, cells))
+    row["id"] = int(row["id"]) if row["id"].isdigit() else row["id"]
+    row["options"] = _parse_options(row["options"])
+    return row
+
+def parse_segments(html: str) -> list:
+    """Разбирает HTML страницы /segments/ в список словарей (см. SEGMENT_COLUMNS)."""
+    parser = SegmentTableParser()
+    parser.feed(html)
+    parser.close()
+    return parser.rows
+
+def iter_segments(timeout: int = 120) -> Iterator[dict]:
+    """
+    Строки листинга /segments/. Если сервер понимает постраничные параметры —
+    страницы качаются параллельно (LISTING_CONCURRENCY), иначе один потоковый
+    ответ. Бросает ValueError, если таблицы нет (например, сессия разлогинена).
+    """
+    params = listing_page_params()
+    if not params:
+        yield from _iter_segments_stream(timeout)
+        return
+    seen = set()
+    try:
+        for row in _iter_segments_paged(params, timeout):
+            seen.add(row["id"])
+            yield row
+    except Exception as e:
+        # Страница не пришла — дочитываем одним ответом, пропуская уже отданные строки
+        print(f"⚠️  Paged listing failed ({e}), falling back to the full listing")
+        _pagination_cache.clear()
+        for row in _iter_segments_stream(timeout):
+            if row["id"] not in seen:
+                yield row
+
+def _fetch_segments_page(params: tuple, page: int, timeout: int = 60) -> list:
+    page_param, size_param = params
+    r = SESSION.get(
+        f"{BASE}/segments/",
+        params={page_param: page, size_param: LISTING_PAGE_SIZE},
+        timeout=timeout,
+    )
+    r.raise_for_status()
+    parser = SegmentTableParser()
+    parser.feed(r.text)
+    parser.close()
+    if not parser.found_table:
+        raise ValueError("segments table not found on /segments/")
+    return parser.rows
+
+def _iter_segments_paged(params: tuple, timeout: int) -> Iterator[dict]:
+    """
+    Страницы пачками по LISTING_CONCURRENCY параллельно; строки отдаются по
+    порядку страниц. Короткая страница — последняя. Дубли (строки, съехавшие
+    между страницами при вставках) отбрасываются по id.
+    """
+    seen = set()
+    page = 1
+    with ThreadPoolExecutor(max_workers=LISTING_CONCURRENCY, thread_name_prefix="listing") as executor:
+        while True:
+            pages = range(page, page + LISTING_CONCURRENCY)
+            results = list(executor.map(lambda n: _fetch_segments_page(params, n, timeout), pages))
+            for rows in results:
+                for row in rows:
+                    if row["id"] not in seen:
+                        seen.add(row["id"])
+                        yield row
+                if len(rows) < LISTING_PAGE_SIZE:
+                    return
+            page += LISTING_CONCURRENCY
+
+# Кандидаты постраничных параметров (page, размер страницы)
+_PAGE_PARAM_CANDIDATES = (("page", "per_page"), ("page", "page_size"), ("page", "limit"))
+_pagination_cache = {}
+
+def listing_page_params() -> Optional[tuple]:
+    """
+    Параметры страниц, которые сервер действительно учитывает, или None.
+    Проверка: две страницы по 2 строки — обе не длиннее 2 и не пересекаются
+    (если параметры проигнорированы, читается только начало ответа).
+    Результат кэшируется на процесс.
+    """
+    if LISTING_PAGINATION == "off":
+        return None
+    if LISTING_PAGINATION != "auto":
+        page_param, _, size_param = LISTING_PAGINATION.partition(",")
+        return (page_param.strip(), size_param.strip() or "per_page")
+    if "params" not in _pagination_cache:
+        _pagination_cache["params"] = _detect_page_params()
+    return _pagination_cache["params"]
+
+def _peek_segment_ids(params: dict, limit: int) -> set:
+    """id первых строк ответа; читает не больше, чем нужно для limit + 1 строк"""
+    ids = set()
+    with SESSION.get(f"{BASE}/segments/", params=params, timeout=60, stream=True) as r:
+        r.raise_for_status()
+        parser = SegmentTableParser()
+        for chunk in _iter_text(r, 16 * 1024):
+            parser.feed(chunk)
+            ids.update(row["id"] for row in parser.rows)
+            parser.rows = []
+            if len(ids) > limit:
+                break
+        else:
+            parser.close()
+            ids.update(row["id"] for row in parser.rows)
+    return ids
+
+def _detect_page_params() -> Optional[tuple]:
+    for page_param, size_param in _PAGE_PARAM_CANDIDATES:
+        try:
+            first = _peek_segment_ids({page_param: 1, size_param: 2}, 2)
+            second = _peek_segment_ids({page_param: 2, size_param: 2}, 2)
+        except Exception as e:
+            print(f"⚠️  Listing pagination check failed: {e}")
+            return None
+        if 0 < len(first) <= 2 and len(second) <= 2 and not first & second:
+            print(f"📄 /segments/ honours ?{page_param}=&{size_param}=, listing is fetched in parallel pages")
+            return (page_param, size_param)
+    print("📄 /segments/ has no server-side paging, listing is fetched in one response")
+    return None
+
+def _iter_segments_stream(timeout: int = 120) -> Iterator[dict]:
+    with SESSION.get(f"{BASE}/segments/", timeout=timeout, stream=True) as r:
+        r.raise_for_status()
+        parser = SegmentTableParser()
+        for chunk in _iter_text(r, 64 * 1024):
+            parser.feed(chunk)
+            if parser.rows:
+                yield from parser.rows
+                parser.rows = []
+        parser.close()
+        yield from parser.rows
+        if not parser.found_table:
+            raise ValueError("segments table not found on /segments/")
+
 # ───────── CSRF утилита (новая regex) ─────────
 def _find_csrf(html: str) -> Optional[str]:
     """
@@ -90,7 +818,50 @@ def _find_csrf(html: str) -> Optional[str]:
     )
     return m.group(1) if m else None
 
+# ───────── действия над сегментами из листинга ─────────
+# Ссылки в колонке действий /segments/ (data-method): метод и путь
+SEGMENT_ACTIONS = {
+    "rebuild": ("POST", "/segments/{id}/rebuild"),
+    "delete": ("DELETE", "/segments/{id}"),
+    "edit": ("POST", "/segments/{id}/edit"),
+}
+SEGMENT_ACTION_DONE = {"rebuild": "rebuilt", "delete": "deleted", "edit": "updated"}
+
+def rebuild_segment(segment_id) -> tuple:
+    """Пересборка сегмента; (ok, detail). CircuitOpenError, если AppGrowth недоступен"""
+    return POOL.call("segment_action", (False, "login failed"), segment_id=segment_id, action="rebuild")
+
+def delete_segment(segment_id) -> tuple:
+    """Удаление сегмента; (ok, detail). CircuitOpenError, если AppGrowth недоступен"""
+    return POOL.call("segment_action", (False, "login failed"), segment_id=segment_id, action="delete")
+
+def edit_segment(segment_id, name: str, title: str, seg_type: str, options: dict) -> tuple:
+    """
+    Сохраняет форму /segments/<id>/edit с новыми name/title/options
+    (поля те же, что при создании); (ok, detail).
+    """
+    data = {"name": name, "title": title, "type": seg_type, "options": json.dumps(options)}
+    return POOL.call("segment_action", (False, "login failed"), segment_id=segment_id, action="edit", data=data)
+
 # ───────── создание сегмента (ИСПРАВЛЕНО) ─────────
+def segment_options(seg_type: str, value: float, app: str, country: str) -> dict:
+    """options сегмента в том виде, в каком их ждет форма AppGrowth."""
+    if seg_type == "RetainedAtLeast":
+        # Для RetainedAtLeast используем "age" (количество дней)
+        return {
+            "age": str(int(value)),
+            "app": app,
+            "flavor": "uid",
+            "country": country,
+        }
+    # Для ActiveUsers используем "audience" (соотношение)
+    return {
+        "app": app,
+        "flavor": "uid",
+        "country": country,
+        "audience": f"{value:.2f}",
+    }
+
 def create_segment(
     name: str,
     title: str,
@@ -100,7 +871,7 @@ def create_segment(
     seg_type: str = "ActiveUsers",
 ) -> bool:
     """
-    Создает сегмент в AppGrowth
+    Создает сегмент в AppGrowth через свободный аккаунт пула
     
     Args:
         name: Имя сегмента
@@ -110,73 +881,4 @@ def create_segment(
         value: Значение - для ActiveUsers: ratio (0.95), для RetainedAtLeast: дни (30)
         seg_type: Тип сегмента ("ActiveUsers" или "RetainedAtLeast")
     """
-    print(f"🎯 Creating segment: {name}, type: {seg_type}, value: {value}")
-    
-    try:
-        # 1) GET /segments/new  → CSRF (fresh token for each request)
-        r = SESSION.get(f"{BASE}/segments/new", timeout=10)
-        r.raise_for_status()
-        csrf = _find_csrf(r.text)
-        if not csrf:
-            print("❌ CSRF token not found")
-            return False
-
-        # 2) Подготовка options в зависимости от типа сегмента
-        if seg_type == "RetainedAtLeast":
-            # Для RetainedAtLeast используем "age" (количество дней)
-            options = {
-                "age": str(int(value)),
-                "app": app,
-                "flavor": "uid",
-                "country": country,
-            }
-        else:  # ActiveUsers
-            # Для ActiveUsers используем "audience" (соотношение)
-            options = {
-                "app": app,
-                "flavor": "uid", 
-                "country": country,
-                "audience": f"{value:.2f}",
-            }
-        
-        print(f"🔧 Options: {options}")
-
-        # 3) payload
-        payload = {
-            "csrf_token": csrf,
-            "name": name,
-            "title": title,
-            "type": seg_type,
-            "options": json.dumps(options),
-        }
-        
-        print(f"📤 Payload: {payload}")
-
-        # 4) POST /segments/
-        res = SESSION.post(
-            f"{BASE}/segments/",
-            data=payload,
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            allow_redirects=False,
-            timeout=15,
-        )
-        
-        success = res.status_code == 302
-        print(f"📊 Response status: {res.status_code}, success: {success}")
-        
-        if not success:
-            # Check if it's a duplicate/existing segment error
-            if res.status_code == 500:
-                response_text = res.text[:500]
-                if "already exists" in response_text.lower() or "duplicate" in response_text.lower():
-                    print(f"⚠️ Segment may already exist")
-                else:
-                    print(f"❌ Server error: {response_text}")
-            else:
-                print(f"❌ Response ({res.status_code}): {res.text[:500]}...")
-        
-        return success
-        
-    except Exception as e:
-        print(f"❌ Exception in create_segment: {e}")
-        return False
\ No newline at end of file
+    return POOL.create_segment(name=name, title=title, app=app, country=country, value=value, seg_type=seg_type)
@@ -0,0 +1,574 @@
+# batch.py — Segment creation batches: jobs go into the shared task queue, worker threads drain it
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+import appgrowth
+import shared_state
+from batch_schedule import WINDOWS, WorkerBudget, slack_time
+from circuit_breaker import CircuitOpenError
+from segment_catalog import CATALOG
+from results import spill_results
+from segment_plan import generate_segment_name
+from shutdown import SHUTDOWN
+from task_queue import (
+    CANCELLED, CREATED, DONE, FAILED, PARKED, UNFINISHED_STATES, VISIBILITY_TIMEOUT_SECONDS, open_queue,
+)
+
+logger = logging.getLogger(__name__)
+
+# Worker threads per process leasing segment tasks (default: one per AppGrowth account, at least 2)
+WORKER_THREADS = int(os.getenv("QUEUE_WORKERS", str(max(2, len(appgrowth.POOL.accounts)))))
+# Minimum spacing between segment creations across ALL workers and machines sharing the queue
+# (caps total load on AppGrowth; each account additionally has its own budget)
+APPGROWTH_MIN_INTERVAL = float(os.getenv(
+    "APPGROWTH_MIN_INTERVAL", str(appgrowth.ACCOUNT_MIN_INTERVAL / len(appgrowth.POOL.accounts))
+))
+# Off-peak (see batch_schedule.OFFPEAK_HOURS) the queue gets more workers and a tighter global spacing;
+# during peak hours it stays at QUEUE_WORKERS / APPGROWTH_MIN_INTERVAL so interactive AppGrowth use isn't starved
+PEAK_WORKER_THREADS = int(os.getenv("QUEUE_WORKERS_PEAK", str(WORKER_THREADS)))
+OFFPEAK_WORKER_THREADS = int(os.getenv("QUEUE_WORKERS_OFFPEAK", str(WORKER_THREADS * 2)))
+OFFPEAK_MIN_INTERVAL = float(os.getenv("APPGROWTH_MIN_INTERVAL_OFFPEAK", str(APPGROWTH_MIN_INTERVAL / 2)))
+# Each account's own spacing relaxes off-peak too, or a single account would cap the speedup at peak throughput
+OFFPEAK_ACCOUNT_MIN_INTERVAL = float(os.getenv(
+    "APPGROWTH_ACCOUNT_MIN_INTERVAL_OFFPEAK", str(appgrowth.ACCOUNT_MIN_INTERVAL / 2)
+))
+BUDGET = WorkerBudget(
+    WINDOWS, PEAK_WORKER_THREADS, OFFPEAK_WORKER_THREADS, APPGROWTH_MIN_INTERVAL, OFFPEAK_MIN_INTERVAL,
+    peak_account_interval=appgrowth.ACCOUNT_MIN_INTERVAL, offpeak_account_interval=OFFPEAK_ACCOUNT_MIN_INTERVAL,
+)
+# How often progress is posted
+PROGRESS_EVERY = 5
+# Idle poll interval when the queue is empty
+IDLE_POLL_SECONDS = 1.0
+# Finished jobs stay in `/appgrowth jobs` for this long
+RECENT_JOBS_SECONDS = 24 * 3600
+# Sibling worker processes report an interrupted job only once per shutdown
+INTERRUPT_REPORT_WINDOW = 120
+
+_wakeup = threading.Event()
+_inflight = {}  # owner -> task id, heartbeated while create_segment runs
+_inflight_lock = threading.Lock()
+_workers = []
+_loading = 0  # submit_segment_batch calls still streaming tasks into the queue
+_loading_cond = threading.Condition()
+
+
+def submit_segment_batch(client, channel_id, user_id, tasks, total=None, scope="", notes=None, run_at=0):
+    """
+    Queue a batch of (app_id, country, seg_type, value) tasks and return its job id.
+
+    tasks can be a lazy stream; it is written to the queue in chunks while
+    workers (on any machine sharing the queue) already start on it.
+    notes: optional callable returning text for the final message, called once tasks are exhausted
+    run_at: scheduled start (epoch seconds), 0 = now; the schedule lives in the queue and survives restarts
+    """
+    global _loading
+    queue = open_queue()
+    loaded = [0, False]  # tasks read, stopped by shutdown
+
+    def named():
+        for app_id, country, seg_type, value in tasks:
+            if SHUTDOWN.stopping.is_set():
+                loaded[1] = True
+                return
+            loaded[0] += 1
+            yield app_id, country, seg_type, value, generate_segment_name(app_id, country, seg_type, value)
+
+    with _loading_cond:
+        _loading += 1
+    try:
+        job_id = queue.create_job(channel_id, user_id, named(), total=total, scope=scope, run_at=run_at)
+        _wakeup.set()
+        job_notes = notes() if notes else ""
+        if loaded[1]:
+            job_notes = (job_notes + "\n\n" if job_notes else "") + \
+                f"⚠️ Loading was stopped by a bot restart after {loaded[0]} segments; the rest were not queued"
+        finished = queue.finish_loading(job_id, job_notes)
+    finally:
+        with _loading_cond:
+            _loading -= 1
+            _loading_cond.notify_all()
+    logger.info(f"📥 Job {job_id} queued: {queue.job(job_id)['total']} segments"
+                + (f", scheduled in {(run_at - time.time()) / 60:.0f} min" if run_at > time.time() else ""))
+    if finished:
+        post_job_summary(client, queue, finished)
+    else:
+        text = f"🆔 Job `{job_id}` — use `/appgrowth pause {job_id}` or `/appgrowth cancel {job_id}` to stop it"
+        if run_at > time.time():
+            text = f"🗓️ Job `{job_id}` scheduled for {slack_time(run_at)} — you'll get a message when it starts\n" \
+                   f"Use `/appgrowth cancel {job_id}` to drop it"
+        try:
+            client.chat_postEphemeral(channel=channel_id, user=user_id, text=text)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not post job id: {e}")
+    return job_id
+
+
+def list_jobs():
+    """Unfinished and recently finished jobs, each with its task counts"""
+    queue = open_queue()
+    jobs = queue.jobs(since=time.time() - RECENT_JOBS_SECONDS)
+    for job in jobs:
+        job["tasks"] = queue.task_counts(job["id"])
+    return jobs
+
+
+def get_job(job_id):
+    return open_queue().job(job_id)
+
+
+def pause_job(job_id, paused=True):
+    """Pause (or resume) a job: no new tasks are leased, in-flight ones finish; returns the job or None"""
+    job = open_queue().pause_job(job_id, paused)
+    if job is not None and not paused:
+        _wakeup.set()
+    return job
+
+
+def cancel_job(client, job_id):
+    """Cancel a job; the summary is posted once in-flight segments drain. Returns the job or None"""
+    queue = open_queue()
+    job, finished = queue.cancel_job(job_id)
+    if finished:
+        post_job_summary(client, queue, job)
+    return job
+
+
+def format_job_summary(queue, job):
+    """Final Slack message for a finished job"""
+    success_count = job["created"]
+    fail_count = job["failed"]
+    total = job["total"]
+    scope = job["scope"]
+    created_segments = queue.task_names(job["id"], CREATED, 20)
+    failed_segments = queue.task_names(job["id"], FAILED, 20)
+
+    if job["cancelled"]:
+        skipped = queue.task_counts(job["id"]).get(CANCELLED, 0)
+        msg = f"🛑 *Job `{job['id']}` cancelled*\n{scope}\n\n✅ Created: {success_count}\n❌ Failed: {fail_count}\n⏭️ Skipped: {skipped}"
+        if created_segments:
+            msg += "\n\n📋 Created segments:\n" + "\n".join([f"• `{name}`" for name in created_segments[:10]])
+            if success_count > 10:
+                msg += f"\n... and {success_count - 10} more"
+    elif success_count > 0 and fail_count == 0:
+        msg = f"🎉 *All {success_count} segments created successfully!*\n{scope}\n\n📋 Created segments:\n" + "\n".join([f"• `{name}`" for name in created_segments[:20]])
+        if success_count > 20:
+            msg += f"\n... and {success_count - 20} more"
+    elif success_count > 0 and fail_count > 0:
+        msg = f"⚠️ *Partially completed: {success_count}/{total} segments created*\n{scope}\n\n"
+        msg += f"✅ *Created ({success_count}):*\n" + "\n".join([f"• `{name}`" for name in created_segments[:10]])
+        if success_count > 10:
+            msg += f"\n... and {success_count - 10} more"
+        msg += f"\n\n❌ *Failed ({fail_count}):*\n" + "\n".join([f"• `{name}`" for name in failed_segments[:10]])
+        if fail_count > 10:
+            msg += f"\n... and {fail_count - 10} more"
+    else:
+        msg = f"❌ *Failed to create any segments ({total} total)*\n{scope}\n\n"
+        if failed_segments:
+            msg += f"📋 *Failed segments:*\n" + "\n".join([f"• `{name}`" for name in failed_segments[:20]])
+            if fail_count > 20:
+                msg += f"\n... and {fail_count - 20} more"
+        msg += f"\n\n🔧 *Possible reasons:*\n• Segments already exist\n• Invalid app ID\n• Server errors"
+
+    if job["notes"]:
+        msg += f"\n\n{job['notes']}"
+    if job["processed"] > 10:
+        msg += f"\n\n📄 Full list: `/appgrowth results {job['id']}`"
+    return msg
+
+
+def format_job_line(job):
+    """One line of `/appgrowth jobs` output"""
+    tasks = job.get("tasks", {})
+    if job["state"] == DONE:
+        icon, state = ("🛑", "cancelled") if job["cancelled"] else ("✅", "done")
+    elif job["cancelled"]:
+        icon, state = "🛑", "cancelling"
+    elif job["paused"]:
+        icon, state = "⏸️", "paused"
+    elif job["run_at"] > time.time():
+        icon, state = "🗓️", f"scheduled for {slack_time(job['run_at'])}"
+    elif tasks.get(PARKED):
+        icon, state = "🅿️", f"waiting for AppGrowth ({tasks[PARKED]} parked)"
+    else:
+        icon, state = "🔄", job["state"]
+    age = int((time.time() - job["created_at"]) / 60)
+    title = job["scope"].splitlines()[0] if job["scope"] else ""
+    return (
+        f"{icon} `{job['id']}` {state} — {job['processed']}/{job['total']} processed, "
+        f"{job['created']} created, {job['failed']} failed · <@{job['user']}> · {age} min ago"
+        + (f"\n      {title}" if title else "")
+    )
+
+
+def post_job_summary(client, queue, job):
+    msg = format_job_summary(queue, job)
+    try:
+        client.chat_postEphemeral(
+            channel=job["channel"],
+            user=job["user"],
+            text=msg,
+            blocks=[{"type": "section", "text": {"type": "mrkdwn", "text": msg}}]
+        )
+        logger.info(f"✅ Job {job['id']} completed: {job['created']} success, {job['failed']} failed")
+    finally:
+        _spill(queue, job)
+
+
+def _spill(queue, job):
+    try:
+        spill_results(queue, job)
+    except Exception as e:
+        logger.error(f"❌ Could not write results of job {job['id']}: {e}")
+
+
+class BatchWorker(threading.Thread):
+    """Leases segment tasks from the shared queue and creates them in AppGrowth"""
+
+    def __init__(self, client, ensure_login, index):
+        super().__init__(name=f"batch-worker-{index}", daemon=True)
+        self.client = client
+        self.ensure_login = ensure_login
+        self.index = index
+        self.owner = f"{shared_state.worker_id()}:{index}"
+        self.queue = open_queue()
+
+    def run(self):
+        while not SHUTDOWN.stopping.is_set():
+            workers, _ = BUDGET.current(time.time())
+            if self.index >= workers:
+                # Beyond the current budget (peak hours): stay idle
+                SHUTDOWN.stopping.wait(IDLE_POLL_SECONDS * 10)
+                continue
+            drained = []
+            try:
+                task = self.queue.lease(self.owner, drained=drained)
+            except Exception as e:
+                logger.error(f"❌ Lease error: {e}")
+                task = None
+            for job in drained:
+                # Closed because its last task's lease expired too often
+                try:
+                    post_job_summary(self.client, self.queue, job)
+                except Exception as e:
+                    logger.error(f"❌ Summary of job {job['id']} failed: {e}")
+            if task is None:
+                try:
+                    self.resume_parked()
+                except Exception as e:
+                    logger.error(f"❌ Resume of parked tasks failed: {e}")
+                _wakeup.wait(IDLE_POLL_SECONDS)
+                _wakeup.clear()
+                continue
+            try:
+                self.process(task)
+            except Exception as e:
+                logger.error(f"❌ Worker error on task {task.id}: {e}")
+
+    def process(self, task):
+        if task.starts_job:
+            self.announce_start(task.job_id)
+        if not appgrowth.BREAKER.is_closed:
+            self.park(task, appgrowth.BREAKER.retry_in())
+            return
+        if not self.ensure_login():
+            if not appgrowth.BREAKER.is_closed:
+                # Login failed because AppGrowth is down, not because of credentials
+                self.park(task, appgrowth.BREAKER.retry_in())
+                return
+            job = self.queue.abort_job(task.job_id, "AppGrowth authorization error")
+            if job is None:
+                return
+            msg = "❌ *AppGrowth authorization error*\n🔧 Please try again later"
+            try:
+                self.client.chat_postEphemeral(channel=job["channel"], user=job["user"], text=msg)
+            finally:
+                _spill(self.queue, job)
+            return
+
+        # Global pacing shared through the queue store, tighter off-peak
+        _, interval = BUDGET.current(time.time())
+        time.sleep(self.queue.reserve_rate_slot("appgrowth_create", interval))
+
+        if SHUTDOWN.stopping.is_set():
+            # Not started yet: leave it for the next process instead of racing the kill timeout
+            self.queue.release(task, self.owner)
+            return
+
+        # Cooperative pause/cancel check between segment calls
+        stopped = self.queue.checkpoint(task, self.owner)
+        if stopped is not None:
+            job, finished = stopped
+            if finished:
+                post_job_summary(self.client, self.queue, job)
+            return
+
+        with _inflight_lock:
+            _inflight[self.owner] = task.id
+        try:
+            logger.info(f"🎯 Creating segment: {task.name}")
+            ok = appgrowth.create_segment(
+                name=task.name,
+                title=task.app,
+                app=task.app,
+                country=task.country,
+                value=task.value,
+                seg_type=task.seg_type
+            )
+            error = None
+        except CircuitOpenError as e:
+            self.park(task, e.retry_in)
+            return
+        except Exception as e:
+            ok, error = False, str(e)
+            logger.error(f"❌ Exception creating {task.name}: {e}")
+        finally:
+            with _inflight_lock:
+                _inflight.pop(self.owner, None)
+
+        if not ok and not appgrowth.BREAKER.is_closed:
+            # This failure tripped the circuit: retry the task later along with the rest
+            self.park(task, appgrowth.BREAKER.retry_in())
+            return
+        if ok:
+            CATALOG.add(task.name)
+            logger.info(f"✅ Created: {task.name}")
+        elif error is None:
+            logger.error(f"❌ Failed: {task.name} (probably already exists or server error)")
+
+        job, finished = self.queue.complete(task, self.owner, ok, error)
+        if job is None:
+            return
+        if finished:
+            post_job_summary(self.client, self.queue, job)
+        elif job["processed"] % PROGRESS_EVERY == 0 and not job["cancelled"]:
+            try:
+                of_total = f"/{job['total']}" if job["state"] != "loading" else ""
+                self.client.chat_postEphemeral(
+                    channel=job["channel"],
+                    user=job["user"],
+                    text=f"🔄 Progress: {job['processed']}{of_total} processed, {job['created']} created so far..."
+                )
+            except:
+                pass
+
+    def announce_start(self, job_id):
+        job = self.queue.job(job_id)
+        if job is None:
+            return
+        logger.info(f"▶️ Scheduled job {job_id} started: {job['total']} segments")
+        try:
+            self.client.chat_postEphemeral(
+                channel=job["channel"],
+                user=job["user"],
+                text=f"▶️ *Scheduled job `{job_id}` started* — {job['total']} segments\n{job['scope']}\n"
+                     f"You'll get the summary when it finishes."
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not post start notice for {job_id}: {e}")
+
+    def park(self, task, retry_in):
+        """Hold back the rest of the job while AppGrowth is unavailable and tell the user once"""
+        reason = f"AppGrowth unavailable ({appgrowth.BREAKER.last_reason})"
+        job, parked, first = self.queue.park(task, self.owner, reason)
+        if not first or job is None:
+            return
+        logger.warning(f"⏸️ Job {job['id']}: {parked} tasks parked, {reason}")
+        try:
+            self.client.chat_postEphemeral(
+                channel=job["channel"],
+                user=job["user"],
+                text=f"⏸️ *AppGrowth is not responding — batch paused*\n"
+                     f"{job['created']} created so far, {parked} remaining segments are parked.\n"
+                     f"🔄 They will be retried automatically once AppGrowth recovers (next check in ~{retry_in:.0f}s)."
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not post park notice: {e}")
+
+    def resume_parked(self):
+        """Idle workers probe AppGrowth while tasks are parked and resume them when it answers"""
+        if appgrowth.BREAKER.retry_in() > 0 or not self.queue.has_parked():
+            return
+        if not appgrowth.probe():
+            return
+        for job, count in self.queue.unpark_all():
+            logger.info(f"▶️ Job {job['id']}: resuming {count} parked tasks")
+            _wakeup.set()
+            try:
+                self.client.chat_postEphemeral(
+                    channel=job["channel"],
+                    user=job["user"],
+                    text=f"▶️ AppGrowth is back — resuming {count} parked segments..."
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Could not post resume notice: {e}")
+
+
+def _heartbeat_loop():
+    queue = open_queue()
+    while not SHUTDOWN.stopping.is_set():
+        time.sleep(VISIBILITY_TIMEOUT_SECONDS / 3)
+        with _inflight_lock:
+            held = dict(_inflight)
+        for owner, task_id in held.items():
+            try:
+                queue.heartbeat([task_id], owner)
+            except Exception as e:
+                logger.warning(f"⚠️ Heartbeat failed for {owner}: {e}")
+
+
+# ───────── shutdown: drain, checkpoint, report ─────────
+def _checkpoint_dir():
+    return os.path.join(shared_state.STATE_DIR, "checkpoints")
+
+
+def write_checkpoint(queue, job):
+    """
+    Save a job's remaining work as STATE_DIR/checkpoints/<job id>.json,
+    compacted to one entry per (app, type, value) with its countries.
+    """
+    groups = {}
+    for app_id, country, seg_type, value in queue.remaining_tasks(job["id"]):
+        groups.setdefault((app_id, seg_type, value), []).append(country)
+    checkpoint = {
+        "job": {key: job[key] for key in ("id", "channel", "user", "scope", "total", "created", "failed", "run_at")},
+        "written_at": time.time(),
+        "remaining": [
+            {"app": app_id, "seg_type": seg_type, "value": value, "countries": countries}
+            for (app_id, seg_type, value), countries in groups.items()
+        ],
+    }
+    os.makedirs(_checkpoint_dir(), exist_ok=True)
+    path = os.path.join(_checkpoint_dir(), f"{job['id']}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+    return sum(len(entry["countries"]) for entry in checkpoint["remaining"])
+
+
+def _drain(deadline):
+    """Let in-flight segment calls and task loading finish, at most until deadline"""
+    _wakeup.set()
+    for worker in _workers:
+        worker.join(max(0.0, deadline - time.monotonic()))
+    with _loading_cond:
+        while _loading and time.monotonic() < deadline:
+            _loading_cond.wait(deadline - time.monotonic())
+    with _inflight_lock:
+        stuck = dict(_inflight)
+    if stuck:
+        logger.warning(f"⚠️ {len(stuck)} segment calls still running at the deadline; their leases will expire and be retried")
+    # Sibling processes on this machine are draining too: report once their leases are back
+    queue = open_queue()
+    host = f"{socket.gethostname()}:"
+    while queue.leased_count(host) > len(stuck) and time.monotonic() < deadline:
+        time.sleep(0.2)
+
+
+def _report_interrupted(client):
+    """Checkpoint every unfinished job and tell its owner exactly how far it got"""
+    queue = open_queue()
+    for job in queue.jobs(since=time.time()):
+        if job["state"] == DONE or job["cancelled"]:
+            continue
+        if not queue.mark_interrupted(job["id"], INTERRUPT_REPORT_WINDOW):
+            continue
+        job = queue.job(job["id"])
+        remaining = write_checkpoint(queue, job)
+        logger.info(f"💾 Job {job['id']} checkpointed: {job['processed']}/{job['total']} processed, {remaining} remaining")
+        paused = " (paused)" if job["paused"] else ""
+        try:
+            client.chat_postEphemeral(
+                channel=job["channel"],
+                user=job["user"],
+                text=f"⏹️ *Bot is restarting — job `{job['id']}`{paused} interrupted*\n"
+                     f"✅ Created: {job['created']}/{job['total']}\n"
+                     f"❌ Failed: {job['failed']}\n"
+                     f"⏳ Remaining: {remaining} (saved, the job continues when the bot is back)"
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not post interruption notice for {job['id']}: {e}")
+
+
+def resume_interrupted(client):
+    """
+    On start: announce jobs that continue after a restart, and re-queue
+    checkpoints whose job is missing from the queue (e.g. the store was lost).
+    """
+    queue = open_queue()
+    for job in queue.claim_interrupted():
+        remaining = sum(n for status, n in queue.task_counts(job["id"]).items() if status in UNFINISHED_STATES)
+        try:
+            client.chat_postEphemeral(
+                channel=job["channel"],
+                user=job["user"],
+                text=f"▶️ Bot is back — job `{job['id']}` continues: {job['created']}/{job['total']} created, {remaining} remaining"
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not post resume notice for {job['id']}: {e}")
+
+    directory = _checkpoint_dir()
+    if not os.path.isdir(directory):
+        return
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        path = os.path.join(directory, filename)
+        claimed = f"{path}.{os.getpid()}.restoring"
+        try:
+            os.rename(path, claimed)  # one process per checkpoint
+        except FileNotFoundError:
+            continue
+        try:
+            with open(claimed) as f:
+                checkpoint = json.load(f)
+            old = checkpoint["job"]
+            if queue.job(old["id"]) is None and checkpoint["remaining"]:
+                tasks = [
+                    (entry["app"], country, entry["seg_type"], entry["value"])
+                    for entry in checkpoint["remaining"] for country in entry["countries"]
+                ]
+                scope = f"♻️ Restored from checkpoint of job `{old['id']}` ({old['created']} created before the restart)\n{old['scope']}"
+                run_at = old.get("run_at", 0) if old.get("run_at", 0) > time.time() else 0
+                job_id = submit_segment_batch(
+                    client, old["channel"], old["user"], tasks, total=len(tasks), scope=scope, run_at=run_at
+                )
+                logger.info(f"♻️ Checkpoint {old['id']} restored as job {job_id}: {len(tasks)} segments")
+        except Exception as e:
+            # Keep the remaining work: set aside (not retried on every start), rename to .json to retry
+            os.replace(claimed, f"{path}.failed")
+            logger.error(f"❌ Could not restore checkpoint {filename}, kept as {filename}.failed: {e}")
+        else:
+            # Restored, or nothing to restore (job still in the queue / no remaining tasks)
+            os.remove(claimed)
+
+
+def start_workers(client, ensure_login, threads=max(PEAK_WORKER_THREADS, OFFPEAK_WORKER_THREADS)):
+    """Start this process's queue workers and lease heartbeat (idempotent)"""
+    if _workers:
+        return
+    # Per-account spacing follows the peak/off-peak budget
+    appgrowth.POOL.spacing = lambda: BUDGET.account_interval(time.time())
+    for index in range(threads):
+        worker = BatchWorker(client, ensure_login, index)
+        worker.start()
+        _workers.append(worker)
+    threading.Thread(target=_heartbeat_loop, name="lease-heartbeat", daemon=True).start()
+    logger.info(
+        f"👷 Started {threads} batch workers ({PEAK_WORKER_THREADS} active at peak, "
+        f"{OFFPEAK_WORKER_THREADS} off-peak: {WINDOWS.describe()})"
+    )
+
+    @SHUTDOWN.on_shutdown
+    def drain_and_checkpoint(deadline):
+        _drain(deadline)
+        _report_interrupted(client)
+
+    try:
+        resume_interrupted(client)
+    except Exception as e:
+        logger.error(f"❌ Resuming interrupted jobs failed: {e}")
@@ -0,0 +1,146 @@
+# batch_schedule.py — Off-peak windows for scheduled batches and the worker budget for peak/off-peak hours
+import datetime
+import logging
+import os
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9: windows are read in UTC
+    ZoneInfo = ZoneInfoNotFoundError = None
+
+logger = logging.getLogger(__name__)
+
+# Daily off-peak hours "start-end" (20-8 = 20:00 to 08:00); empty: no daily window
+OFFPEAK_HOURS = os.getenv("OFFPEAK_HOURS", "20-8")
+# Saturdays and Sundays are off-peak all day
+OFFPEAK_WEEKENDS = os.getenv("OFFPEAK_WEEKENDS", "1") not in ("0", "false", "no", "")
+# IANA time zone the hours are read in (the team's working hours)
+OFFPEAK_TIMEZONE = os.getenv("OFFPEAK_TIMEZONE", "UTC")
+# A scheduled time can be at most this far ahead
+MAX_SCHEDULE_AHEAD_SECONDS = 7 * 24 * 3600
+
+
+def parse_hours(spec):
+    """'20-8' -> (20, 8); None when empty"""
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    start, _, end = spec.partition("-")
+    start, end = int(start), int(end)
+    if not (0 <= start <= 24 and 0 <= end <= 24) or start == end:
+        raise ValueError(f"invalid off-peak hours {spec!r}, expected e.g. 20-8")
+    return start % 24, end % 24
+
+
+def _timezone(name):
+    if ZoneInfo is None or name.upper() == "UTC":
+        return datetime.timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"⚠️ Unknown OFFPEAK_TIMEZONE {name!r}, using UTC")
+        return datetime.timezone.utc
+
+
+class OffPeakWindows:
+    """When AppGrowth is quiet: daily hours plus (optionally) whole weekends"""
+
+    def __init__(self, hours=OFFPEAK_HOURS, weekends=OFFPEAK_WEEKENDS, timezone=OFFPEAK_TIMEZONE):
+        self.hours = parse_hours(hours)
+        self.weekends = weekends
+        self.tz = _timezone(timezone)
+
+    def is_offpeak(self, ts):
+        local = datetime.datetime.fromtimestamp(ts, self.tz)
+        if self.weekends and local.weekday() >= 5:
+            return True
+        if self.hours is None:
+            return False
+        start, end = self.hours
+        if start < end:
+            return start <= local.hour < end
+        return local.hour >= start or local.hour < end
+
+    def next_start(self, ts):
+        """ts itself when already off-peak, else the start of the next window (None if there is none)"""
+        if self.is_offpeak(ts):
+            return ts
+        # Windows start on whole local hours: step hour by hour, at most a week ahead
+        local = datetime.datetime.fromtimestamp(ts, self.tz).replace(minute=0, second=0, microsecond=0)
+        for _ in range(7 * 24):
+            local += datetime.timedelta(hours=1)
+            candidate = local.timestamp()
+            if self.is_offpeak(candidate):
+                return candidate
+        return None
+
+    def describe(self):
+        parts = []
+        if self.hours:
+            parts.append(f"{self.hours[0]:02d}:00–{self.hours[1]:02d}:00")
+        if self.weekends:
+            parts.append("weekends")
+        return " and ".join(parts) + f" ({self.tz})" if parts else "none"
+
+
+class WorkerBudget:
+    """
+    How many batch workers may lease tasks and how closely creations may
+    follow each other (globally and on one account), depending on whether
+    it is off-peak right now.
+    """
+
+    def __init__(self, windows, peak_workers, offpeak_workers, peak_interval, offpeak_interval,
+                 peak_account_interval=None, offpeak_account_interval=None):
+        self.windows = windows
+        self.peak_workers = peak_workers
+        self.offpeak_workers = offpeak_workers
+        self.peak_interval = peak_interval
+        self.offpeak_interval = offpeak_interval
+        self.peak_account_interval = peak_account_interval
+        self.offpeak_account_interval = offpeak_account_interval
+
+    def current(self, ts):
+        """(active workers, min interval between creations) at ts"""
+        if self.windows.is_offpeak(ts):
+            return self.offpeak_workers, self.offpeak_interval
+        return self.peak_workers, self.peak_interval
+
+    def account_interval(self, ts):
+        """Min interval between two calls on one AppGrowth account at ts (None: the pool's default)"""
+        if self.windows.is_offpeak(ts):
+            return self.offpeak_account_interval
+        return self.peak_account_interval
+
+
+def parse_run_at(mode, picked, now, windows):
+    """
+    Start time for a batch from the modal's "When" choice: 0 for now, the
+    next off-peak start, or the picked timestamp. ValueError with a
+    user-facing message when the choice can't be scheduled.
+    """
+    if mode in (None, "now"):
+        return 0
+    if mode == "offpeak":
+        start = windows.next_start(now)
+        if start is None:
+            raise ValueError("No off-peak window is configured")
+        return start
+    if mode == "at":
+        if not picked:
+            raise ValueError("Pick a date and time")
+        if picked <= now:
+            raise ValueError("The time is in the past")
+        if picked > now + MAX_SCHEDULE_AHEAD_SECONDS:
+            raise ValueError("Schedule at most 7 days ahead")
+        return float(picked)
+    raise ValueError(f"Unknown start option {mode!r}")
+
+
+def slack_time(ts):
+    """Timestamp rendered in each reader's own time zone by Slack"""
+    fallback = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    return f"<!date^{int(ts)}^{{date_short_pretty}} {{time}}|{fallback}>"
+
+
+WINDOWS = OffPeakWindows()
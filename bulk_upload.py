@@ -0,0 +1,160 @@
+# bulk_upload.py — Streamed CSV/TSV batch input (app, country, type) uploaded to Slack
+import csv
+import logging
+
+import requests
+
+from countries import ALL_VALID_COUNTRY_CODES
+from segment_plan import SEGMENT_TYPE_VALUES, parse_segment_type
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FILETYPES = ("csv", "tsv")
+# First column names accepted in a header row
+APP_HEADERS = ("app", "app_id", "bundle_id")
+# How many invalid rows are quoted verbatim in the summary
+MAX_INVALID_EXAMPLES = 5
+# Tasks shown in the confirmation prompt before a batch is queued
+PREVIEW_TASKS = 5
+
+
+class UploadSummary:
+    """Compact accounting of rows read from an upload: counters plus a few examples"""
+
+    def __init__(self):
+        self.rows = 0
+        self.tasks = 0
+        self.invalid = {}  # reason -> count
+        self.examples = []  # (line_no, reason, raw)
+
+    def reject(self, line_no, reason, raw):
+        self.invalid[reason] = self.invalid.get(reason, 0) + 1
+        if len(self.examples) < MAX_INVALID_EXAMPLES:
+            self.examples.append((line_no, reason, raw))
+
+    @property
+    def invalid_count(self):
+        return sum(self.invalid.values())
+
+    def format(self):
+        """Slack mrkdwn summary of invalid rows; empty string when everything was valid"""
+        if not self.invalid:
+            return ""
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(self.invalid.items()))
+        text = f"🚫 *Skipped {self.invalid_count}/{self.rows} invalid rows* ({reasons})"
+        for line_no, reason, raw in self.examples:
+            text += f"\n• line {line_no}: `{raw[:80]}` — {reason}"
+        if self.invalid_count > len(self.examples):
+            text += f"\n... and {self.invalid_count - len(self.examples)} more"
+        return text
+
+
+def iter_upload_tasks(lines, summary):
+    """
+    Parse CSV/TSV lines lazily into (app_id, country, seg_type, value) tasks.
+
+    Columns are app, country, type. The delimiter is taken from the first line
+    (tab → TSV, otherwise comma) and a header row is skipped. Type is a segment
+    type value ("RetainedAtLeast_7", "ActiveUsers_0.95") or "all" for all five.
+    Invalid rows are recorded in summary and skipped.
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    delimiter = "\t" if "\t" in first else ","
+
+    def all_lines():
+        yield first
+        yield from lines
+
+    for line_no, row in enumerate(csv.reader(all_lines(), delimiter=delimiter), start=1):
+        cells = [cell.strip() for cell in row]
+        if not any(cells):
+            continue
+        if line_no == 1 and cells[0].lower() in APP_HEADERS:
+            continue
+
+        summary.rows += 1
+        raw = delimiter.join(row)
+        if len(cells) < 3:
+            summary.reject(line_no, "missing columns", raw)
+            continue
+
+        app_id, country, seg_type_value = cells[0], cells[1].upper(), cells[2]
+        if len(app_id) < 5 or any(ch.isspace() for ch in app_id):
+            summary.reject(line_no, "bad app id", raw)
+            continue
+        if country not in ALL_VALID_COUNTRY_CODES:
+            summary.reject(line_no, "bad country", raw)
+            continue
+
+        if seg_type_value.lower() == "all":
+            type_values = SEGMENT_TYPE_VALUES
+        elif seg_type_value in SEGMENT_TYPE_VALUES:
+            type_values = (seg_type_value,)
+        else:
+            summary.reject(line_no, "bad type", raw)
+            continue
+
+        for type_value in type_values:
+            seg_type, value = parse_segment_type(type_value)
+            summary.tasks += 1
+            yield app_id, country, seg_type, value
+
+
+def is_batch_upload(file_info):
+    """True for Slack files the bot should treat as a batch upload"""
+    filetype = (file_info.get("filetype") or "").lower()
+    name = (file_info.get("name") or "").lower()
+    return filetype in UPLOAD_FILETYPES or name.endswith((".csv", ".tsv"))
+
+
+def is_direct_message(channel_id):
+    """True for a DM with the bot (Slack IM channel ids start with D)"""
+    return (channel_id or "").startswith("D")
+
+
+def has_upload_header(line):
+    """True when the first line is an explicit app,country,type header (required outside DMs)"""
+    delimiter = "\t" if "\t" in line else ","
+    row = next(csv.reader([line.lstrip("\ufeff")], delimiter=delimiter), [])
+    cells = [cell.strip().lower() for cell in row]
+    return len(cells) >= 3 and cells[0] in APP_HEADERS and cells[1:3] == ["country", "type"]
+
+
+def scan_upload(lines, summary, preview=PREVIEW_TASKS):
+    """Read a whole upload for the confirmation prompt: counts go to summary, the first tasks are returned"""
+    first = []
+    for task in iter_upload_tasks(lines, summary):
+        if len(first) < preview:
+            first.append(task)
+    return first
+
+
+def format_upload_confirmation(name, summary, preview):
+    """Slack mrkdwn prompt asking the uploader to confirm the batch"""
+    text = f"📎 *`{name}`: {summary.tasks} segments from {summary.rows} rows*"
+    if preview:
+        text += "\n" + "\n".join(
+            f"• `{app_id}` · {country} · {seg_type} {value}" for app_id, country, seg_type, value in preview
+        )
+        if summary.tasks > len(preview):
+            text += f"\n... and {summary.tasks - len(preview)} more"
+    report = summary.format()
+    if report:
+        text += f"\n\n{report}"
+    return text
+
+
+def iter_slack_file_lines(url, token, timeout=30):
+    """Stream a private Slack file line by line without buffering it in memory"""
+    with requests.get(url, headers={"Authorization": f"Bearer {token}"}, stream=True, timeout=timeout) as r:
+        r.raise_for_status()
+        if r.headers.get("Content-Type", "").startswith("text/html"):
+            # Slack serves a login page instead of the file when files:read is missing
+            raise ValueError("Slack returned HTML instead of the file (check files:read scope)")
+        r.encoding = r.encoding or "utf-8"
+        for line in r.iter_lines(decode_unicode=True):
+            if line is not None:
+                yield line.lstrip("\ufeff")
@@ -0,0 +1,230 @@
+# campaign_watch.py — Background watcher of AppGrowth campaigns: budget/status changes → Slack alerts
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import appgrowth
+import shared_state
+from known_apps import KNOWN_APPS
+from shutdown import SHUTDOWN
+
+logger = logging.getLogger(__name__)
+
+# Campaign ids to watch (comma/space separated); the watcher is off when empty
+WATCH_CAMPAIGNS = os.getenv("WATCH_CAMPAIGNS", "")
+# Slack channel for alerts
+WATCH_CHANNEL = os.getenv("WATCH_CHANNEL")
+CAMPAIGN_POLL_SECONDS = float(os.getenv("CAMPAIGN_POLL_SECONDS", "300"))
+# Campaign pages fetched at the same time
+CAMPAIGN_CONCURRENCY = int(os.getenv("CAMPAIGN_CONCURRENCY", "4"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    status TEXT,
+    out_of_budget INTEGER,
+    etag TEXT,
+    last_modified TEXT,
+    checked_at REAL,
+    changed_at REAL,
+    app TEXT
+);
+CREATE TABLE IF NOT EXISTS poller (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    until REAL NOT NULL
+);
+"""
+
+
+def parse_campaign_ids(spec):
+    return list(dict.fromkeys(item for item in re.split(r"[\s,]+", spec or "") if item))
+
+
+def describe_change(campaign_id, before, after):
+    """Slack text for a state transition, None when nothing alert-worthy changed"""
+    title = f"*{after.get('title') or campaign_id}* (#{campaign_id})"
+    if before["out_of_budget"] != after["out_of_budget"]:
+        if after["out_of_budget"]:
+            return f"💸 Campaign {title} is out of budget"
+        return f"✅ Campaign {title} has budget again"
+    if before["status"] != after["status"]:
+        return f"🔄 Campaign {title}: status `{before['status']}` → `{after['status']}`"
+    return None
+
+
+class CampaignWatcher:
+    """
+    Polls the watched campaign pages with conditional GETs (ETag /
+    Last-Modified), keeps the last seen state in STATE_DIR/campaigns.db and
+    posts to Slack only when a campaign's budget or status changes. One
+    worker process polls per cycle (a lease row in the same database).
+    """
+
+    def __init__(self, client, channel, campaign_ids, ensure_login,
+                 interval=CAMPAIGN_POLL_SECONDS, concurrency=CAMPAIGN_CONCURRENCY):
+        self.client = client
+        self.channel = channel
+        self.campaign_ids = campaign_ids
+        self.ensure_login = ensure_login
+        self.interval = interval
+        self.concurrency = concurrency
+        self.owner = shared_state.worker_id()
+        db = self._db()
+        db.executescript(_SCHEMA)
+        # Stores created before campaign apps were kept
+        if "app" not in {row[1] for row in db.execute("PRAGMA table_info(campaigns)")}:
+            db.execute("ALTER TABLE campaigns ADD COLUMN app TEXT")
+
+    def _db(self):
+        return shared_state.connect("campaigns")
+
+    # ───────── state ─────────
+    def state(self, campaign_id):
+        row = self._db().execute(
+            "SELECT title, status, out_of_budget, etag, last_modified FROM campaigns WHERE id = ?",
+            (campaign_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        title, status, out_of_budget, etag, last_modified = row
+        return {"title": title, "status": status, "out_of_budget": bool(out_of_budget),
+                "etag": etag, "last_modified": last_modified}
+
+    def _save(self, campaign_id, info, etag, last_modified, changed):
+        now = time.time()
+        self._db().execute(
+            "INSERT INTO campaigns (id, title, status, out_of_budget, etag, last_modified, checked_at, changed_at, app) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+            "title = excluded.title, status = excluded.status, out_of_budget = excluded.out_of_budget, "
+            "etag = excluded.etag, last_modified = excluded.last_modified, checked_at = excluded.checked_at, "
+            "changed_at = CASE WHEN ? THEN excluded.changed_at ELSE campaigns.changed_at END, "
+            "app = COALESCE(excluded.app, campaigns.app)",
+            (campaign_id, info["title"], info["status"], int(info["out_of_budget"]),
+             etag, last_modified, now, now, info.get("app"), changed),
+        )
+        KNOWN_APPS.add(info.get("app"))
+
+    def _touch(self, campaign_id):
+        self._db().execute("UPDATE campaigns SET checked_at = ? WHERE id = ?", (time.time(), campaign_id))
+
+    def claim_cycle(self):
+        """True if this worker polls this cycle (lease held by at most one worker)"""
+        now = time.time()
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT owner, until FROM poller WHERE name = 'campaigns'").fetchone()
+            claimed = row is None or row[0] == self.owner or row[1] < now
+            if claimed:
+                db.execute(
+                    "INSERT INTO poller (name, owner, until) VALUES ('campaigns', ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, until = excluded.until",
+                    (self.owner, now + self.interval * 1.5),
+                )
+            db.execute("COMMIT")
+            return claimed
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def release_cycle(self):
+        """Give up the lease if this worker holds it, so another worker polls next cycle"""
+        self._db().execute("DELETE FROM poller WHERE name = 'campaigns' AND owner = ?", (self.owner,))
+
+    # ───────── polling ─────────
+    def check(self, campaign_id):
+        """Fetch one campaign if it changed; returns the alert text or None"""
+        before = self.state(campaign_id)
+        etag, last_modified = (before["etag"], before["last_modified"]) if before else (None, None)
+        try:
+            html, etag, last_modified = appgrowth.get_campaign_page_if_changed(campaign_id, etag, last_modified)
+        except PermissionError:
+            if not self.ensure_login():
+                raise
+            html, etag, last_modified = appgrowth.get_campaign_page_if_changed(campaign_id, etag, last_modified)
+        if html is None:
+            self._touch(campaign_id)
+            return None
+        info = appgrowth.parse_campaign_info(html)
+        if not info:
+            raise ValueError("campaign data not found on the page")
+        if before is None:
+            # First sighting: remember the state, alert only if it already needs attention
+            self._save(campaign_id, info, etag, last_modified, changed=True)
+            return describe_change(campaign_id, {"status": info["status"], "out_of_budget": False}, info)
+        alert = describe_change(campaign_id, before, info)
+        self._save(campaign_id, info, etag, last_modified, changed=alert is not None)
+        return alert
+
+    def poll_once(self):
+        """One cycle over every watched campaign; returns (alerts, errors)"""
+        alerts, errors = [], 0
+
+        def check(campaign_id):
+            try:
+                return self.check(campaign_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Campaign {campaign_id} check failed: {e}")
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="campaign") as executor:
+            for result in executor.map(check, self.campaign_ids):
+                if isinstance(result, Exception):
+                    errors += 1
+                elif result:
+                    alerts.append(result)
+        for text in alerts:
+            self.post(text)
+        logger.info(f"📡 Campaign watch: {len(self.campaign_ids)} checked, {len(alerts)} alerts, {errors} errors")
+        return alerts, errors
+
+    def post(self, text):
+        try:
+            self.client.chat_postMessage(channel=self.channel, text=text)
+        except Exception as e:
+            logger.error(f"❌ Could not post campaign alert: {e}")
+
+    def run_cycle(self):
+        """One iteration of run(); True if this worker polled"""
+        if not appgrowth.BREAKER.is_closed:
+            # The breaker is per process: don't sit on the shared lease while ours is open
+            logger.info("⏸️ Campaign watch skipped: AppGrowth circuit open")
+            self.release_cycle()
+            return False
+        if not self.claim_cycle():
+            return False
+        self.poll_once()
+        return True
+
+    def run(self):
+        while not SHUTDOWN.stopping.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                logger.error(f"❌ Campaign watch cycle failed: {e}")
+            if SHUTDOWN.stopping.wait(self.interval):
+                return
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="campaign-watch", daemon=True)
+        thread.start()
+        return thread
+
+
+def start_campaign_watcher(client, ensure_login):
+    """Start the watcher when WATCH_CAMPAIGNS and WATCH_CHANNEL are configured"""
+    campaign_ids = parse_campaign_ids(WATCH_CAMPAIGNS)
+    if not campaign_ids:
+        return None
+    if not WATCH_CHANNEL:
+        logger.warning("⚠️ WATCH_CAMPAIGNS is set without WATCH_CHANNEL, campaign watch is off")
+        return None
+    watcher = CampaignWatcher(client, WATCH_CHANNEL, campaign_ids, ensure_login)
+    watcher.start()
+    logger.info(f"📡 Watching {len(campaign_ids)} campaigns every {watcher.interval:.0f}s")
+    return watcher
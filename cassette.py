@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Record AppGrowth HTTP exchanges into a cassette and serve them back offline.
+
+Recording (APPGROWTH_RECORD=path.jsonl) mounts a transport adapter on every
+AppGrowth session that appends each exchange (one JSON line: request,
+response, timing) with credentials, cookies and CSRF tokens scrubbed.
+Replay (APPGROWTH_REPLAY=path.jsonl) answers from the cassette instead of
+the network, after the recorded duration scaled by APPGROWTH_REPLAY_SPEED
+(1 = as recorded, 0 = instantly), so parsers and batches can be measured
+against real payloads and timings without AppGrowth.
+
+    python cassette.py stats segments.jsonl
+    python cassette.py bench segments.jsonl --repeat 20
+    python loadtest.py --server gunicorn --mix submission=1 --cassette batch.jsonl
+"""
+import argparse
+import base64
+import collections
+import io
+import json
+import logging
+import os
+import re
+import statistics
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+logger = logging.getLogger(__name__)
+
+RECORD_PATH = os.getenv("APPGROWTH_RECORD")
+REPLAY_PATH = os.getenv("APPGROWTH_REPLAY")
+REPLAY_SPEED = float(os.getenv("APPGROWTH_REPLAY_SPEED", "1"))
+
+SCRUBBED = "scrubbed"
+# Form / query fields whose values never reach a cassette
+SECRET_FIELDS = {"username", "password", "csrf_token"}
+SECRET_HEADERS = {"cookie", "authorization", "x-csrftoken"}
+# The body is stored decoded, so framing headers of the original response don't apply to it
+_DROPPED_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+_CSRF_VALUE = re.compile(r'(name=["\']csrf_token["\'][^>]*value=["\'])[^"\']+(["\'])')
+_SET_COOKIE_VALUE = re.compile(r"^([^=;]+)=[^;]*")
+_ID_IN_PATH = re.compile(r"/\d+(?=/|$)")
+
+
+# ───────── scrubbing ─────────
+def _scrub_pairs(pairs):
+    return [(key, SCRUBBED if key in SECRET_FIELDS else value) for key, value in pairs]
+
+
+def scrub_url(url):
+    """Path and query of a URL (the host is not recorded), secret query values replaced"""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(_scrub_pairs(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    return parts.path + (f"?{query}" if query else "")
+
+
+def scrub_text(text, secrets=()):
+    text = _CSRF_VALUE.sub(rf"\g<1>{SCRUBBED}\g<2>", text)
+    for secret in secrets:
+        text = text.replace(secret, SCRUBBED)
+    return text
+
+
+def _scrub_request_body(request, secrets):
+    body = request.body
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    if not isinstance(body, str):
+        return "<stream>"
+    if "application/x-www-form-urlencoded" in request.headers.get("Content-Type", ""):
+        body = urllib.parse.urlencode(_scrub_pairs(urllib.parse.parse_qsl(body, keep_blank_values=True)))
+    return scrub_text(body, secrets)
+
+
+def _scrub_response_headers(headers):
+    scrubbed = {}
+    for name, value in headers.items():
+        lower = name.lower()
+        if lower in _DROPPED_RESPONSE_HEADERS:
+            continue
+        if lower == "set-cookie":
+            value = _SET_COOKIE_VALUE.sub(rf"\g<1>={SCRUBBED}", value)
+        scrubbed[name] = value
+    return scrubbed
+
+
+def _key(method, url):
+    return method.upper(), url
+
+
+def _loose_key(method, url):
+    # Segment ids differ between recording and replay runs: match /segments/{id}/edit on any id
+    path, _, query = url.partition("?")
+    return method.upper(), _ID_IN_PATH.sub("/{id}", path) + (f"?{query}" if query else "")
+
+
+# ───────── recording ─────────
+class RecordingAdapter(HTTPAdapter):
+    """
+    Sends requests as usual and appends every exchange to the cassette.
+    The body is read here, so streamed responses are buffered while recording.
+    """
+
+    def __init__(self, path, secrets=(), **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        # Very short values would mangle unrelated text
+        self.secrets = [s for s in secrets if s and len(s) >= 4]
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        elapsed = time.perf_counter() - started  # headers received
+        body = response.content
+        duration = time.perf_counter() - started
+        try:
+            self.write(self.exchange(request, response, body, elapsed, duration))
+        except Exception:
+            pass  # a broken cassette must not break the request
+        return response
+
+    def exchange(self, request, response, body, elapsed, duration):
+        entry = {
+            "method": request.method,
+            "url": scrub_url(request.url),
+            "request": {
+                "headers": {
+                    name: SCRUBBED if name.lower() in SECRET_HEADERS else value
+                    for name, value in request.headers.items()
+                },
+                "body": _scrub_request_body(request, self.secrets),
+            },
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": _scrub_response_headers(response.headers),
+            "content_encoding": response.headers.get("Content-Encoding"),
+            "wire_bytes": response.raw.tell() if hasattr(response.raw, "tell") else len(body),
+            "elapsed": round(elapsed, 4),
+            "duration": round(duration, 4),
+            "recorded_at": round(time.time(), 3),
+        }
+        try:
+            entry["body"] = scrub_text(body.decode("utf-8"), self.secrets)
+        except UnicodeDecodeError:
+            entry["body_b64"] = base64.b64encode(body).decode()
+        return entry
+
+    def write(self, entry):
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode()
+        with self._lock:
+            # One write() per exchange on an O_APPEND file: processes recording together don't interleave lines
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+
+# ───────── replay ─────────
+def load_cassette(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _body(entry):
+    if "body_b64" in entry:
+        return base64.b64decode(entry["body_b64"])
+    return (entry.get("body") or "").encode("utf-8")
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    Answers from a cassette: exchanges are matched by method and path+query
+    (any segment id as a fallback) and served in recorded order, wrapping
+    around when a request is repeated more often than it was recorded.
+    Unmatched requests fail like a network error.
+    """
+
+    def __init__(self, entries, speed=REPLAY_SPEED, **kwargs):
+        super().__init__(**kwargs)
+        self.speed = speed
+        self._exact = collections.defaultdict(list)
+        self._loose = collections.defaultdict(list)
+        for entry in entries:
+            self._exact[_key(entry["method"], entry["url"])].append(entry)
+            self._loose[_loose_key(entry["method"], entry["url"])].append(entry)
+        self._next = collections.Counter()
+        self._lock = threading.Lock()
+
+    def match(self, request):
+        url = scrub_url(request.url)
+        for index, key in ((self._exact, _key(request.method, url)), (self._loose, _loose_key(request.method, url))):
+            entries = index.get(key)
+            if entries:
+                with self._lock:
+                    position = self._next[key]
+                    self._next[key] += 1
+                return entries[position % len(entries)]
+        return None
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        entry = self.match(request)
+        if entry is None:
+            raise requests.ConnectionError(f"no recorded exchange for {request.method} {scrub_url(request.url)}", request=request)
+        if self.speed > 0:
+            time.sleep(entry.get("duration", 0) * self.speed)
+        raw = HTTPResponse(
+            body=io.BytesIO(_body(entry)),
+            headers=entry.get("headers", {}),
+            status=entry["status"],
+            reason=entry.get("reason"),
+            preload_content=False,
+            decode_content=False,
+            request_method=request.method,
+        )
+        return self.build_response(request, raw)
+
+    def close(self):
+        pass
+
+
+# ───────── wiring ─────────
+_adapter = None
+_adapter_lock = threading.Lock()
+
+
+def transport_adapter(secrets=()):
+    """The shared record/replay adapter configured by the environment, or None"""
+    global _adapter
+    if not (REPLAY_PATH or RECORD_PATH):
+        return None
+    with _adapter_lock:
+        if _adapter is None:
+            if REPLAY_PATH:
+                _adapter = ReplayAdapter(load_cassette(REPLAY_PATH))
+                logger.info(f"📼 Replaying AppGrowth traffic from {REPLAY_PATH} (speed ×{REPLAY_SPEED:g})")
+            else:
+                _adapter = RecordingAdapter(RECORD_PATH, secrets)
+                logger.warning(f"📼 Recording AppGrowth traffic to {RECORD_PATH}")
+        return _adapter
+
+
+def mount(session, secrets=()):
+    """Route the session through the record/replay adapter when one is configured"""
+    adapter = transport_adapter(secrets)
+    if adapter is not None:
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    return session
+
+
+# ───────── offline analysis ─────────
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def stats(entries):
+    """Per endpoint: count, p50/p95 duration and body size"""
+    groups = collections.defaultdict(list)
+    for entry in entries:
+        groups[" ".join(_loose_key(entry["method"], entry["url"].partition("?")[0]))].append(entry)
+    report = {}
+    for endpoint, group in sorted(groups.items()):
+        durations = [e.get("duration", 0) for e in group]
+        report[endpoint] = {
+            "count": len(group),
+            "p50_s": round(_percentile(durations, 0.5), 4),
+            "p95_s": round(_percentile(durations, 0.95), 4),
+            "body_kib": round(statistics.mean(len(_body(e)) for e in group) / 1024, 1),
+            "wire_kib": round(statistics.mean(e.get("wire_bytes", 0) for e in group) / 1024, 1),
+        }
+    return report
+
+
+def bench(entries, repeat=10):
+    """Time the HTML parsers over every recorded body they apply to"""
+    import appgrowth
+
+    parsers = {
+        "parse_segments": (re.compile(r"^/segments/(\?|$)"), appgrowth.parse_segments),
+        "parse_campaign_info": (re.compile(r"^/campaigns/\d+"), appgrowth.parse_campaign_info),
+        "find_csrf": (re.compile(r"^/(auth|segments/new)"), appgrowth._find_csrf),
+    }
+    report = {}
+    for name, (pattern, parse) in parsers.items():
+        bodies = [
+            _body(e).decode("utf-8", "replace") for e in entries
+            if e["method"] == "GET" and e["status"] == 200 and pattern.match(e["url"])
+        ]
+        if not bodies:
+            continue
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for html in bodies:
+                parse(html)
+            timings.append(time.perf_counter() - started)
+        size = sum(len(html) for html in bodies)
+        best = min(timings)
+        report[name] = {
+            "bodies": len(bodies),
+            "mib": round(size / 2**20, 2),
+            "best_ms": round(best * 1000, 2),
+            "median_ms": round(statistics.median(timings) * 1000, 2),
+            "mib_per_s": round(size / 2**20 / best, 1) if best else None,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["stats", "bench"])
+    parser.add_argument("cassette")
+    parser.add_argument("--repeat", type=int, default=10, help="bench: runs per parser")
+    args = parser.parse_args()
+    entries = load_cassette(args.cassette)
+    result = stats(entries) if args.command == "stats" else bench(entries, args.repeat)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
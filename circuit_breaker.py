@@ -0,0 +1,132 @@
+# circuit_breaker.py — Fail fast while a dependency (AppGrowth) is down
+import threading
+import time
+from collections import deque
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the dependency while the circuit is open"""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} circuit is open, retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Sliding-window circuit breaker.
+
+    The circuit opens when, over the last `window` calls (at least `min_calls`),
+    the failure rate reaches `failure_rate` or the share of calls slower than
+    `slow_call_seconds` reaches `slow_rate`. After `open_seconds` it lets
+    `half_open_probes` trial calls through: a success closes it, a failure
+    reopens it with the open period doubled (up to `max_open_seconds`).
+    """
+
+    def __init__(self, name, window=20, min_calls=5, failure_rate=0.5,
+                 slow_call_seconds=8.0, slow_rate=0.8, open_seconds=60,
+                 max_open_seconds=600, half_open_probes=1, clock=time.monotonic):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)  # (failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._open_for = open_seconds
+        self._probes = 0
+        self.last_reason = None
+
+    # ───────── gate ─────────
+    def allow(self):
+        """True if a call may go through now (claims a probe slot when half-open)"""
+        with self._lock:
+            if self._state == OPEN:
+                if self.clock() - self._opened_at < self._open_for:
+                    return False
+                self._state = HALF_OPEN
+                self._probes = 0
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    return False
+                self._probes += 1
+            return True
+
+    def before_call(self):
+        """allow() or raise CircuitOpenError"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_in())
+
+    # ───────── outcomes ─────────
+    def record_success(self, elapsed=0.0):
+        self._record(False, elapsed)
+
+    def record_failure(self, elapsed=0.0, reason=None):
+        self._record(True, elapsed, reason)
+
+    def _record(self, failed, elapsed, reason=None):
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if failed or slow:
+                    self._open(min(self._open_for * 2, self.max_open_seconds), reason or "probe failed")
+                else:
+                    self._state = CLOSED
+                    self._open_for = self.open_seconds
+                    self._calls.clear()
+                return
+            if self._state == OPEN:
+                return  # late result of a call started before the circuit opened
+            self._calls.append((failed, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._calls if f)
+            slow_calls = sum(1 for _, s in self._calls if s)
+            if failures / len(self._calls) >= self.failure_rate:
+                self._open(self.open_seconds, reason or f"{failures}/{len(self._calls)} calls failed")
+            elif slow_calls / len(self._calls) >= self.slow_rate:
+                self._open(self.open_seconds, f"{slow_calls}/{len(self._calls)} calls slower than {self.slow_call_seconds:.0f}s")
+
+    def _open(self, seconds, reason):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._open_for = seconds
+        self._calls.clear()
+        self.last_reason = reason
+
+    # ───────── reads ─────────
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self.clock() - self._opened_at >= self._open_for:
+                return HALF_OPEN
+            return self._state
+
+    @property
+    def is_closed(self):
+        return self.state == CLOSED
+
+    def retry_in(self):
+        """Seconds until the next probe is allowed (0 unless open)"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._open_for - (self.clock() - self._opened_at))
+
+    def status(self):
+        return {
+            "state": self.state,
+            "retry_in": round(self.retry_in()),
+            "reason": self.last_reason,
+        }
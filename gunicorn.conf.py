@@ -0,0 +1,46 @@
+# gunicorn.conf.py — Production serving of app:flask_app
+#
+#   gunicorn app:flask_app              (config is picked up from this file)
+#   kill -HUP <master pid>              graceful reload: new workers start, old ones finish requests
+#
+# Segment batches run on background threads inside a worker. On SIGTERM each
+# worker finishes its HTTP requests, then worker_exit drains in-flight
+# AppGrowth calls and checkpoints unfinished jobs (shutdown.py). That must fit
+# in graceful_timeout, which must fit in Fly's kill_timeout (fly.toml).
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+
+# gthread: each worker serves `threads` requests concurrently; Slack handlers
+# mostly wait on network I/O, so threads are cheaper than extra processes.
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Backpressure: at most this many open connections per worker, the rest
+# queue in the listen backlog instead of piling up threads.
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "64"))
+backlog = int(os.getenv("GUNICORN_BACKLOG", "256"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+# SHUTDOWN_DRAIN_SECONDS (default 20) < graceful_timeout < kill_timeout (30s)
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "25"))
+keepalive = 5
+
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_worker_init(worker):
+    # Every worker has its own AppGrowth session and background threads
+    import app
+    app.start_background_tasks()
+
+
+def worker_exit(server, worker):
+    # Runs in the worker after its request loop stopped (SIGTERM, reload, max_requests)
+    app = sys.modules.get("app")
+    if app is not None:
+        app.stop_background_tasks("worker exit")
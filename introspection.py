@@ -0,0 +1,153 @@
+# introspection.py — Threads, RSS and allocation growth of the running worker (tracemalloc snapshot diffs)
+import collections
+import gc
+import logging
+import os
+import re
+import resource
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# Frames kept per allocation by tracemalloc (0 disables tracing); 1 keeps the overhead low
+TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+# How often a snapshot is taken and diffed against the previous one
+SNAPSHOT_SECONDS = float(os.getenv("MEMORY_SNAPSHOT_SECONDS", "300"))
+TOP_SITES = 15
+# RSS samples kept (one per snapshot: 48 × 5 min = 4 h)
+RSS_HISTORY = 48
+
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+def rss_bytes():
+    """Current resident set size (Linux /proc), falling back to the peak from getrusage"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def thread_summary():
+    """Live threads grouped by name with trailing numbers stripped (Thread-12 → Thread)"""
+    groups = collections.Counter()
+    daemons = 0
+    threads = threading.enumerate()
+    for thread in threads:
+        groups[re.sub(r"[-_ ]?\(?\d+\)?$", "", thread.name) or thread.name] += 1
+        daemons += thread.daemon
+    return {"count": len(threads), "daemon": daemons, "by_name": dict(groups.most_common())}
+
+
+def _site(stat):
+    frame = stat.traceback[0]
+    filename = frame.filename
+    if filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return f"{filename}:{frame.lineno}"
+
+
+class MemoryWatch:
+    """
+    Takes a tracemalloc snapshot every `interval` seconds and keeps the top
+    allocation sites by growth since the previous snapshot and since the
+    first one, plus an RSS history, so slow leaks show up as the same sites
+    growing snapshot after snapshot.
+    """
+
+    def __init__(self, interval=SNAPSHOT_SECONDS, frames=TRACE_FRAMES):
+        self.interval = interval
+        self.frames = frames
+        self.rss = collections.deque(maxlen=RSS_HISTORY)
+        self.growth = []
+        self.growth_since_start = []
+        self.snapshot_at = None
+        self._baseline = None
+        self._previous = None
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, stopping):
+        """Background loop until the `stopping` event is set"""
+        if self.frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        thread = threading.Thread(target=self._loop, args=(stopping,), name="memory-watch", daemon=True)
+        thread.start()
+        return thread
+
+    def _loop(self, stopping):
+        while True:
+            try:
+                self.take_snapshot()
+            except Exception as e:
+                logger.warning(f"⚠️ Memory snapshot failed: {e}")
+            if stopping.wait(self.interval):
+                return
+
+    def take_snapshot(self):
+        rss = rss_bytes()
+        self.rss.append((round(time.time()), rss))
+        if not self.tracing:
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+        )
+        with self._lock:
+            if self._baseline is None:
+                self._baseline = snapshot
+            if self._previous is not None:
+                self.growth = self._top(snapshot.compare_to(self._previous, "lineno"))
+            self.growth_since_start = self._top(snapshot.compare_to(self._baseline, "lineno"))
+            self._previous = snapshot
+            self.snapshot_at = round(time.time())
+        traced, peak = tracemalloc.get_traced_memory()
+        logger.info(f"🧠 RSS {rss / 2**20:.0f} MiB, traced {traced / 2**20:.1f} MiB (peak {peak / 2**20:.1f} MiB)")
+
+    @staticmethod
+    def _top(diff):
+        growing = [stat for stat in diff if stat.size_diff > 0]
+        return [
+            {"site": _site(stat), "size_diff_kib": round(stat.size_diff / 1024, 1),
+             "count_diff": stat.count_diff, "size_kib": round(stat.size / 1024, 1)}
+            for stat in growing[:TOP_SITES]
+        ]
+
+    def report(self):
+        with self._lock:
+            memory = {
+                "rss_mib": round(rss_bytes() / 2**20, 1),
+                "rss_history_mib": [(t, round(rss / 2**20, 1)) for t, rss in self.rss],
+                "tracing": self.tracing,
+            }
+            if self.tracing:
+                traced, peak = tracemalloc.get_traced_memory()
+                memory.update({
+                    "traced_mib": round(traced / 2**20, 1),
+                    "traced_peak_mib": round(peak / 2**20, 1),
+                    "snapshot_at": self.snapshot_at,
+                    "top_growth": self.growth,
+                    "top_growth_since_start": self.growth_since_start,
+                })
+        memory["gc"] = {"counts": gc.get_count(), "uncollectable": len(gc.garbage)}
+        return memory
+
+
+def count_instances(*types):
+    """Live objects of the given classes, by class name (walks the GC heap: on demand only)"""
+    counts = collections.Counter()
+    for obj in gc.get_objects():
+        if isinstance(obj, types):
+            counts[type(obj).__name__] += 1
+    return dict(counts)
+
+
+WATCH = MemoryWatch()
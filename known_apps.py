@@ -0,0 +1,93 @@
+# known_apps.py — App identifiers AppGrowth already knows (from segment options and campaigns), for bundle-ID validation
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import shared_state
+
+logger = logging.getLogger(__name__)
+
+# "1523297725_iOS" tags also stand for the bare store id
+_PLATFORM_SUFFIX = re.compile(r"_(ios|android)$", re.I)
+
+
+def row_apps(row):
+    """App identifiers a listing row vouches for: its app and tag options"""
+    options = row.get("options") or {}
+    for key in ("app", "tag"):
+        value = (options.get(key) or "").strip()
+        if value:
+            yield value
+            bare = _PLATFORM_SUFFIX.sub("", value)
+            if bare != value:
+                yield bare
+
+
+def campaign_apps():
+    """Apps of the campaigns seen by the campaign watcher (empty when it never ran)"""
+    if not os.path.exists(os.path.join(shared_state.STATE_DIR, "campaigns.db")):
+        return set()
+    try:
+        rows = shared_state.connect("campaigns").execute("SELECT DISTINCT app FROM campaigns WHERE app IS NOT NULL").fetchall()
+    except sqlite3.OperationalError:
+        return set()
+    return {app for (app,) in rows if app}
+
+
+class KnownApps:
+    """
+    Set of known app identifiers, rebuilt on every segment catalog refresh
+    (background thread) and swapped in whole, so lookups on the Slack ack
+    path are a single frozenset membership test.
+    """
+
+    def __init__(self):
+        self._apps = frozenset()
+        self._lock = threading.Lock()
+        self.updated_at = None
+
+    @property
+    def loaded(self):
+        return self.updated_at is not None
+
+    def __len__(self):
+        return len(self._apps)
+
+    def __contains__(self, app_id):
+        return app_id in self._apps
+
+    def unknown(self, bundle_ids):
+        """The given IDs that are not known; nothing is rejected before the first load or for an empty account"""
+        apps = self._apps
+        if not apps:
+            return []
+        return [app_id for app_id in bundle_ids if app_id not in apps]
+
+    def replace(self, apps):
+        with self._lock:
+            self._apps = frozenset(apps)
+            self.updated_at = time.time()
+
+    def add(self, app_id):
+        if app_id and app_id not in self._apps:
+            with self._lock:
+                self._apps = self._apps | {app_id}
+
+    def collect(self, rows):
+        """Pass listing rows through and swap in the apps they name once the listing is complete"""
+        apps = set()
+        for row in rows:
+            apps.update(row_apps(row))
+            yield row
+        try:
+            apps |= campaign_apps()
+        except Exception as e:
+            logger.warning(f"⚠️ Campaign apps unavailable: {e}")
+        self.replace(apps)
+
+
+# Shared process-wide set
+KNOWN_APPS = KnownApps()
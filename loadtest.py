@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Local load test: replay correctly signed Slack requests against /slack/events
+and report throughput, ack latency, thread count and memory of the app.
+
+    python loadtest.py --server gunicorn --rate 50 --duration 30
+    python loadtest.py --server dev --requests 500 --concurrency 20
+    python loadtest.py --server gunicorn --mix command=1,button=2,submission=1 --rate 20
+    python loadtest.py --url http://localhost:8080 --requests 200
+
+Request kinds (--mix weights):
+    command     /appgrowth ping
+    menu        /appgrowth (main menu)
+    button      multiple_segments_btn block action (opens the modal)
+    submission  create_multiple_segments_modal view submission (starts a small batch)
+
+--server starts the app itself (Flask dev server or gunicorn) against a stub
+Slack Web API and a mock AppGrowth, so no real Slack or AppGrowth traffic is
+produced. With --cassette the app answers AppGrowth requests from a recorded
+cassette instead (see cassette.py), at --replay-speed times the recorded latency. --rate > 0 sends at a fixed rate (open loop) for --duration seconds,
+otherwise --requests are sent by --concurrency closed-loop clients.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET", "loadtest-signing-secret")
+
+
+# ───────── signed Slack payloads ─────────
+def sign(body, secret=None, timestamp=None):
+    """Headers Slack would send for this raw body (v0 HMAC-SHA256 signature)"""
+    secret = secret or SIGNING_SECRET
+    timestamp = str(int(timestamp or time.time()))
+    base = f"v0:{timestamp}:{body}".encode()
+    signature = "v0=" + hmac.new(secret.encode(), base, hashlib.sha256).hexdigest()
+    return {
+        "X-Slack-Request-Timestamp": timestamp,
+        "X-Slack-Signature": signature,
+        "Content-Type": "application/x-www-form-urlencoded",
+    }
+
+
+def command_body(text, response_url):
+    return urllib.parse.urlencode({
+        "token": "loadtest",
+        "team_id": "T0LOAD",
+        "channel_id": "C0LOAD",
+        "user_id": "U0LOAD",
+        "command": "/appgrowth",
+        "text": text,
+        "response_url": response_url,
+        "trigger_id": "1.2.loadtest",
+    })
+
+
+def _interactive_body(payload):
+    return urllib.parse.urlencode({"payload": json.dumps(payload)})
+
+
+def button_body(response_url):
+    return _interactive_body({
+        "type": "block_actions",
+        "team": {"id": "T0LOAD"},
+        "user": {"id": "U0LOAD"},
+        "api_app_id": "A0LOAD",
+        "channel": {"id": "C0LOAD"},
+        "container": {"type": "message", "channel_id": "C0LOAD"},
+        "trigger_id": "1.2.loadtest",
+        "response_url": response_url,
+        "actions": [{"type": "button", "action_id": "multiple_segments_btn", "block_id": "b", "action_ts": str(time.time())}],
+    })
+
+
+def submission_body(apps=1, countries=("USA", "GBR")):
+    bundle_ids = "\n".join(f"com.loadtest.app{random.randrange(10 ** 6)}" for _ in range(apps))
+    return _interactive_body({
+        "type": "view_submission",
+        "team": {"id": "T0LOAD"},
+        "user": {"id": "U0LOAD"},
+        "api_app_id": "A0LOAD",
+        "trigger_id": "1.2.loadtest",
+        "view": {
+            "type": "modal",
+            "id": "V0LOAD",
+            "hash": "loadtest",
+            "callback_id": "create_multiple_segments_modal",
+            "private_metadata": "C0LOAD",
+            "state": {"values": {
+                "app_id_block": {"app_id_input": {"type": "plain_text_input", "value": bundle_ids}},
+                # Random bundle IDs are unknown to AppGrowth (and to a replayed listing): allow them explicitly
+                "allow_new_apps_block": {"allow_new_apps_input": {"type": "checkboxes", "selected_options": [{"value": "allow_new_apps"}]}},
+                "countries_block": {"countries_input": {"type": "multi_static_select", "selected_options": [{"value": c} for c in countries]}},
+                "bulk_countries_block": {"bulk_countries_input": {"type": "plain_text_input", "value": None}},
+                "all_segments_block": {"all_segments_input": {"type": "checkboxes", "selected_options": [{"value": "all_segments"}]}},
+                "segment_types_block": {"segment_types_input": {"type": "multi_static_select", "selected_options": []}},
+            }},
+        },
+    })
+
+
+def build_body(kind, response_url):
+    if kind == "command":
+        return command_body("ping", response_url)
+    if kind == "menu":
+        return command_body("", response_url)
+    if kind == "button":
+        return button_body(response_url)
+    if kind == "submission":
+        return submission_body()
+    raise ValueError(f"unknown request kind: {kind}")
+
+
+# ───────── stub servers ─────────
+class _QuietHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def _reply(self, status=200, body=b"", content_type="text/html", headers=None):
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _drain(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def log_message(self, *args):
+        pass
+
+
+class _StubSlackHandler(_QuietHandler):
+    """Answers every Web API method and response_url with ok: true"""
+
+    def do_POST(self):
+        self._drain()
+        body = json.dumps({"ok": True, "user_id": "U0BOT", "bot_id": "B0BOT", "team_id": "T0LOAD"}).encode()
+        self._reply(body=body, content_type="application/json")
+
+
+_CSRF_FORM = b'<form><input id="csrf_token" name="csrf_token" type="hidden" value="loadtest-csrf"></form>'
+
+
+class _MockAppGrowthHandler(_QuietHandler):
+    """Just enough of AppGrowth for login, /segments/ listing and segment creation"""
+
+    segments_html = b'<table id="segments-table"><thead></thead><tbody></tbody></table>'
+
+    def do_GET(self):
+        if self.path.startswith("/segments/new") or self.path.startswith("/auth"):
+            self._reply(body=_CSRF_FORM)
+        elif self.path.startswith("/segments"):
+            self._reply(body=self.segments_html)
+        else:
+            self._reply(status=404)
+
+    def do_POST(self):
+        self._drain()
+        if self.path.startswith("/auth") or self.path.rstrip("/") == "/segments":
+            self._reply(status=302, headers={"Location": "/segments/"})
+        elif re.fullmatch(r"/segments/\d+/(rebuild|edit)", self.path):
+            self._reply(status=302, headers={"Location": "/segments/"})
+        else:
+            self._reply(status=404)
+
+    def do_DELETE(self):
+        self._drain()
+        if re.fullmatch(r"/segments/\d+", self.path):
+            self._reply(status=302, headers={"Location": "/segments/"})
+        else:
+            self._reply(status=404)
+
+
+def start_server(handler_cls, latency=0.0):
+    handler = type(handler_cls.__name__, (handler_cls,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def start_stub_slack(latency=0.0):
+    return start_server(_StubSlackHandler, latency)
+
+
+def start_mock_appgrowth(latency=0.0):
+    return start_server(_MockAppGrowthHandler, latency)
+
+
+# ───────── app under test ─────────
+def start_app(mode, port, slack_url, appgrowth_url=None, extra_env=None):
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        SLACK_BOT_TOKEN="xoxb-loadtest",
+        SLACK_SIGNING_SECRET=SIGNING_SECRET,
+        SLACK_API_URL=slack_url + "/api/",
+        APPGROWTH_BASE_URL=appgrowth_url or slack_url,
+        APPGROWTH_USERNAME="loadtest",
+        APPGROWTH_PASSWORD="loadtest",
+        STATE_DIR=os.getenv("STATE_DIR", "state/loadtest"),
+    )
+    env.update(extra_env or {})
+    if mode == "dev":
+        cmd = [sys.executable, "app.py"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "app:flask_app"]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(url + "/health", timeout=1).ok:
+                return proc, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not come up on {url}")
+
+
+# ───────── process sampling (Linux /proc) ─────────
+def _process_tree(pid):
+    pids = [pid]
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                for child in f.read().split():
+                    pids.extend(_process_tree(int(child)))
+        except OSError:
+            pass
+    return pids
+
+
+def sample_process(pid):
+    """(threads, rss_mb) summed over pid and its children"""
+    threads, rss_kb = 0, 0
+    try:
+        pids = _process_tree(pid)
+    except OSError:
+        return 0, 0.0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("Threads:"):
+                        threads += int(line.split()[1])
+                    elif line.startswith("VmRSS:"):
+                        rss_kb += int(line.split()[1])
+        except OSError:
+            pass
+    return threads, rss_kb / 1024
+
+
+class ProcessSampler(threading.Thread):
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.samples.append(sample_process(self.pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.samples.append(sample_process(self.pid))
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        threads = [t for t, _ in self.samples]
+        rss = [r for _, r in self.samples]
+        return {
+            "threads_start": threads[0], "threads_max": max(threads), "threads_end": threads[-1],
+            "rss_mb_start": round(rss[0], 1), "rss_mb_max": round(max(rss), 1), "rss_mb_end": round(rss[-1], 1),
+        }
+
+
+# ───────── load ─────────
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+def _latency_stats(latencies):
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+def _rejected_submission(kind, response):
+    """A modal rejected by validation answers 200 too, but never reaches the batch path"""
+    if kind != "submission" or not response.content:
+        return False
+    try:
+        return response.json().get("response_action") == "errors"
+    except ValueError:
+        return False
+
+
+def run_load(url, response_url, total=500, concurrency=20, mix=None, rate=0.0, duration=0.0):
+    mix = mix or {"command": 1}
+    kinds, weights = list(mix), list(mix.values())
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=max(concurrency, 10)))
+    latencies = {kind: [] for kind in kinds}
+    errors = {kind: 0 for kind in kinds}
+    lock = threading.Lock()
+
+    def one(_=None):
+        kind = random.choices(kinds, weights)[0]
+        body = build_body(kind, response_url)
+        started = time.perf_counter()
+        try:
+            r = session.post(url + "/slack/events", data=body, headers=sign(body), timeout=10)
+            ok = r.status_code == 200 and not _rejected_submission(kind, r)
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies[kind].append(elapsed)
+            if not ok:
+                errors[kind] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if rate > 0:
+            # Open loop: send on schedule regardless of how fast the app answers
+            sent = 0
+            while True:
+                due = started + sent / rate
+                if due - started >= duration:
+                    break
+                time.sleep(max(0.0, due - time.perf_counter()))
+                pool.submit(one)
+                sent += 1
+        else:
+            list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    all_latencies = [x for values in latencies.values() for x in values]
+    return {
+        "requests": len(all_latencies),
+        "errors": sum(errors.values()),
+        "throughput_rps": round(len(all_latencies) / wall, 1),
+        "ack_latency": _latency_stats(all_latencies),
+        "by_kind": {kind: dict(_latency_stats(latencies[kind]), errors=errors[kind]) for kind in kinds},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=["dev", "gunicorn"], help="start the app in this mode")
+    parser.add_argument("--url", help="target an already running app instead")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--requests", type=int, default=500, help="closed loop: total requests")
+    parser.add_argument("--concurrency", type=int, default=20, help="client threads")
+    parser.add_argument("--rate", type=float, default=0.0, help="open loop: requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="open loop: seconds")
+    parser.add_argument("--mix", default="command=1", help="request kind weights, e.g. command=1,button=1,submission=1")
+    parser.add_argument("--slack-latency", type=float, default=0.0, help="stub Slack API delay (s)")
+    parser.add_argument("--appgrowth-latency", type=float, default=0.0, help="mock AppGrowth delay (s)")
+    parser.add_argument("--cassette", help="replay AppGrowth from this recorded cassette instead of the mock")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="cassette latency scale (0 = none)")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to keep sampling after the load")
+    args = parser.parse_args()
+
+    slack, slack_url = start_stub_slack(args.slack_latency)
+    appgrowth, appgrowth_url = start_mock_appgrowth(args.appgrowth_latency)
+    proc = sampler = None
+    try:
+        if args.url:
+            url = args.url.rstrip("/")
+        else:
+            extra_env = None
+            if args.cassette:
+                extra_env = {
+                    "APPGROWTH_REPLAY": os.path.abspath(args.cassette),
+                    "APPGROWTH_REPLAY_SPEED": str(args.replay_speed),
+                }
+            proc, url = start_app(args.server or "dev", args.port, slack_url, appgrowth_url, extra_env)
+            sampler = ProcessSampler(proc.pid)
+            sampler.start()
+
+        result = run_load(
+            url, slack_url + "/response", total=args.requests, concurrency=args.concurrency,
+            mix=parse_mix(args.mix), rate=args.rate, duration=args.duration,
+        )
+        time.sleep(args.settle)
+        result["server"] = args.server or args.url
+        if sampler:
+            sampler.stop()
+            result["process"] = sampler.summary()
+        try:
+            result["app_metrics"] = requests.get(url + "/metrics", timeout=5).json()
+        except (requests.RequestException, ValueError):
+            pass
+        print(json.dumps(result, indent=2))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=30)
+        slack.shutdown()
+        appgrowth.shutdown()
+
+
+if __name__ == "__main__":
+    main()
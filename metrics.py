@@ -0,0 +1,141 @@
+# metrics.py — In-process metrics (per worker), exposed as JSON on /metrics
+import functools
+import threading
+import time
+
+# Upper bounds (ms) of the ack latency histogram buckets; Slack's budget is 3000 ms
+ACK_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2000, 3000)
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative counts, Prometheus style)"""
+
+    def __init__(self, buckets_ms=ACK_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        index = len(self.buckets_ms)
+        for i, bound in enumerate(self.buckets_ms):
+            if ms <= bound:
+                index = i
+                break
+        with _lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-quantile (None when empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets_ms, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        with _lock:
+            cumulative, running = {}, 0
+            for bound, n in zip(self.buckets_ms, self.counts):
+                running += n
+                cumulative[str(bound)] = running
+            cumulative["+Inf"] = self.count
+            return {
+                "count": self.count,
+                "mean_ms": round(self.sum_ms / self.count, 1) if self.count else None,
+                "max_ms": round(self.max_ms, 1),
+                "p50_le_ms": self.quantile(0.50),
+                "p95_le_ms": self.quantile(0.95),
+                "p99_le_ms": self.quantile(0.99),
+                "buckets": cumulative,
+            }
+
+
+ACK_LATENCY = {}  # handler name -> Histogram
+
+
+def observe_ack(handler, seconds):
+    with _lock:
+        hist = ACK_LATENCY.get(handler)
+        if hist is None:
+            hist = ACK_LATENCY[handler] = Histogram()
+    hist.observe(seconds)
+
+
+def mark_received():
+    """Call when a Slack request reaches the web layer; ack latency is measured from here"""
+    _local.received_at = time.perf_counter()
+
+
+def timed_ack(handler):
+    """
+    Decorator for Bolt ack listeners: records time from request receipt
+    (mark_received, falling back to listener start) until ack() returns.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = getattr(_local, "received_at", None) or time.perf_counter()
+            ack = kwargs["ack"]
+
+            def timed(*ack_args, **ack_kwargs):
+                try:
+                    return ack(*ack_args, **ack_kwargs)
+                finally:
+                    observe_ack(handler, time.perf_counter() - started)
+                    _local.received_at = None
+
+            kwargs["ack"] = timed
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+TRANSFER = {}  # "METHOD /path/{id}" -> byte counters of AppGrowth responses
+
+
+def observe_transfer(endpoint, wire_bytes, decoded_bytes, encoding=None):
+    """Count one HTTP response: bytes read from the socket vs bytes after content decoding"""
+    with _lock:
+        counters = TRANSFER.get(endpoint)
+        if counters is None:
+            counters = TRANSFER[endpoint] = {"responses": 0, "wire_bytes": 0, "decoded_bytes": 0, "encodings": {}}
+        counters["responses"] += 1
+        counters["wire_bytes"] += wire_bytes
+        counters["decoded_bytes"] += decoded_bytes
+        encoding = encoding or "identity"
+        counters["encodings"][encoding] = counters["encodings"].get(encoding, 0) + 1
+
+
+def transfer_snapshot():
+    with _lock:
+        endpoints = {
+            endpoint: dict(
+                counters,
+                encodings=dict(counters["encodings"]),
+                ratio=round(counters["wire_bytes"] / counters["decoded_bytes"], 3) if counters["decoded_bytes"] else None,
+            )
+            for endpoint, counters in sorted(TRANSFER.items())
+        }
+    wire = sum(c["wire_bytes"] for c in endpoints.values())
+    decoded = sum(c["decoded_bytes"] for c in endpoints.values())
+    return {"wire_bytes": wire, "decoded_bytes": decoded, "endpoints": endpoints}
+
+
+def snapshot():
+    return {
+        "ack_latency": {name: hist.snapshot() for name, hist in sorted(ACK_LATENCY.items())},
+        "appgrowth_transfer": transfer_snapshot(),
+    }
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Dry-run segment planning: build the same plan as the "Multiple Segments"
+modal and diff it against existing AppGrowth segments. Nothing is created;
+the only AppGrowth request is the read of the /segments/ listing.
+
+    python plan_segments.py --apps com.easybrain.sudoku,com.easybrain.nonogram --countries USA,GBR,DEU
+    python plan_segments.py --apps-file apps.txt --countries USA --types RetainedAtLeast_7,ActiveUsers_0.95
+    python plan_segments.py --apps com.easybrain.sudoku --countries USA --listing segments.html
+
+--listing reads a saved copy of the /segments/ page instead of the live one.
+Exit status is 1 when the plan has conflicting segments (name exists with
+other options), so it can gate scripted batches.
+"""
+import argparse
+import re
+import sys
+import time
+
+import appgrowth
+from countries import ALL_VALID_COUNTRY_CODES
+from segment_catalog import SegmentCatalog
+from segment_plan import SEGMENT_TYPE_VALUES
+
+
+def split_list(text):
+    """Comma/space/newline separated values, deduplicated in order"""
+    return list(dict.fromkeys(item for item in re.split(r"[\s,]+", text or "") if item))
+
+
+def load_catalog(listing=None):
+    catalog = SegmentCatalog()
+    if listing:
+        with open(listing, encoding="utf-8") as f:
+            catalog.load_rows(appgrowth.parse_segments(f.read()))
+        return catalog
+    if not appgrowth.login():
+        sys.exit("❌ AppGrowth login failed")
+    catalog.load_rows(appgrowth.iter_segments())
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", default="", help="bundle IDs (comma or space separated)")
+    parser.add_argument("--apps-file", help="file with bundle IDs, one per line")
+    parser.add_argument("--countries", required=True, help="ISO 3166-1 alpha-3 codes (comma or space separated)")
+    parser.add_argument("--types", default=",".join(SEGMENT_TYPE_VALUES), help="segment types (default: all)")
+    parser.add_argument("--listing", help="saved /segments/ HTML instead of the live listing")
+    args = parser.parse_args()
+
+    apps_text = args.apps
+    if args.apps_file:
+        with open(args.apps_file, encoding="utf-8") as f:
+            apps_text += "\n" + f.read()
+    bundle_ids = split_list(apps_text)
+    countries = [c.upper() for c in split_list(args.countries)]
+    segment_types = split_list(args.types)
+
+    invalid = [c for c in countries if c not in ALL_VALID_COUNTRY_CODES]
+    invalid += [t for t in segment_types if t not in SEGMENT_TYPE_VALUES]
+    if not bundle_ids:
+        invalid.append("no bundle IDs given")
+    if invalid:
+        sys.exit(f"❌ Invalid input: {', '.join(invalid)}")
+
+    catalog = load_catalog(args.listing)
+    started = time.perf_counter()
+    diff = catalog.diff_plan(bundle_ids, countries, segment_types)
+    print(
+        f"🧪 Plan: {diff.total} segments ({len(bundle_ids)} apps × {len(countries)} countries × {len(segment_types)} types), "
+        f"compared with {len(catalog)} existing bot segments in {(time.perf_counter() - started) * 1000:.0f} ms\n"
+    )
+    print(diff.format(limit=50))
+    sys.exit(1 if diff.conflicts else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# profiler.py — On-demand sampling profiler for the live process (wall clock and CPU, folded stacks)
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Sampling period; at 50 Hz sampling ~20 threads costs about 1% of one core
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.02"))
+MAX_PROFILE_SECONDS = 300
+# Deepest frames kept per stack (outermost frames are dropped beyond this)
+MAX_STACK_DEPTH = 64
+
+_running = threading.Lock()
+# code object -> "module:function"
+_frame_names = {}
+
+
+class ProfileBusyError(Exception):
+    """Raised when a profile is already being recorded"""
+
+
+def _thread_cpu_seconds(ident):
+    """CPU time of one thread of this process (its POSIX thread CPU clock), None where unsupported"""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        return None
+
+
+def _folded(frame):
+    """'module:function;module:function' from the outermost to the innermost frame"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        name = _frame_names.get(code)
+        if name is None:
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            name = _frame_names[code] = f"{module}:{code.co_name}"
+        names.append(name)
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profile:
+    """
+    Samples every thread's stack with sys._current_frames().
+
+    `wall` counts every sample, so threads blocked on the network or a lock
+    show up where they wait. `cpu` only counts a thread's sample when its
+    CPU time grew since the previous sample (per-thread CPU clocks), which isolates
+    parsing, logging and other Python work from waiting.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.wall = collections.Counter()
+        self.cpu = collections.Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self.overhead = 0.0
+        self._cpu_seen = {}
+
+    def sample(self):
+        started = time.perf_counter()
+        me = threading.get_ident()
+        threads = {t.ident: t for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread = threads.get(ident)
+            name = thread.name if thread else f"thread-{ident}"
+            stack = f"{name};{_folded(frame)}"
+            self.wall[stack] += 1
+            cpu = _thread_cpu_seconds(ident)
+            if cpu is not None:
+                if cpu > self._cpu_seen.get(ident, cpu):
+                    self.cpu[stack] += 1
+                self._cpu_seen[ident] = cpu
+        self.samples += 1
+        self.overhead += time.perf_counter() - started
+
+    def run(self, seconds, stop=None):
+        """Sample for `seconds` (or until the `stop` event is set)"""
+        stop = stop or threading.Event()
+        started = time.monotonic()
+        deadline = started + seconds
+        while time.monotonic() < deadline and not stop.is_set():
+            self.sample()
+            stop.wait(self.interval)
+        self.elapsed = time.monotonic() - started
+        return self
+
+    def write_folded(self, path, kind="wall"):
+        """Brendan Gregg's folded format: one 'frame;frame;frame count' line per stack"""
+        counts = self.wall if kind == "wall" else self.cpu
+        with open(path, "w") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def top(self, kind="wall", limit=5):
+        """Innermost frames with the most samples, [(frame, share)]"""
+        counts = self.wall if kind == "wall" else self.cpu
+        leaves = collections.Counter()
+        for stack, count in counts.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [(frame, count / total) for frame, count in leaves.most_common(limit)]
+
+    def summary(self):
+        overhead = self.overhead / self.elapsed if self.elapsed else 0.0
+        lines = [f"{self.samples} samples over {self.elapsed:.0f}s, sampler overhead {overhead:.1%}"]
+        for kind in ("cpu", "wall"):
+            top = self.top(kind)
+            if top:
+                lines.append(f"*Top {kind}:* " + ", ".join(f"`{frame}` {share:.0%}" for frame, share in top))
+        return "\n".join(lines)
+
+
+def record_profile(seconds, interval=PROFILE_INTERVAL, stop=None):
+    """Record one profile of this process; ProfileBusyError if another one is running"""
+    if not _running.acquire(blocking=False):
+        raise ProfileBusyError("a profile is already being recorded")
+    try:
+        seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+        logger.info(f"🔬 Profiling pid {os.getpid()} for {seconds}s every {interval * 1000:.0f}ms")
+        profile = Profile(interval).run(seconds, stop)
+        logger.info(f"🔬 Profile done: {profile.samples} samples, overhead {profile.overhead:.2f}s")
+        return profile
+    finally:
+        _running.release()
@@ -0,0 +1,56 @@
+# results.py — Full per-segment results of finished jobs, spilled from the queue to CSV files
+import csv
+import logging
+import os
+import time
+
+import shared_state
+
+logger = logging.getLogger(__name__)
+
+# Result files older than this are removed when a new one is written
+RESULTS_KEEP_SECONDS = 7 * 24 * 3600
+
+RESULT_COLUMNS = ("name", "app", "country", "type", "value", "status", "error")
+
+
+def results_dir():
+    return os.path.join(shared_state.STATE_DIR, "results")
+
+
+def results_path(job_id):
+    return os.path.join(results_dir(), f"{job_id}.csv")
+
+
+def spill_results(queue, job):
+    """
+    Stream every task of a finished job into STATE_DIR/results/<job id>.csv,
+    then drop the task rows from the queue. The job keeps its counters, so
+    summaries and `/appgrowth jobs` still work; memory stays constant no
+    matter how many segments the job had. Returns the file path.
+    """
+    os.makedirs(results_dir(), exist_ok=True)
+    path = results_path(job["id"])
+    rows = 0
+    with open(path + ".tmp", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(RESULT_COLUMNS)
+        for row in queue.iter_results(job["id"]):
+            writer.writerow(row)
+            rows += 1
+    os.replace(path + ".tmp", path)
+    queue.purge_tasks(job["id"])
+    logger.info(f"📄 Job {job['id']}: {rows} results written to {path}")
+    _remove_old_results()
+    return path
+
+
+def _remove_old_results():
+    cutoff = time.time() - RESULTS_KEEP_SECONDS
+    for filename in os.listdir(results_dir()):
+        path = os.path.join(results_dir(), filename)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,232 @@
+# segment_catalog.py - Locally cached index of existing AppGrowth segments
+import logging
+import threading
+import time
+
+import appgrowth
+from known_apps import KNOWN_APPS
+from segment_plan import generate_segment_name, parse_segment_type, segment_code, split_segment_name
+from segment_stats import SegmentTable
+
+logger = logging.getLogger(__name__)
+
+# How often the background thread re-scrapes /segments/
+CATALOG_REFRESH_SECONDS = 600
+# Conflicting segments listed in a plan report (all of them are counted)
+PLAN_SAMPLE_SIZE = 10
+
+
+def option_fingerprint(seg_type, app_id, country, value):
+    """What a bot segment is for: (type, app, COUNTRY, age or audience as the listing shows it)"""
+    if seg_type == "RetainedAtLeast":
+        value = str(int(float(value)))
+    elif seg_type == "ActiveUsers":
+        value = f"{float(value):.2f}"
+    return seg_type, app_id, (country or "").upper(), value
+
+
+def _row_fingerprint(row):
+    """Fingerprint of a listing row, None when the row carries no options (name-only rows)"""
+    options = row.get("options")
+    if not options or "type" not in row:
+        return None
+    value = options.get("age") if row["type"] == "RetainedAtLeast" else options.get("audience")
+    try:
+        return option_fingerprint(row["type"], options.get("app"), options.get("country"), value)
+    except (TypeError, ValueError):
+        return row["type"], options.get("app"), (options.get("country") or "").upper(), value
+
+
+class PlanDiff:
+    """Planned segments split into new / already existing / existing with other options"""
+
+    def __init__(self, total):
+        self.total = total
+        self.new = 0
+        self.existing = 0
+        self.conflicts = 0
+        self.new_by_app = {}
+        self.conflict_samples = []
+
+    def format(self, limit=10):
+        text = (
+            f"🆕 New: {self.new}\n♻️ Already exist: {self.existing}\n"
+            f"⚠️ Conflicting options: {self.conflicts}"
+        )
+        if self.new_by_app:
+            apps = sorted(self.new_by_app.items(), key=lambda item: -item[1])
+            lines = [f"• `{app_id}`: {count} new" for app_id, count in apps[:limit]]
+            if len(apps) > limit:
+                lines.append(f"... and {len(apps) - limit} more apps")
+            text += "\n\n*New by app:*\n" + "\n".join(lines)
+        if self.conflict_samples:
+            lines = [f"• `{name}` — {reason}" for name, reason in self.conflict_samples]
+            if self.conflicts > len(self.conflict_samples):
+                lines.append(f"... and {self.conflicts - len(self.conflict_samples)} more")
+            text += "\n\n*Conflicts (name exists, options differ):*\n" + "\n".join(lines)
+        return text
+
+
+def _describe_conflict(expected, actual):
+    labels = ("type", "app", "country", "value")
+    return ", ".join(
+        f"{label} {have} (planned {want})"
+        for label, want, have in zip(labels, expected, actual) if want != have
+    )
+
+
+class SegmentCatalog:
+    """
+    In-memory index of bot-created segment names, keyed by app, with the
+    option fingerprint of each segment for plan diffs.
+
+    Preview and duplicate checks only ever read this index; the listing is
+    scraped by refresh() on a background thread, never on a request path.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_app = {}  # app_id -> {(COUNTRY, code): option fingerprint or None}
+        self._count = 0
+        self.updated_at = None
+        # Columnar copy of the whole listing (all segments, not only the bot's) for /appgrowth stats
+        self.table = None
+
+    @property
+    def loaded(self):
+        return self.updated_at is not None
+
+    def __len__(self):
+        return self._count
+
+    def load_rows(self, rows):
+        """Replace the index with the given listing rows (dicts from appgrowth.parse_segments)."""
+        by_app = {}
+        count = 0
+        for row in rows:
+            parts = split_segment_name(row.get("name", ""))
+            if parts:
+                app_id, country, code = parts
+                entries = by_app.setdefault(app_id, {})
+                if (country, code) not in entries:
+                    count += 1
+                entries[(country, code)] = _row_fingerprint(row)
+        with self._lock:
+            self._by_app = by_app
+            self._count = count
+            self.updated_at = time.time()
+        return count
+
+    def refresh(self):
+        """Re-scrape /segments/ and swap the index in; keeps the old one on failure."""
+        try:
+            started = time.time()
+            table = SegmentTable()
+            count = self.load_rows(table.collect(KNOWN_APPS.collect(appgrowth.iter_segments())))
+            self.table = table
+            logger.info(
+                f"📚 Segment catalog refreshed: {count} bot segments, {len(table)} in total, "
+                f"{len(KNOWN_APPS)} known apps, in {time.time() - started:.1f}s"
+            )
+            return True
+        except Exception as e:
+            logger.error(f"❌ Segment catalog refresh failed: {e}")
+            return False
+
+    def add(self, name):
+        """Record a segment the bot just created so previews see it before the next refresh."""
+        parts = split_segment_name(name)
+        if not parts:
+            return
+        app_id, country, code = parts
+        with self._lock:
+            entries = self._by_app.setdefault(app_id, {})
+            if (country, code) not in entries:
+                entries[(country, code)] = None
+                self._count += 1
+
+    def discard(self, name):
+        """Forget a segment the bot just deleted."""
+        parts = split_segment_name(name)
+        if not parts:
+            return
+        app_id, country, code = parts
+        with self._lock:
+            entries = self._by_app.get(app_id)
+            if entries and (country, code) in entries:
+                del entries[(country, code)]
+                self._count -= 1
+
+    def contains(self, name):
+        parts = split_segment_name(name)
+        if not parts:
+            return False
+        app_id, country, code = parts
+        with self._lock:
+            return (country, code) in self._by_app.get(app_id, ())
+
+    def count_existing(self, bundle_ids, countries, segment_types):
+        """
+        Count planned segments that already exist.
+
+        Walks the existing entries of the requested apps instead of generating
+        every planned name, so the cost does not grow with countries × types.
+        """
+        country_set = {c.upper() for c in countries}
+        code_set = {segment_code(*parse_segment_type(v)) for v in segment_types}
+        existing = 0
+        with self._lock:
+            for app_id in set(bundle_ids):
+                for country, code in self._by_app.get(app_id, ()):
+                    if country in country_set and code in code_set:
+                        existing += 1
+        return existing
+
+    def diff_plan(self, bundle_ids, countries, segment_types):
+        """
+        Diff a creation plan against the index without touching AppGrowth.
+
+        Every planned segment is one hash lookup of (COUNTRY, code) in its
+        app's entries; names are only built for the reported samples.
+        """
+        parsed = [parse_segment_type(v) for v in segment_types]
+        types = [(seg_type, value, segment_code(seg_type, value)) for seg_type, value in parsed]
+        countries = [c.upper() for c in countries]
+        diff = PlanDiff(len(bundle_ids) * len(countries) * len(types))
+        with self._lock:
+            for app_id in bundle_ids:
+                entries = self._by_app.get(app_id, {})
+                new = 0
+                for country in countries:
+                    for seg_type, value, code in types:
+                        key = (country, code)
+                        if key not in entries:
+                            new += 1
+                            continue
+                        actual = entries[key]
+                        expected = option_fingerprint(seg_type, app_id, country, value)
+                        if actual is None or actual == expected:
+                            diff.existing += 1
+                            continue
+                        diff.conflicts += 1
+                        if len(diff.conflict_samples) < PLAN_SAMPLE_SIZE:
+                            name = generate_segment_name(app_id, country, seg_type, value)
+                            diff.conflict_samples.append((name, _describe_conflict(expected, actual)))
+                if new:
+                    diff.new_by_app[app_id] = diff.new_by_app.get(app_id, 0) + new
+                diff.new += new
+        return diff
+
+    def start_background_refresh(self, interval=CATALOG_REFRESH_SECONDS):
+        def loop():
+            while True:
+                self.refresh()
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name="segment-catalog", daemon=True)
+        thread.start()
+        return thread
+
+
+# Shared process-wide catalog
+CATALOG = SegmentCatalog()
@@ -0,0 +1,282 @@
+# segment_ops.py — Bulk operations on existing segments: selection, bounded parallel run, per-item report
+import csv
+import fnmatch
+import logging
+import os
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import appgrowth
+from circuit_breaker import CircuitOpenError
+from results import results_dir
+from segment_catalog import CATALOG
+from segment_plan import generate_segment_name, split_segment_name
+from shutdown import SHUTDOWN
+
+logger = logging.getLogger(__name__)
+
+# Segment calls in flight per bulk operation (the account pool and its budgets still apply)
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))
+# Failed items kept for the Slack report; the full list goes to the CSV
+SAMPLE_SIZE = 10
+
+DONE, FAILED, SKIPPED, UNCHANGED = "done", "failed", "skipped", "unchanged"
+
+
+class SegmentSelector:
+    """Name pattern (fnmatch, e.g. bloom_com.app_*) plus optional app and country filters"""
+
+    def __init__(self, pattern, app=None, country=None):
+        self.pattern = pattern
+        self.app = app
+        self.country = country.upper() if country else None
+
+    @classmethod
+    def parse(cls, words, options=None):
+        """
+        From command words: <pattern> [app=<bundle id>] [country=<ISO3>]; ValueError if malformed.
+        With an `options` dict, any other key=value is collected into it instead of rejected.
+        """
+        pattern, filters = None, {}
+        for word in words:
+            key, sep, value = word.partition("=")
+            if sep:
+                if not value or (key not in ("app", "country") and options is None):
+                    raise ValueError(f"unknown filter `{word}`")
+                if key in ("app", "country"):
+                    filters[key] = value
+                else:
+                    options[key] = value
+            elif pattern is None:
+                pattern = word
+            else:
+                raise ValueError(f"unexpected `{word}`")
+        if not pattern:
+            raise ValueError("a name pattern is required")
+        return cls(pattern, **filters)
+
+    def matches(self, row):
+        name = row.get("name", "")
+        if not fnmatch.fnmatchcase(name, self.pattern):
+            return False
+        options = row.get("options", {})
+        parts = split_segment_name(name)
+        if self.app and self.app != options.get("app", parts[0] if parts else None):
+            return False
+        if self.country and self.country != options.get("country", parts[1] if parts else "").upper():
+            return False
+        return True
+
+    def describe(self):
+        text = f"`{self.pattern}`"
+        if self.app:
+            text += f", app `{self.app}`"
+        if self.country:
+            text += f", country `{self.country}`"
+        return text
+
+
+def select_segments(selector, rows=None):
+    """Listing rows matching the selector (streams the live /segments/ listing by default)"""
+    for row in appgrowth.iter_segments() if rows is None else rows:
+        if selector.matches(row):
+            yield row
+
+
+class BulkReport:
+    """
+    Outcome counters, a bounded sample of failures and a CSV with one line
+    per segment, written as results arrive (STATE_DIR/results/<op id>.csv).
+    """
+
+    def __init__(self, action, op_id=None):
+        self.action = action
+        self.op_id = op_id or f"{action}-{uuid.uuid4().hex[:8]}"
+        self.counts = {DONE: 0, FAILED: 0, SKIPPED: 0, UNCHANGED: 0}
+        self.failures = []
+        os.makedirs(results_dir(), exist_ok=True)
+        self.path = os.path.join(results_dir(), f"{self.op_id}.csv")
+        self._file = open(self.path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(("id", "name", "outcome", "detail"))
+
+    @property
+    def processed(self):
+        return sum(self.counts.values())
+
+    def add(self, row, outcome, detail=""):
+        self.counts[outcome] += 1
+        if outcome == FAILED and len(self.failures) < SAMPLE_SIZE:
+            self.failures.append(f"`{row['name']}` — {detail}")
+        self._writer.writerow((row["id"], row["name"], outcome, detail))
+
+    def close(self):
+        self._file.close()
+
+    def format(self, verb):
+        msg = f"✅ {verb.capitalize()}: {self.counts[DONE]}"
+        if self.counts[UNCHANGED]:
+            msg += f"\n⏸️ Already up to date: {self.counts[UNCHANGED]}"
+        msg += f"\n❌ Failed: {self.counts[FAILED]}"
+        if self.counts[SKIPPED]:
+            msg += f"\n⏭️ Skipped: {self.counts[SKIPPED]}"
+        if self.failures:
+            msg += "\n\n*Failures:*\n" + "\n".join(f"• {line}" for line in self.failures)
+            if self.counts[FAILED] > len(self.failures):
+                msg += f"\n... and {self.counts[FAILED] - len(self.failures)} more"
+        return msg
+
+
+def run_bulk(report, rows, operation, concurrency=BULK_CONCURRENCY, progress=None):
+    """
+    Apply operation(row) -> (ok, detail) to every row with at most
+    `concurrency` calls in flight. Rows are pulled lazily; after an
+    open circuit or a shutdown the remaining rows are recorded as skipped.
+    An operation may return (None, detail) for rows that needed no change.
+    """
+    rows = iter(rows)
+    pending = {}
+    stop_reason = None
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"bulk-{report.action}") as executor:
+        while True:
+            while stop_reason is None and len(pending) < concurrency:
+                if SHUTDOWN.stopping.is_set():
+                    stop_reason = "bot restarting"
+                    break
+                row = next(rows, None)
+                if row is None:
+                    break
+                pending[executor.submit(operation, row)] = row
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                row = pending.pop(future)
+                try:
+                    ok, detail = future.result()
+                    outcome = UNCHANGED if ok is None else DONE if ok else FAILED
+                except CircuitOpenError:
+                    outcome, detail = SKIPPED, "AppGrowth unavailable"
+                    stop_reason = detail
+                except Exception as e:
+                    outcome, detail = FAILED, str(e)
+                report.add(row, outcome, detail)
+                if progress:
+                    progress(report)
+        if stop_reason:
+            logger.warning(f"⚠️ {report.op_id} stopped: {stop_reason}")
+            for row in rows:
+                report.add(row, SKIPPED, stop_reason)
+    report.close()
+    return report
+
+
+# ───────── bulk edit ─────────
+def normalize_option(key, value):
+    """Desired option value in the form the listing shows it; ValueError if invalid"""
+    if key == "audience":
+        ratio = float(value)
+        if not 0 < ratio <= 1:
+            raise ValueError("audience must be a ratio between 0 and 1, e.g. audience=0.90")
+        return f"{ratio:.2f}"
+    if key == "age":
+        days = int(value)
+        if days <= 0:
+            raise ValueError("age must be a positive number of days")
+        return str(days)
+    return value
+
+
+def _same(current, desired):
+    try:
+        return float(current) == float(desired)
+    except (TypeError, ValueError):
+        return current == desired
+
+
+def diff_options(current, desired):
+    """{key: (current, desired)} for desired options that differ; KeyError for options the segment lacks"""
+    diff = {}
+    for key, value in desired.items():
+        if key not in current:
+            raise KeyError(key)
+        if not _same(current[key], value):
+            diff[key] = (current[key], value)
+    return diff
+
+
+def _renamed(row, options):
+    """New bot name when the edited option is encoded in it (bloom_<app>_<COUNTRY>_7d → _14d)"""
+    parts = split_segment_name(row["name"])
+    if not parts:
+        return row["name"]
+    app_id, country, _ = parts
+    if row["type"] == "RetainedAtLeast" and "age" in options:
+        return generate_segment_name(app_id, country, row["type"], int(options["age"]))
+    if row["type"] == "ActiveUsers" and "audience" in options:
+        return generate_segment_name(app_id, country, row["type"], float(options["audience"]))
+    return row["name"]
+
+
+class EditPlan:
+    """Listing rows split into segments to change (with their diff), up to date and not applicable"""
+
+    def __init__(self, rows, desired):
+        self.changes, self.unchanged, self.skipped = [], [], []
+        claimed = {}  # new name -> name of the segment renamed to it by this plan
+        for row in rows:
+            try:
+                diff = diff_options(row["options"], desired)
+            except KeyError as e:
+                self.skipped.append((row, f"{row['type']} segment has no `{e.args[0]}` option"))
+                continue
+            if not diff:
+                self.unchanged.append(row)
+                continue
+            options = {**row["options"], **desired}
+            new_name = _renamed(row, options)
+            if new_name != row["name"] and CATALOG.contains(new_name):
+                self.skipped.append((row, f"`{new_name}` already exists"))
+                continue
+            if new_name != row["name"]:
+                # _1d, _7d and _30d edited to age=14 would all become _14d
+                if new_name in claimed:
+                    self.skipped.append((row, f"`{new_name}` already targeted by `{claimed[new_name]}`"))
+                    continue
+                claimed[new_name] = row["name"]
+            self.changes.append({**row, "diff": diff, "new_options": options, "new_name": new_name})
+
+    def record_untouched(self, report):
+        for row in self.unchanged:
+            report.add(row, UNCHANGED, "already up to date")
+        for row, reason in self.skipped:
+            report.add(row, SKIPPED, reason)
+
+
+def describe_change(row):
+    text = ", ".join(f"{key} {old} → {new}" for key, (old, new) in row["diff"].items())
+    if row["new_name"] != row["name"]:
+        text += f", renamed `{row['new_name']}`"
+    return f"`{row['name']}`: {text}"
+
+
+def edit(row):
+    ok, detail = appgrowth.edit_segment(row["id"], row["new_name"], row["title"], row["type"], row["new_options"])
+    if ok and row["new_name"] != row["name"]:
+        CATALOG.discard(row["name"])
+        CATALOG.add(row["new_name"])
+    return ok, detail
+
+
+def rebuild(row):
+    return appgrowth.rebuild_segment(row["id"])
+
+
+def delete(row):
+    ok, detail = appgrowth.delete_segment(row["id"])
+    if ok:
+        CATALOG.discard(row["name"])
+    return ok, detail
+
+
+OPERATIONS = {"rebuild": (rebuild, "rebuilt"), "delete": (delete, "deleted"), "edit": (edit, "updated")}
@@ -0,0 +1,74 @@
+# segment_plan.py - Segment naming and batch planning helpers (no Slack / network deps)
+
+# Segment types - only 5 options
+SEGMENT_TYPES = [
+    {"text": {"type": "plain_text", "text": "⏱️ Retained 1 day"}, "value": "RetainedAtLeast_1"},
+    {"text": {"type": "plain_text", "text": "⏱️ Retained 7 days"}, "value": "RetainedAtLeast_7"},
+    {"text": {"type": "plain_text", "text": "⏱️ Retained 30 days"}, "value": "RetainedAtLeast_30"},
+    {"text": {"type": "plain_text", "text": "👥 Active Users 80%"}, "value": "ActiveUsers_0.80"},
+    {"text": {"type": "plain_text", "text": "👥 Active Users 95%"}, "value": "ActiveUsers_0.95"}
+]
+
+SEGMENT_TYPE_VALUES = tuple(seg["value"] for seg in SEGMENT_TYPES)
+
+
+def parse_segment_type(seg_type_value):
+    """
+    Split a segment type option value ("RetainedAtLeast_7", "ActiveUsers_0.95").
+
+    Returns:
+        tuple: (seg_type, value) - value is int days or float audience ratio
+    """
+    seg_type, value = seg_type_value.split("_")
+    if seg_type == "RetainedAtLeast":
+        return seg_type, int(value)
+    return seg_type, float(value)
+
+
+def segment_code(seg_type, value):
+    """Short code used as the last part of a segment name ("7d", "95")"""
+    if seg_type == "RetainedAtLeast":
+        return str(int(value)) + "d"
+    # ActiveUsers
+    if isinstance(value, str):
+        value = float(value)
+    return str(int(value * 100))
+
+
+def generate_segment_name(app_id, country, seg_type, value):
+    """Generate segment name with UPPERCASE country code"""
+    code = segment_code(seg_type, value)
+
+    # Make country uppercase, keep app_id as is, code lowercase
+    country = country.upper()
+    # app_id keeps original case - removed .lower()
+    code = code.lower()
+
+    return f"bloom_{app_id}_{country}_{code}"
+
+
+def split_segment_name(name):
+    """
+    Reverse of generate_segment_name.
+
+    Returns:
+        tuple: (app_id, country, code) or None for names not created by the bot
+    """
+    if not name.startswith("bloom_"):
+        return None
+    parts = name[len("bloom_"):].rsplit("_", 2)
+    if len(parts) != 3 or not all(parts):
+        return None
+    return parts[0], parts[1], parts[2]
+
+
+def iter_segment_plan(bundle_ids, countries, segment_types):
+    """
+    Yield (app_id, country, seg_type, value, name) for every planned segment,
+    in the same app → country → type order the batch runs in.
+    """
+    parsed_types = [parse_segment_type(v) for v in segment_types]
+    for app_id in bundle_ids:
+        for country in countries:
+            for seg_type, value in parsed_types:
+                yield app_id, country, seg_type, value, generate_segment_name(app_id, country, seg_type, value)
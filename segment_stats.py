@@ -0,0 +1,183 @@
+# segment_stats.py — Columnar copy of the /segments/ listing for `/appgrowth stats` (typed arrays, dictionary-encoded labels)
+import fnmatch
+import heapq
+import re
+from array import array
+from itertools import compress
+
+from segment_plan import split_segment_name
+
+# Numeric listing columns kept per segment
+METRICS = ("size", "file_size", "installs", "profit", "profit_per_mb")
+# Label columns; each row stores an index into the column's list of distinct values
+DIMENSIONS = ("app", "country", "type")
+# Rows per group / top list in the Slack report
+REPORT_LIMIT = 8
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_SCALE = {"k": 1e3, "m": 1e6, "b": 1e9, "g": 1e9}
+_BYTES = {"b": 1, "kb": 2**10, "mb": 2**20, "gb": 2**30, "tb": 2**40}
+
+
+def parse_number(text):
+    """Listing cell → float: '$1,234.50' → 1234.5, '12K' → 12000, '3.5 MB' → bytes, '' → 0"""
+    text = (text or "").strip().replace(",", "").replace("$", "")
+    try:
+        return float(text)  # plain numbers: the common case
+    except ValueError:
+        pass
+    match = _NUMBER.search(text)
+    if not match:
+        return 0.0
+    value = float(match.group())
+    unit = text[match.end():].strip().lower()
+    if unit in _BYTES:
+        return value * _BYTES[unit]
+    return value * _SCALE.get(unit[:1], 1) if len(unit) == 1 else value
+
+
+def row_app(row):
+    """App of a listing row: the app option, the bot naming scheme, else the tag option"""
+    options = row.get("options") or {}
+    if options.get("app"):
+        return options["app"]
+    parts = split_segment_name(row.get("name", ""))
+    if parts:
+        return parts[0]
+    return options.get("tag") or "—"
+
+
+def _row_country(row):
+    options = row.get("options") or {}
+    country = options.get("country")
+    if not country:
+        parts = split_segment_name(row.get("name", ""))
+        country = parts[1] if parts else "—"
+    return country.upper()
+
+
+class SegmentTable:
+    """
+    One typed array per listing column instead of one dict per segment:
+    metrics are float64 arrays, app/country/type are uint32 codes into a
+    list of distinct labels. 100k segments take a few MB, and group-bys
+    and top-N run over flat arrays without touching per-row dicts.
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.names = []
+        self.metrics = {metric: array("d") for metric in METRICS}
+        self.codes = {dim: array("I") for dim in DIMENSIONS}
+        self.labels = {dim: [] for dim in DIMENSIONS}
+        self._label_index = {dim: {} for dim in DIMENSIONS}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _code(self, dim, label):
+        index = self._label_index[dim]
+        code = index.get(label)
+        if code is None:
+            code = index[label] = len(self.labels[dim])
+            self.labels[dim].append(label)
+        return code
+
+    def append(self, row):
+        self.ids.append(row["id"] if isinstance(row.get("id"), int) else -1)
+        self.names.append(row.get("name", ""))
+        for metric in METRICS:
+            self.metrics[metric].append(parse_number(row.get(metric)))
+        self.codes["app"].append(self._code("app", row_app(row)))
+        self.codes["country"].append(self._code("country", _row_country(row)))
+        self.codes["type"].append(self._code("type", row.get("type") or "—"))
+
+    def collect(self, rows):
+        """Append rows while passing them through (lets the catalog build both from one scrape)"""
+        for row in rows:
+            self.append(row)
+            yield row
+
+    @classmethod
+    def from_rows(cls, rows):
+        table = cls()
+        for row in rows:
+            table.append(row)
+        return table
+
+    # ───────── queries ─────────
+    def select(self, query):
+        """
+        Row mask for `/appgrowth stats <query>`: an exact app (bundle ID or
+        tag), else a name pattern (fnmatch; plain text matches anywhere).
+        """
+        code = self._label_index["app"].get(query)
+        if code is not None:
+            return array("b", (c == code for c in self.codes["app"]))
+        pattern = query if any(ch in query for ch in "*?[") else f"*{query}*"
+        match = re.compile(fnmatch.translate(pattern)).match
+        matching_apps = {c for c, label in enumerate(self.labels["app"]) if match(label)}
+        return array("b", (
+            code in matching_apps or match(name) is not None
+            for code, name in zip(self.codes["app"], self.names)
+        ))
+
+    def totals(self, mask):
+        totals = {metric: sum(compress(self.metrics[metric], mask)) for metric in METRICS}
+        totals["segments"] = sum(mask)
+        return totals
+
+    def group_by(self, dim, mask, metric="profit"):
+        """[(label, segments, installs, metric sum)] for the selected rows, largest metric first"""
+        counts, installs, sums = {}, {}, {}
+        for code, inst, value in compress(zip(self.codes[dim], self.metrics["installs"], self.metrics[metric]), mask):
+            counts[code] = counts.get(code, 0) + 1
+            installs[code] = installs.get(code, 0.0) + inst
+            sums[code] = sums.get(code, 0.0) + value
+        labels = self.labels[dim]
+        groups = [(labels[code], counts[code], installs[code], sums[code]) for code in counts]
+        groups.sort(key=lambda group: (-group[3], -group[1]))
+        return groups
+
+    def top(self, mask, metric="profit", limit=REPORT_LIMIT, largest=True):
+        """[(name, metric value)] of the best (or worst) selected segments"""
+        values = self.metrics[metric]
+        rows = compress(range(len(self.ids)), mask)
+        pick = heapq.nlargest if largest else heapq.nsmallest
+        return [(self.names[i], values[i]) for i in pick(limit, rows, key=values.__getitem__)]
+
+
+def _money(value):
+    return f"${value:,.2f}"
+
+
+def _count(value):
+    return f"{value:,.0f}"
+
+
+def format_stats(table, query, limit=REPORT_LIMIT):
+    """Slack report for `/appgrowth stats <query>`; None when nothing matches"""
+    mask = table.select(query)
+    totals = table.totals(mask)
+    if not totals["segments"]:
+        return None
+    lines = [
+        f"📈 *Stats for `{query}`*: {totals['segments']:,} segments",
+        f"💰 Profit {_money(totals['profit'])} · 📲 Installs {_count(totals['installs'])} · "
+        f"👥 Size {_count(totals['size'])}",
+    ]
+    for dim, title in (("type", "By type"), ("country", "By country"), ("app", "By app")):
+        groups = table.group_by(dim, mask)
+        if dim == "app" and len(groups) < 2:
+            continue
+        lines.append(f"\n*{title}:*")
+        lines += [
+            f"• `{label}` — {count} seg · {_count(installs)} installs · {_money(profit)}"
+            for label, count, installs, profit in groups[:limit]
+        ]
+        if len(groups) > limit:
+            lines.append(f"... and {len(groups) - limit} more")
+    for title, largest in (("🏆 Top by profit", True), ("🐢 Bottom by profit", False)):
+        lines.append(f"\n*{title}:*")
+        lines += [f"• `{name}` — {_money(value)}" for name, value in table.top(mask, limit=5, largest=largest)]
+    return "\n".join(lines)
@@ -0,0 +1,92 @@
+# session_store.py — AppGrowth session cookies persisted across restarts, encrypted at rest
+import hashlib
+import json
+import logging
+import os
+import time
+
+import shared_state
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # persistence is optional; without it every start logs in again
+    Fernet = InvalidToken = None
+
+logger = logging.getLogger(__name__)
+
+# Fernet key (Fernet.generate_key()); persistence is off when unset
+SESSION_ENCRYPTION_KEY = os.getenv("SESSION_ENCRYPTION_KEY")
+
+_COOKIE_FIELDS = ("name", "value", "domain", "path", "expires", "secure")
+
+
+def _fernet():
+    if not SESSION_ENCRYPTION_KEY:
+        return None
+    if Fernet is None:
+        logger.warning("⚠️ SESSION_ENCRYPTION_KEY is set but `cryptography` is not installed, sessions are not saved")
+        return None
+    try:
+        return Fernet(SESSION_ENCRYPTION_KEY.encode())
+    except ValueError as e:
+        logger.error(f"❌ Invalid SESSION_ENCRYPTION_KEY, sessions are not saved: {e}")
+        return None
+
+
+def _path(username):
+    # The file name does not reveal the account
+    digest = hashlib.sha256((username or "default").encode()).hexdigest()[:16]
+    return os.path.join(shared_state.STATE_DIR, "sessions", f"{digest}.session")
+
+
+def save_cookies(username, jar):
+    """Encrypt and write the account's cookie jar; False when persistence is off"""
+    fernet = _fernet()
+    if fernet is None:
+        return False
+    cookies = [
+        {**{field: getattr(cookie, field) for field in _COOKIE_FIELDS}, "rest": cookie._rest}
+        for cookie in jar
+    ]
+    path = _path(username)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(fernet.encrypt(json.dumps({"saved_at": time.time(), "cookies": cookies}).encode()))
+    os.replace(tmp, path)
+    return True
+
+
+def load_cookies(username, jar):
+    """
+    Restore unexpired cookies into the jar; True if anything was restored.
+    A file that no longer decrypts (rotated key) or parses is removed.
+    """
+    fernet = _fernet()
+    path = _path(username)
+    if fernet is None or not os.path.exists(path):
+        return False
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(fernet.decrypt(f.read()))
+    except (InvalidToken, ValueError, OSError) as e:
+        logger.warning(f"⚠️ Discarding unreadable saved session for {username}: {type(e).__name__}")
+        discard_cookies(username)
+        return False
+    now = time.time()
+    restored = 0
+    for cookie in data.get("cookies", []):
+        if cookie.get("expires") and cookie["expires"] <= now:
+            continue
+        rest = cookie.pop("rest", {})
+        jar.set(**cookie, rest=rest)
+        restored += 1
+    return restored > 0
+
+
+def discard_cookies(username):
+    try:
+        os.remove(_path(username))
+    except OSError:
+        pass
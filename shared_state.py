@@ -0,0 +1,84 @@
+# shared_state.py — Small SQLite-backed state shared by all worker processes on a machine
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+# Directory for every on-disk store of the bot (mount a volume here on Fly)
+STATE_DIR = os.getenv("STATE_DIR", "state")
+
+# Workers that have not reported for this long are considered gone
+WORKER_STALE_SECONDS = 180
+
+_local = threading.local()
+
+
+def connect(name):
+    """
+    Open (or reuse, per thread) a connection to STATE_DIR/<name>.db.
+
+    Connections are autocommit with WAL so readers never block the writer;
+    callers use explicit BEGIN IMMEDIATE for read-modify-write sections.
+    """
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    # Keyed by path so a STATE_DIR changed at runtime (tests) opens the new file
+    path = os.path.join(STATE_DIR, f"{name}.db")
+    conn = conns.get(path)
+    if conn is None:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conns[path] = conn
+    return conn
+
+
+def _kv():
+    conn = connect("state")
+    ready = getattr(_local, "kv_ready", None)
+    if ready is None:
+        ready = _local.kv_ready = set()
+    if STATE_DIR not in ready:
+        conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, updated REAL NOT NULL)")
+        ready.add(STATE_DIR)
+    return conn
+
+
+def get(key, default=None):
+    row = _kv().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def put(key, value):
+    _kv().execute(
+        "INSERT INTO kv (key, value, updated) VALUES (?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+        (key, json.dumps(value), time.time()),
+    )
+
+
+def worker_id():
+    """Identifier of this process, unique across machines"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def report_worker(**fields):
+    """Publish this worker's status (e.g. auth=True) for the other workers to read"""
+    key = f"worker:{worker_id()}"
+    status = get(key, {})
+    status.update(fields)
+    status["seen"] = time.time()
+    put(key, status)
+
+
+def workers():
+    """Status of every worker that reported recently, keyed by worker id"""
+    cutoff = time.time() - WORKER_STALE_SECONDS
+    rows = _kv().execute(
+        "SELECT key, value FROM kv WHERE key LIKE 'worker:%' AND updated >= ?", (cutoff,)
+    ).fetchall()
+    return {key[len("worker:"):]: json.loads(value) for key, value in rows}
@@ -0,0 +1,59 @@
+# shutdown.py — Graceful shutdown: stop taking work, drain in-flight AppGrowth calls, checkpoint, report
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Time budget for draining and checkpointing; must fit in gunicorn's
+# graceful_timeout, which must fit in Fly's kill_timeout (see fly.toml)
+DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+
+
+class ShutdownCoordinator:
+    """
+    Runs the registered shutdown hooks once, in registration order.
+
+    Background loops poll `stopping` and stop taking new work as soon as it
+    is set; each hook gets the monotonic deadline by which everything must
+    be finished and should give up on whatever is still running then.
+    """
+
+    def __init__(self):
+        self.stopping = threading.Event()
+        self._hooks = []
+        self._lock = threading.Lock()
+        self._ran = False
+
+    def on_shutdown(self, hook):
+        """Register hook(deadline); usable as a decorator"""
+        self._hooks.append(hook)
+        return hook
+
+    def shutdown(self, reason, budget=DRAIN_SECONDS):
+        with self._lock:
+            if self._ran:
+                return
+            self._ran = True
+        logger.info(f"🛑 Shutting down ({reason}), draining for up to {budget:.0f}s")
+        self.stopping.set()
+        deadline = time.monotonic() + budget
+        for hook in self._hooks:
+            try:
+                hook(deadline)
+            except Exception as e:
+                logger.error(f"❌ Shutdown hook {getattr(hook, '__name__', hook)} failed: {e}")
+        logger.info("👋 Shutdown complete")
+
+    def install_signal_handler(self):
+        """SIGTERM → shutdown() then exit; for the dev server (gunicorn workers use worker_exit)"""
+        def handle(signum, frame):
+            self.shutdown(signal.Signals(signum).name)
+            sys.exit(0)
+        signal.signal(signal.SIGTERM, handle)
+
+
+SHUTDOWN = ShutdownCoordinator()
@@ -0,0 +1,636 @@
+# task_queue.py — Shared queue of segment tasks with leases, heartbeats and a global rate limit
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+import shared_state
+
+logger = logging.getLogger(__name__)
+
+# A leased task that is not heartbeated for this long goes back to the queue
+VISIBILITY_TIMEOUT_SECONDS = 90
+# A task whose lease expired this many times is marked failed instead of retried
+MAX_ATTEMPTS = 3
+# Rows per INSERT transaction while a job is being loaded
+INSERT_CHUNK = 500
+
+# Job states
+LOADING, RUNNING, DONE = "loading", "running", "done"
+ACTIVE_STATES = (LOADING, RUNNING)
+
+# Task states (parked: held back while AppGrowth is unavailable, see unpark_all;
+# cancelled: skipped because the job was cancelled)
+PENDING, LEASED, CREATED, FAILED, PARKED, CANCELLED = "pending", "leased", "created", "failed", "parked", "cancelled"
+UNFINISHED_STATES = (PENDING, LEASED, PARKED)
+
+# Columns added to jobs after the first release, created on older stores by _migrate
+_JOB_COLUMNS = {
+    "paused": "INTEGER NOT NULL DEFAULT 0",
+    "cancelled": "INTEGER NOT NULL DEFAULT 0",
+    "interrupted_at": "REAL NOT NULL DEFAULT 0",
+    "run_at": "REAL NOT NULL DEFAULT 0",
+    "started_at": "REAL NOT NULL DEFAULT 0",
+}
+_JOB_KEYS = ("id", "channel", "user", "scope", "notes", "state", "total", "created", "failed",
+             "created_at", "updated_at", "paused", "cancelled", "run_at", "started_at")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    channel TEXT NOT NULL,
+    user TEXT NOT NULL,
+    scope TEXT NOT NULL DEFAULT '',
+    notes TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    created INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_leased_at REAL NOT NULL DEFAULT 0,
+    paused INTEGER NOT NULL DEFAULT 0,
+    cancelled INTEGER NOT NULL DEFAULT 0,
+    interrupted_at REAL NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL DEFAULT 0,
+    started_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    app TEXT NOT NULL,
+    country TEXT NOT NULL,
+    seg_type TEXT NOT NULL,
+    value REAL NOT NULL,
+    status TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_job_status ON tasks (job_id, status, id);
+CREATE INDEX IF NOT EXISTS tasks_status_lease ON tasks (status, lease_until);
+CREATE TABLE IF NOT EXISTS rate_limits (
+    name TEXT PRIMARY KEY,
+    next_at REAL NOT NULL
+);
+"""
+
+
+class Task:
+    __slots__ = ("id", "job_id", "name", "app", "country", "seg_type", "value", "attempts", "starts_job")
+
+    def __init__(self, id, job_id, name, app, country, seg_type, value, attempts):
+        self.id, self.job_id, self.name = id, job_id, name
+        self.app, self.country, self.seg_type = app, country, seg_type
+        # RetainedAtLeast days are stored as REAL; hand them back as int
+        self.value = int(value) if seg_type == "RetainedAtLeast" else value
+        self.attempts = attempts
+        # First task leased from a scheduled job (the worker announces the start)
+        self.starts_job = False
+
+
+class TaskQueue(ABC):
+    """
+    Interface of the shared task store. SQLiteTaskQueue is the local
+    stand-in; a networked store (Postgres, Redis, ...) implements the same
+    methods with the same atomicity to spread jobs across machines.
+    """
+
+    # ───────── jobs ─────────
+    @abstractmethod
+    def create_job(self, channel, user, tasks, total=None, scope="", run_at=0):
+        """Store a job and stream its tasks in; returns the job id"""
+
+    @abstractmethod
+    def finish_loading(self, job_id, notes=""):
+        """Mark the job fully loaded; the job dict if that also finished it"""
+
+    @abstractmethod
+    def abort_job(self, job_id, error):
+        """Fail every unfinished task and close the job; the job dict or None"""
+
+    @abstractmethod
+    def pause_job(self, job_id, paused):
+        """Pause or resume a job; the job dict or None"""
+
+    @abstractmethod
+    def cancel_job(self, job_id):
+        """Cancel a job; (job, finished)"""
+
+    @abstractmethod
+    def mark_interrupted(self, job_id, window):
+        """Flag a job as interrupted by a shutdown; True for the first caller in `window`"""
+
+    @abstractmethod
+    def claim_interrupted(self):
+        """Clear and return the interrupted unfinished jobs"""
+
+
+    # ───────── workers ─────────
+    @abstractmethod
+    def lease(self, owner, visibility_timeout=VISIBILITY_TIMEOUT_SECONDS, drained=None):
+        """Lease the next task or None; jobs closed by expired leases go to `drained`"""
+
+    @abstractmethod
+    def heartbeat(self, task_ids, owner, visibility_timeout=VISIBILITY_TIMEOUT_SECONDS):
+        """Extend the leases this owner still holds"""
+
+    @abstractmethod
+    def complete(self, task, owner, ok, error=None):
+        """Record a task result; (job, finished)"""
+
+    @abstractmethod
+    def checkpoint(self, task, owner):
+        """Pause/cancel check before a task's AppGrowth call; None or (job, finished)"""
+
+    @abstractmethod
+    def park(self, task, owner, reason):
+        """Park a task with its job's pending tasks; (job, parked, first)"""
+
+    @abstractmethod
+    def unpark_all(self):
+        """Requeue every parked task; [(job, count)]"""
+
+    @abstractmethod
+    def has_parked(self):
+        """True when any task is parked"""
+
+    @abstractmethod
+    def release(self, task, owner):
+        """Hand a leased task back untouched"""
+
+    @abstractmethod
+    def leased_count(self, owner_prefix):
+        """Leases held by owners whose id starts with owner_prefix"""
+
+    @abstractmethod
+    def reserve_rate_slot(self, name, interval):
+        """Seconds to wait for the next slot of a shared rate limit"""
+
+
+    # ───────── reads ─────────
+    @abstractmethod
+    def job(self, job_id):
+        """The job dict or None"""
+
+    @abstractmethod
+    def jobs(self, since):
+        """Unfinished jobs plus jobs finished after `since`, newest first"""
+
+    @abstractmethod
+    def task_counts(self, job_id):
+        """{task status: count} for a job"""
+
+    @abstractmethod
+    def remaining_tasks(self, job_id):
+        """(app_id, country, seg_type, value) of every unfinished task"""
+
+    @abstractmethod
+    def task_names(self, job_id, status, limit):
+        """Names of up to `limit` tasks with this status"""
+
+    @abstractmethod
+    def iter_results(self, job_id, chunk=INSERT_CHUNK):
+        """Stream the per-task results of a job in plan order"""
+
+    @abstractmethod
+    def purge_tasks(self, job_id, chunk=INSERT_CHUNK):
+        """Delete a finished job's task rows"""
+
+
+class SQLiteTaskQueue(TaskQueue):
+    """
+    Task store in STATE_DIR/<name>.db. Every read-modify-write runs in a
+    BEGIN IMMEDIATE transaction, so any number of threads and processes
+    sharing the file see each task leased by at most one owner at a time.
+    """
+
+    def __init__(self, name="tasks"):
+        self.name = name
+        db = self._db()
+        db.executescript(_SCHEMA)
+        self._migrate(db)
+
+    def _migrate(self, db):
+        existing = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+        for column, ddl in _JOB_COLUMNS.items():
+            if column not in existing:
+                db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {ddl}")
+
+    def _db(self):
+        return shared_state.connect(self.name)
+
+    def _transaction(self):
+        return _Transaction(self._db())
+
+    # ───────── producers ─────────
+    def create_job(self, channel, user, tasks, total=None, scope="", run_at=0):
+        """
+        Store a job and stream its (app_id, country, seg_type, value, name) tasks
+        in chunks. Workers may lease tasks while the job is still loading;
+        call finish_loading() once the iterator is exhausted.
+        run_at: scheduled start (epoch seconds); no task is leased before it, 0 = now
+        """
+        job_id = uuid.uuid4().hex[:8]
+        now = time.time()
+        db = self._db()
+        db.execute(
+            "INSERT INTO jobs (id, channel, user, scope, state, total, created_at, updated_at, run_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, channel, user, scope, LOADING, total or 0, now, now, run_at or 0),
+        )
+
+        chunk, loaded = [], 0
+        for app_id, country, seg_type, value, name in tasks:
+            chunk.append((job_id, name, app_id, country, seg_type, value, PENDING))
+            if len(chunk) >= INSERT_CHUNK:
+                loaded += len(chunk)
+                if not self._insert_tasks(job_id, chunk, loaded):
+                    return job_id  # cancelled while loading: drop the rest of the stream
+                chunk = []
+        if chunk:
+            loaded += len(chunk)
+            self._insert_tasks(job_id, chunk, loaded)
+        return job_id
+
+    def _insert_tasks(self, job_id, rows, loaded):
+        """Insert a chunk of tasks; False if the job was cancelled meanwhile"""
+        with self._transaction() as db:
+            if db.execute("SELECT cancelled FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]:
+                return False
+            db.executemany(
+                "INSERT INTO tasks (job_id, name, app, country, seg_type, value, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            db.execute("UPDATE jobs SET total = MAX(total, ?) WHERE id = ?", (loaded, job_id))
+        return True
+
+    def finish_loading(self, job_id, notes=""):
+        """Mark the job fully loaded; returns the job dict if that also finished it (empty or already processed)"""
+        with self._transaction() as db:
+            total = db.execute("SELECT COUNT(*) FROM tasks WHERE job_id = ?", (job_id,)).fetchone()[0]
+            db.execute(
+                "UPDATE jobs SET state = ?, total = ?, notes = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, total, notes, time.time(), job_id),
+            )
+            return self._finish_if_drained(db, job_id)
+
+    def abort_job(self, job_id, error):
+        """Fail every unfinished task of a job and close it; returns the job dict (None if it was already closed)"""
+        now = time.time()
+        with self._transaction() as db:
+            job = self._job(db, job_id)
+            if job is None or job["state"] == DONE:
+                return None
+            cur = db.execute(
+                "UPDATE tasks SET status = ?, error = ?, lease_owner = NULL WHERE job_id = ? AND status IN (?, ?, ?)",
+                (FAILED, error, job_id, *UNFINISHED_STATES),
+            )
+            db.execute(
+                "UPDATE jobs SET failed = failed + ?, state = ?, updated_at = ? WHERE id = ?",
+                (cur.rowcount, DONE, now, job_id),
+            )
+            return self._job(db, job_id)
+
+    # ───────── workers ─────────
+    def lease(self, owner, visibility_timeout=VISIBILITY_TIMEOUT_SECONDS, drained=None):
+        """
+        Lease the next task, round-robin across active jobs, or None.
+        Tasks whose lease expired (dead worker) are picked up again first;
+        jobs finished by failing such a task for good are appended to
+        `drained` so the caller posts their summary.
+        Scheduled jobs are skipped until their run_at.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            task_id = self._reclaim_expired(db, now, drained)
+            if task_id is None:
+                # Paused and cancelled jobs get no new leases: their share goes to the other jobs
+                jobs = db.execute(
+                    "SELECT id FROM jobs WHERE state IN (?, ?) AND paused = 0 AND cancelled = 0 AND run_at <= ? "
+                    "ORDER BY last_leased_at",
+                    (*ACTIVE_STATES, now),
+                ).fetchall()
+                for (job_id,) in jobs:
+                    row = db.execute(
+                        "SELECT id FROM tasks WHERE job_id = ? AND status = ? AND not_before <= ? ORDER BY id LIMIT 1",
+                        (job_id, PENDING, now),
+                    ).fetchone()
+                    if row:
+                        task_id = row[0]
+                        break
+            if task_id is None:
+                return None
+
+            db.execute(
+                "UPDATE tasks SET status = ?, lease_owner = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (LEASED, owner, now + visibility_timeout, task_id),
+            )
+            row = db.execute(
+                "SELECT id, job_id, name, app, country, seg_type, value, attempts FROM tasks WHERE id = ?", (task_id,)
+            ).fetchone()
+            db.execute("UPDATE jobs SET last_leased_at = ? WHERE id = ?", (now, row[1]))
+            task = Task(*row)
+            task.starts_job = db.execute(
+                "UPDATE jobs SET started_at = ? WHERE id = ? AND run_at > 0 AND started_at = 0", (now, row[1])
+            ).rowcount == 1
+            return task
+
+    def _reclaim_expired(self, db, now, drained=None):
+        while True:
+            row = db.execute(
+                "SELECT id, job_id, attempts, lease_owner FROM tasks WHERE status = ? AND lease_until < ? LIMIT 1",
+                (LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            task_id, job_id, attempts, owner = row
+            if attempts < MAX_ATTEMPTS:
+                logger.warning(f"♻️ Lease of task {task_id} held by {owner} expired, re-queueing")
+                return task_id
+            logger.warning(f"💀 Lease of task {task_id} held by {owner} expired {attempts} times, giving up")
+            db.execute(
+                "UPDATE tasks SET status = ?, error = ?, lease_owner = NULL WHERE id = ?",
+                (FAILED, "lease expired", task_id),
+            )
+            db.execute("UPDATE jobs SET failed = failed + 1, updated_at = ? WHERE id = ?", (now, job_id))
+            finished = self._finish_if_drained(db, job_id)
+            if finished is not None and drained is not None:
+                drained.append(finished)
+
+    def heartbeat(self, task_ids, owner, visibility_timeout=VISIBILITY_TIMEOUT_SECONDS):
+        """Extend the leases this owner still holds"""
+        if not task_ids:
+            return
+        marks = ",".join("?" * len(task_ids))
+        self._db().execute(
+            f"UPDATE tasks SET lease_until = ? WHERE lease_owner = ? AND status = ? AND id IN ({marks})",
+            (time.time() + visibility_timeout, owner, LEASED, *task_ids),
+        )
+
+    def complete(self, task, owner, ok, error=None):
+        """
+        Record a task result. Returns (job, finished): the job dict after the
+        update, and True for exactly one caller — the one that finished the job.
+        Results from an owner whose lease was taken over are ignored (job None).
+        """
+        status = CREATED if ok else FAILED
+        with self._transaction() as db:
+            cur = db.execute(
+                "UPDATE tasks SET status = ?, error = ?, lease_owner = NULL WHERE id = ? AND status = ? AND lease_owner = ?",
+                (status, error, task.id, LEASED, owner),
+            )
+            if cur.rowcount == 0:
+                return None, False
+            column = "created" if ok else "failed"
+            db.execute(f"UPDATE jobs SET {column} = {column} + 1, updated_at = ? WHERE id = ?", (time.time(), task.job_id))
+            finished = self._finish_if_drained(db, task.job_id)
+            return finished or self._job(db, task.job_id), finished is not None
+
+    def checkpoint(self, task, owner):
+        """
+        Cooperative stop check right before a leased task calls AppGrowth.
+        Returns None to go ahead; otherwise the task was handed back (paused
+        job) or skipped (cancelled job) and (job, finished) is returned as
+        for complete().
+        """
+        with self._transaction() as db:
+            job = self._job(db, task.job_id)
+            if job is None or not (job["paused"] or job["cancelled"]):
+                return None
+            status = CANCELLED if job["cancelled"] else PENDING
+            cur = db.execute(
+                "UPDATE tasks SET status = ?, lease_owner = NULL, attempts = attempts - 1 "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (status, task.id, LEASED, owner),
+            )
+            if cur.rowcount == 0:
+                return None, False
+            finished = self._finish_if_drained(db, task.job_id)
+            return finished or job, finished is not None
+
+    def pause_job(self, job_id, paused):
+        """Pause or resume a job; returns the job dict, None if it is unknown or already finished"""
+        with self._transaction() as db:
+            job = self._job(db, job_id)
+            if job is None or job["state"] == DONE or job["cancelled"]:
+                return None
+            db.execute(
+                "UPDATE jobs SET paused = ?, updated_at = ? WHERE id = ?", (int(paused), time.time(), job_id)
+            )
+            return self._job(db, job_id)
+
+    def cancel_job(self, job_id):
+        """
+        Cancel a job: queued and parked tasks are skipped, leased ones drain.
+        Returns (job, finished) — finished when nothing was in flight — or
+        (None, False) if the job is unknown or already finished.
+        """
+        with self._transaction() as db:
+            job = self._job(db, job_id)
+            if job is None or job["state"] == DONE or job["cancelled"]:
+                return None, False
+            db.execute(
+                "UPDATE tasks SET status = ?, lease_owner = NULL WHERE job_id = ? AND status IN (?, ?)",
+                (CANCELLED, job_id, PENDING, PARKED),
+            )
+            db.execute(
+                "UPDATE jobs SET cancelled = 1, paused = 0, updated_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+            finished = self._finish_if_drained(db, job_id)
+            return finished or self._job(db, job_id), finished is not None
+
+    def park(self, task, owner, reason):
+        """
+        Park a leased task together with every pending task of its job.
+        Returns (job, parked, first): parked is the job's parked task count,
+        first is True when this call parked the job (nothing was parked before).
+        """
+        with self._transaction() as db:
+            before = db.execute(
+                "SELECT COUNT(*) FROM tasks WHERE job_id = ? AND status = ?", (task.job_id, PARKED)
+            ).fetchone()[0]
+            db.execute(
+                "UPDATE tasks SET status = ?, error = ?, lease_owner = NULL, attempts = attempts - 1 "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (PARKED, reason, task.id, LEASED, owner),
+            )
+            db.execute(
+                "UPDATE tasks SET status = ?, error = ? WHERE job_id = ? AND status = ?",
+                (PARKED, reason, task.job_id, PENDING),
+            )
+            parked = db.execute(
+                "SELECT COUNT(*) FROM tasks WHERE job_id = ? AND status = ?", (task.job_id, PARKED)
+            ).fetchone()[0]
+            return self._job(db, task.job_id), parked, before == 0 and parked > 0
+
+    def unpark_all(self):
+        """Put every parked task back in the queue; returns [(job, count)] per resumed job"""
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT job_id, COUNT(*) FROM tasks WHERE status = ? GROUP BY job_id", (PARKED,)
+            ).fetchall()
+            db.execute("UPDATE tasks SET status = ?, error = NULL WHERE status = ?", (PENDING, PARKED))
+            return [(self._job(db, job_id), count) for job_id, count in rows]
+
+    def release(self, task, owner):
+        """Hand a leased task back untouched (worker stopping before its AppGrowth call)"""
+        self._db().execute(
+            "UPDATE tasks SET status = ?, lease_owner = NULL, attempts = attempts - 1 "
+            "WHERE id = ? AND status = ? AND lease_owner = ?",
+            (PENDING, task.id, LEASED, owner),
+        )
+
+    def leased_count(self, owner_prefix):
+        """Leases currently held by owners whose id starts with owner_prefix (e.g. one host)"""
+        return self._db().execute(
+            "SELECT COUNT(*) FROM tasks WHERE status = ? AND lease_owner LIKE ?", (LEASED, owner_prefix + "%")
+        ).fetchone()[0]
+
+    def mark_interrupted(self, job_id, window):
+        """
+        Flag a job as interrupted by a shutdown. True for the first caller
+        within `window` seconds, so sibling processes report it only once.
+        """
+        now = time.time()
+        cur = self._db().execute(
+            "UPDATE jobs SET interrupted_at = ? WHERE id = ? AND interrupted_at < ?", (now, job_id, now - window)
+        )
+        return cur.rowcount == 1
+
+    def claim_interrupted(self):
+        """Clear the interrupted flag of unfinished jobs; returns those jobs (once, to one caller)"""
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT id FROM jobs WHERE interrupted_at > 0 AND state != ? AND cancelled = 0", (DONE,)
+            ).fetchall()
+            db.execute("UPDATE jobs SET interrupted_at = 0 WHERE interrupted_at > 0")
+            return [self._job(db, job_id) for (job_id,) in rows]
+
+    def has_parked(self):
+        return self._db().execute("SELECT 1 FROM tasks WHERE status = ? LIMIT 1", (PARKED,)).fetchone() is not None
+
+    def _finish_if_drained(self, db, job_id):
+        job = self._job(db, job_id)
+        if job is None or job["state"] != RUNNING:
+            return None  # still loading (or already finished)
+        # EXISTS, not COUNT: this runs after every task, counting would make a job O(n²)
+        remaining = db.execute(
+            "SELECT 1 FROM tasks WHERE job_id = ? AND status IN (?, ?, ?) LIMIT 1", (job_id, *UNFINISHED_STATES)
+        ).fetchone()
+        if remaining:
+            return None
+        db.execute("UPDATE jobs SET state = ?, updated_at = ? WHERE id = ?", (DONE, time.time(), job_id))
+        job["state"] = DONE
+        return job
+
+    # ───────── reads ─────────
+    def _job(self, db, job_id):
+        row = db.execute(f"SELECT {', '.join(_JOB_KEYS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else self._job_dict(row)
+
+    def _job_dict(self, row):
+        job = dict(zip(_JOB_KEYS, row))
+        job["processed"] = job["created"] + job["failed"]
+        return job
+
+    def job(self, job_id):
+        return self._job(self._db(), job_id)
+
+    def jobs(self, since):
+        """Unfinished jobs plus jobs finished after `since`, newest first"""
+        rows = self._db().execute(
+            f"SELECT {', '.join(_JOB_KEYS)} FROM jobs WHERE state != ? OR updated_at >= ? ORDER BY created_at DESC",
+            (DONE, since),
+        ).fetchall()
+        return [self._job_dict(row) for row in rows]
+
+    def task_counts(self, job_id):
+        """{task status: count} for a job"""
+        rows = self._db().execute(
+            "SELECT status, COUNT(*) FROM tasks WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall()
+        return dict(rows)
+
+    def remaining_tasks(self, job_id):
+        """(app_id, country, seg_type, value) of every unfinished task of a job"""
+        marks = ",".join("?" * len(UNFINISHED_STATES))
+        for app_id, country, seg_type, value in self._db().execute(
+            f"SELECT app, country, seg_type, value FROM tasks WHERE job_id = ? AND status IN ({marks}) ORDER BY id",
+            (job_id, *UNFINISHED_STATES),
+        ):
+            yield app_id, country, seg_type, int(value) if seg_type == "RetainedAtLeast" else value
+
+    def iter_results(self, job_id, chunk=INSERT_CHUNK):
+        """Stream (name, app, country, seg_type, value, status, error) of a job's tasks in plan order"""
+        cur = self._db().execute(
+            "SELECT name, app, country, seg_type, value, status, error FROM tasks WHERE job_id = ? ORDER BY id",
+            (job_id,),
+        )
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                return
+            yield from rows
+
+    def purge_tasks(self, job_id, chunk=INSERT_CHUNK):
+        """Delete a finished job's task rows in small transactions (its counters stay on the job)"""
+        while True:
+            with self._transaction() as db:
+                cur = db.execute(
+                    "DELETE FROM tasks WHERE id IN (SELECT id FROM tasks WHERE job_id = ? LIMIT ?)", (job_id, chunk)
+                )
+            if cur.rowcount < chunk:
+                return
+
+    def task_names(self, job_id, status, limit):
+        rows = self._db().execute(
+            "SELECT name FROM tasks WHERE job_id = ? AND status = ? ORDER BY id LIMIT ?", (job_id, status, limit)
+        ).fetchall()
+        return [name for (name,) in rows]
+
+    # ───────── global rate limit ─────────
+    def reserve_rate_slot(self, name, interval):
+        """
+        Reserve the next slot of a rate limit shared by every worker using this
+        store; returns how many seconds the caller must wait before its call.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT next_at FROM rate_limits WHERE name = ?", (name,)).fetchone()
+            slot = max(now, row[0]) if row else now
+            db.execute(
+                "INSERT INTO rate_limits (name, next_at) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET next_at = excluded.next_at",
+                (name, slot + interval),
+            )
+        return slot - now
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK around a block"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+_queue = None
+
+
+def open_queue():
+    """Process-wide task queue (the SQLite stand-in for now)"""
+    global _queue
+    if _queue is None:
+        _queue = SQLiteTaskQueue()
+    return _queue
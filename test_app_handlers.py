@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""Test the Slack handlers of app.py: modal ack/lazy split, known-app validation, CSV uploads, bulk delete"""
+
+import contextlib
+import os
+import threading
+
+import loadtest
+from known_apps import KnownApps, row_apps
+
+
+def _import_app():
+    """app.py needs Slack credentials and calls auth.test on import: point it at a stub Slack once"""
+    server, url = loadtest.start_stub_slack()
+    env = {"SLACK_BOT_TOKEN": "xoxb-test", "SLACK_SIGNING_SECRET": "test-secret", "SLACK_API_URL": url + "/api/"}
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        import app
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        server.shutdown()
+    return app
+
+
+app = _import_app()
+
+
+@contextlib.contextmanager
+def patched(target, **attrs):
+    """Set attributes of a module or object for the duration of a test"""
+    saved = {name: getattr(target, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+
+def join_new_threads(before, timeout=5):
+    """Wait for the threads a handler started (uploads and batches are queued from threads)"""
+    for thread in threading.enumerate():
+        if thread not in before:
+            thread.join(timeout)
+
+
+class FakeClient:
+    """Slack WebClient stand-in recording ephemeral messages"""
+
+    def __init__(self, files=None):
+        self.files = files or {}
+        self.posted = []
+
+    def chat_postEphemeral(self, **kwargs):
+        self.posted.append(kwargs)
+
+    def files_info(self, file):
+        return {"file": self.files[file]}
+
+
+def modal_body(bundle_ids="com.easybrain.sudoku", countries=("USA",), allow_new_apps=False):
+    values = {
+        "app_id_block": {"app_id_input": {"value": bundle_ids}},
+        "countries_block": {"countries_input": {"selected_options": [{"value": c} for c in countries]}},
+        "all_segments_block": {"all_segments_input": {"selected_options": [{"value": "all_segments"}]}},
+    }
+    if allow_new_apps:
+        values["allow_new_apps_block"] = {"allow_new_apps_input": {"selected_options": [{"value": "allow_new_apps"}]}}
+    return {"view": {"state": {"values": values}, "private_metadata": "C1"}, "user": {"id": "U1"}}
+
+
+def submit_modal(body, context, known_apps=None):
+    """Ack path against the given known apps (an empty, not yet loaded set by default)"""
+    acks = []
+    with patched(app, KNOWN_APPS=known_apps or KnownApps()):
+        app.validate_multiple_segments_submission(ack=lambda **kwargs: acks.append(kwargs), body=body, context=context)
+    return acks
+
+
+def run_lazy(body, context, client):
+    """Lazy listener with batch submission captured instead of queued"""
+    batches = []
+    before = set(threading.enumerate())
+    submit = lambda *args, **kwargs: batches.append((args, kwargs))
+    with patched(app, submit_segment_batch=submit, KNOWN_APPS=KnownApps()):
+        app.start_multiple_segments(body, client, context)
+        join_new_threads(before)
+    return batches
+
+
+def test_lazy_starts_from_ack_result():
+    """The ack hands its validated submission to the lazy listener, which doesn't recompute it"""
+    body, context = modal_body(), {}
+    assert submit_modal(body, context) == [{}]
+    inputs, run_at = context["accepted_submission"]
+    assert inputs["bundle_ids"] == ["com.easybrain.sudoku"] and run_at == 0
+
+    # The modal state changing after the ack (or a stale recomputation) must not matter
+    body["view"]["state"]["values"]["app_id_block"]["app_id_input"]["value"] = ""
+    client = FakeClient()
+    batches = run_lazy(body, context, client)
+    assert len(batches) == 1
+    (_client, channel, user, tasks), kwargs = batches[0]
+    assert (channel, user, kwargs["total"], kwargs["run_at"]) == ("C1", "U1", 5, 0)
+    assert {task[0] for task in tasks} == {"com.easybrain.sudoku"}
+    assert client.posted[0]["text"].startswith("🔄 *Creating 5 segments...*")
+    print("✅ Lazy listener starts from the ack's result\n")
+
+
+def test_rejected_submission_queues_nothing():
+    body, context = modal_body(bundle_ids="abc", countries=()), {}
+    acks = submit_modal(body, context)
+    assert acks[0]["response_action"] == "errors"
+    assert set(acks[0]["errors"]) == {"app_id_block", "countries_block"}
+    assert "accepted_submission" not in context
+
+    client = FakeClient()
+    assert run_lazy(body, context, client) == []
+    assert client.posted == [], "Errors are shown in the open modal, not posted"
+    print("✅ Rejected submission queues no batch\n")
+
+
+def test_lazy_without_accepted_submission():
+    """An ack that failed after closing the modal: the lazy listener validates and reports"""
+    client = FakeClient()
+    assert run_lazy(modal_body(bundle_ids="abc"), {}, client) == []
+    assert client.posted[0]["text"].startswith("❌ *Segments not created:*")
+    assert "Bundle IDs too short: abc" in client.posted[0]["text"]
+
+    client = FakeClient()
+    assert len(run_lazy(modal_body(), {}, client)) == 1
+    print("✅ Lazy listener without an accepted submission\n")
+
+
+def known(*tags):
+    """Known apps loaded from listing rows with these tag options (no campaigns)"""
+    apps = KnownApps()
+    apps.replace(app_id for tag in tags for app_id in row_apps({"options": {"tag": tag}}))
+    return apps
+
+
+def modal_errors(known_apps, **kwargs):
+    inputs = app.extract_modal_inputs(modal_body(**kwargs)["view"]["state"]["values"])
+    with patched(app, KNOWN_APPS=known_apps):
+        return app.validate_modal_inputs(inputs), app.format_plan_preview(inputs)
+
+
+def test_unknown_app_rejected():
+    errors, preview = modal_errors(known("com.easybrain.sudoku"), bundle_ids="com.easybrain.sudoku\ncom.easybrian.sudoku")
+    assert errors["app_id_block"].startswith("Unknown app IDs: com.easybrian.sudoku.")
+    assert "⚠️ Unknown app IDs: com.easybrian.sudoku" in preview
+    print("✅ Unknown app ID rejected\n")
+
+
+def test_new_apps_override():
+    errors, preview = modal_errors(known("com.easybrain.sudoku"), bundle_ids="com.brand.new", allow_new_apps=True)
+    assert errors == {} and "Unknown app IDs" not in preview
+    print("✅ New Apps override accepted\n")
+
+
+def test_nothing_rejected_before_first_load():
+    errors, _ = modal_errors(KnownApps(), bundle_ids="com.anything.at.all")
+    assert errors == {}
+    print("✅ Nothing rejected before the known apps load\n")
+
+
+def test_platform_tags_accept_bare_ids():
+    apps = known("1523297725_iOS", "1601234567_Android")
+    for bundle_ids in ("1523297725", "1523297725_iOS", "1601234567", "1601234567_Android"):
+        errors, _ = modal_errors(apps, bundle_ids=bundle_ids)
+        assert errors == {}, (bundle_ids, errors)
+    errors, _ = modal_errors(apps, bundle_ids="1523297726")
+    assert "app_id_block" in errors
+    print("✅ _iOS/_Android tags accept the bare store id\n")
+
+
+UPLOAD_LINES = {
+    "F_DM": ["com.easybrain.sudoku,USA,all"],
+    "F_NOHEADER": ["com.easybrain.sudoku,USA,all"],
+    "F_HEADER": ["app,country,type", "com.easybrain.sudoku,USA,RetainedAtLeast_7"],
+    "F_BOT": ["job,segment,status,error", "1,bloom_x,created,"],
+}
+
+
+def fake_download(url, token):
+    # A generator like iter_slack_file_lines: the handler closes it when done
+    yield from UPLOAD_LINES[url]
+
+
+def upload_client():
+    files = {
+        file_id: {"id": file_id, "name": f"{file_id}.csv", "filetype": "csv", "url_private_download": file_id,
+                  "user": "U0BOT" if file_id == "F_BOT" else "U1"}
+        for file_id in UPLOAD_LINES
+    }
+    return FakeClient(files)
+
+
+def share_file(client, file_id, channel_id, user_id):
+    """Run handle_file_shared with the download stubbed; returns what was posted"""
+    before = set(threading.enumerate())
+    with patched(app, iter_slack_file_lines=fake_download):
+        app.handle_file_shared({"file_id": file_id, "channel_id": channel_id, "user_id": user_id},
+                               client, {"bot_user_id": "U0BOT"})
+        join_new_threads(before)
+    return client.posted
+
+
+def test_bot_and_headerless_uploads_ignored():
+    client = upload_client()
+    # The bot's own result CSV, sent to a user's DM
+    assert share_file(client, "F_BOT", "D1", "U0BOT") == []
+    # Someone else re-sharing a bot-authored file
+    assert share_file(client, "F_BOT", "D1", "U1") == []
+    # A CSV without the app,country,type header in a channel
+    assert share_file(client, "F_NOHEADER", "C1", "U1") == []
+    # The same rows in a DM with the bot do count
+    prompt = share_file(client, "F_DM", "D1", "U1")[0]
+    assert prompt["text"].startswith("📎 *`F_DM.csv`: 5 segments from 1 rows*")
+    print("✅ Bot-authored and headerless channel uploads ignored\n")
+
+
+def test_only_uploader_confirms():
+    client = upload_client()
+    prompt = share_file(client, "F_HEADER", "C1", "U1")[0]
+    confirm, cancel = prompt["blocks"][1]["elements"]
+    assert confirm["action_id"] == "upload_confirm_btn" and cancel["action_id"] == "upload_cancel_btn"
+
+    batches, responses = [], []
+    before = set(threading.enumerate())
+    with patched(app, submit_segment_batch=lambda *args, **kwargs: batches.append((args, kwargs)),
+                 iter_slack_file_lines=fake_download):
+        body = {"actions": [confirm], "user": {"id": "U2"}}
+        app.handle_upload_confirm(body, client, lambda **kwargs: responses.append(kwargs))
+        assert responses[-1]["text"].startswith("⛔ Only the person who shared the file")
+        body["user"]["id"] = "U1"
+        app.handle_upload_confirm(body, client, lambda **kwargs: responses.append(kwargs))
+        join_new_threads(before)
+        assert len(batches) == 1
+        (_client, channel, user, tasks), kwargs = batches[0]
+        assert (channel, user, kwargs["scope"]) == ("C1", "U1", "📎 From `F_HEADER.csv`")
+        assert list(tasks) == [("com.easybrain.sudoku", "USA", "RetainedAtLeast", 7)]
+    print("✅ Only the uploader can confirm\n")
+
+
+def test_bulk_delete_needs_admin():
+    """Confirmed bulk delete fails closed when no admins are configured"""
+    def bulk_delete(user_id):
+        texts = []
+        respond = lambda blocks: texts.append(blocks[0]["text"]["text"])
+        command = {"user_id": user_id, "channel_id": "C1"}
+        app.handle_bulk_command(respond, command, FakeClient(), "delete", ["bloom_com.test.app_*", "--confirm"])
+        return texts
+
+    with patched(app, ADMIN_USER_IDS=set(), select_segments=lambda selector: iter(())):
+        assert bulk_delete("U1") == ["⛔ Only admins can bulk delete segments (set `ADMIN_USER_IDS`)"]
+    with patched(app, ADMIN_USER_IDS={"U1"}, select_segments=lambda selector: iter(())):
+        assert bulk_delete("U2")[0].startswith("⛔ Only admins")
+        assert bulk_delete("U1")[-1].startswith("📭 No segments match")
+    print("✅ Bulk delete requires an admin\n")
+
+
+if __name__ == "__main__":
+    test_lazy_starts_from_ack_result()
+    test_rejected_submission_queues_nothing()
+    test_lazy_without_accepted_submission()
+    test_unknown_app_rejected()
+    test_new_apps_override()
+    test_nothing_rejected_before_first_load()
+    test_platform_tags_accept_bare_ids()
+    test_bot_and_headerless_uploads_ignored()
+    test_only_uploader_confirms()
+    test_bulk_delete_needs_admin()
+    print("🎉 All app handler tests passed!")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Test off-peak windows, the peak/off-peak worker budget and start times from the modal"""
+
+import datetime
+
+from batch_schedule import OffPeakWindows, WorkerBudget, parse_hours, parse_run_at
+
+UTC = datetime.timezone.utc
+
+
+def ts(*args):
+    return datetime.datetime(*args, tzinfo=UTC).timestamp()
+
+
+def test_parse_hours():
+    assert parse_hours("20-8") == (20, 8)
+    assert parse_hours("0-24") == (0, 0)
+    assert parse_hours("") is None
+    for bad in ("8-8", "25-3", "night"):
+        try:
+            parse_hours(bad)
+            raise AssertionError(f"{bad!r} accepted")
+        except ValueError:
+            pass
+    print("✅ Off-peak hours parsed\n")
+
+
+def test_windows_wrap_midnight_and_weekends():
+    windows = OffPeakWindows("20-8", weekends=True, timezone="UTC")
+    # 2026-10-19 is a Monday
+    assert windows.is_offpeak(ts(2026, 10, 19, 21, 30))
+    assert windows.is_offpeak(ts(2026, 10, 20, 7, 59))
+    assert not windows.is_offpeak(ts(2026, 10, 20, 8, 0))
+    assert not windows.is_offpeak(ts(2026, 10, 23, 14, 0))
+    assert windows.is_offpeak(ts(2026, 10, 24, 14, 0))  # Saturday
+
+    monday_noon = ts(2026, 10, 19, 12, 15)
+    assert windows.next_start(monday_noon) == ts(2026, 10, 19, 20, 0)
+    assert windows.next_start(ts(2026, 10, 19, 23, 0)) == ts(2026, 10, 19, 23, 0)
+
+    weekdays = OffPeakWindows("", weekends=True, timezone="UTC")
+    assert weekdays.next_start(monday_noon) == ts(2026, 10, 24, 0, 0)
+    assert OffPeakWindows("", weekends=False, timezone="UTC").next_start(monday_noon) is None
+    print("✅ Windows wrap midnight and cover weekends\n")
+
+
+def test_budget_and_run_at():
+    windows = OffPeakWindows("20-8", weekends=False, timezone="UTC")
+    budget = WorkerBudget(windows, peak_workers=2, offpeak_workers=6, peak_interval=0.5, offpeak_interval=0.2,
+                          peak_account_interval=0.5, offpeak_account_interval=0.25)
+    assert budget.current(ts(2026, 10, 19, 12, 0)) == (2, 0.5)
+    assert budget.current(ts(2026, 10, 19, 22, 0)) == (6, 0.2)
+    # The account spacing relaxes too: with one account it, not the global interval, is the cap
+    assert budget.account_interval(ts(2026, 10, 19, 12, 0)) == 0.5
+    assert budget.account_interval(ts(2026, 10, 19, 22, 0)) == 0.25
+
+    now = ts(2026, 10, 19, 12, 0)
+    assert parse_run_at("now", None, now, windows) == 0
+    assert parse_run_at("offpeak", None, now, windows) == ts(2026, 10, 19, 20, 0)
+    assert parse_run_at("at", now + 3600, now, windows) == now + 3600
+    for mode, picked in (("at", None), ("at", now - 60), ("at", now + 30 * 86400)):
+        try:
+            parse_run_at(mode, picked, now, windows)
+            raise AssertionError(f"{picked} accepted")
+        except ValueError as e:
+            print(f"   rejected: {e}")
+    print("✅ Budget follows the window, start times validated\n")
+
+
+if __name__ == "__main__":
+    test_parse_hours()
+    test_windows_wrap_midnight_and_weekends()
+    test_budget_and_run_at()
+    print("🎉 All batch schedule tests passed!")
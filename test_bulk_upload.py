@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test streamed CSV/TSV batch upload parsing"""
+
+from bulk_upload import (
+    UploadSummary, format_upload_confirmation, has_upload_header, is_direct_message, iter_upload_tasks, scan_upload,
+)
+
+
+def test_csv_upload():
+    """Header, valid rows, "all" expansion and invalid rows"""
+    lines = [
+        "app,country,type",
+        "com.easybrain.sudoku,usa,RetainedAtLeast_7",
+        "com.easybrain.sudoku,GBR,all",
+        "com.easybrain.sudoku,XXX,RetainedAtLeast_7",
+        "com.easybrain.sudoku,DEU,Retained_7",
+        "abc,DEU,RetainedAtLeast_7",
+        "com.easybrain.sudoku,DEU",
+        "",
+    ]
+    summary = UploadSummary()
+    tasks = list(iter_upload_tasks(lines, summary))
+
+    print(f"Tasks: {len(tasks)}, invalid: {summary.invalid}")
+    assert tasks[0] == ("com.easybrain.sudoku", "USA", "RetainedAtLeast", 7), "Test 1 failed"
+    assert len(tasks) == 6, "Test 1 failed (all should expand to 5 types)"
+    assert summary.rows == 6 and summary.tasks == 6
+    assert summary.invalid == {"bad country": 1, "bad type": 1, "bad app id": 1, "missing columns": 1}
+    report = summary.format()
+    print(report)
+    assert "Skipped 4/6 invalid rows" in report
+    print("✅ CSV upload parsed\n")
+
+
+def test_tsv_upload_is_lazy():
+    """TSV is detected from the first line and rows are consumed one at a time"""
+    consumed = []
+
+    def lines():
+        for i in range(100000):
+            consumed.append(i)
+            yield f"com.example.app{i}\tUSA\tActiveUsers_0.95"
+
+    summary = UploadSummary()
+    tasks = iter_upload_tasks(lines(), summary)
+    first = next(tasks)
+    print(f"First task: {first}, lines consumed: {len(consumed)}")
+    assert first == ("com.example.app0", "USA", "ActiveUsers", 0.95)
+    assert len(consumed) < 10, "Upload was not streamed"
+    print("✅ TSV upload streamed\n")
+
+
+def test_valid_upload_has_no_report():
+    summary = UploadSummary()
+    list(iter_upload_tasks(["com.easybrain.sudoku,USA,ActiveUsers_0.80"], summary))
+    assert summary.format() == ""
+    print("✅ No report for valid upload\n")
+
+
+def test_upload_gate_and_confirmation():
+    """Outside DMs only files with an explicit header count; the prompt shows counts and a preview"""
+    assert is_direct_message("D0123") and not is_direct_message("C0123") and not is_direct_message(None)
+    assert has_upload_header("\ufeffApp,Country,Type")
+    assert has_upload_header("bundle_id\tcountry\ttype\tnotes")
+    assert not has_upload_header("job,segment,status,error")  # the bot's own result CSV
+    assert not has_upload_header("com.easybrain.sudoku,USA,all")
+
+    summary = UploadSummary()
+    lines = ["app,country,type"] + [f"com.example.app{i},USA,all" for i in range(4)] + ["bad,USA,all"]
+    preview = scan_upload(lines, summary)
+    assert len(preview) == 5 and summary.tasks == 20 and summary.rows == 5
+    text = format_upload_confirmation("apps.csv", summary, preview)
+    print(text)
+    assert text.startswith("📎 *`apps.csv`: 20 segments from 5 rows*")
+    assert "... and 15 more" in text and "Skipped 1/5 invalid rows" in text
+    print("✅ Upload gated and summarized for confirmation\n")
+
+
+if __name__ == "__main__":
+    test_csv_upload()
+    test_tsv_upload_is_lazy()
+    test_valid_upload_has_no_report()
+    test_upload_gate_and_confirmation()
+    print("🎉 All upload tests passed!")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Test the campaign watcher: conditional requests, alerts only on transitions, one poller"""
+
+import json
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import appgrowth
+import shared_state
+from campaign_watch import CampaignWatcher
+from circuit_breaker import CircuitBreaker
+
+
+def setup_module():
+    """Own state dir for this module; STATE_DIR and BASE are restored by teardown_module"""
+    global _saved
+    _saved = shared_state.STATE_DIR, appgrowth.BASE
+    shared_state.STATE_DIR = tempfile.mkdtemp(prefix="appgrowth-campaigns-")
+
+
+def teardown_module():
+    shutil.rmtree(shared_state.STATE_DIR, ignore_errors=True)
+    shared_state.STATE_DIR, appgrowth.BASE = _saved
+
+
+class CampaignStub(BaseHTTPRequestHandler):
+    campaigns = {}
+    not_modified = 0
+    full = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        campaign_id = self.path.rsplit("/", 1)[1]
+        camp = self.campaigns[campaign_id]
+        etag = f'"{campaign_id}-{camp["status"]}-{camp["out_of_budget"]}"'
+        if self.headers.get("If-None-Match") == etag:
+            CampaignStub.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        CampaignStub.full += 1
+        data = {"campaigns": [dict(camp, id=campaign_id)]}
+        body = f"<script>window.__DATA__ = {json.dumps(data)};</script>".encode()
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeSlack:
+    def __init__(self):
+        self.posts = []
+
+    def chat_postMessage(self, channel, text):
+        self.posts.append(text)
+
+
+def test_alerts_on_transitions_only():
+    CampaignStub.campaigns = {str(i): {"title": f"Camp {i}", "status": "active", "out_of_budget": False} for i in range(20)}
+    CampaignStub.campaigns["7"]["out_of_budget"] = True
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CampaignStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    appgrowth.BASE = f"http://127.0.0.1:{server.server_address[1]}"
+    slack = FakeSlack()
+    watcher = CampaignWatcher(slack, "C1", list(CampaignStub.campaigns), ensure_login=lambda: True)
+    try:
+        alerts, errors = watcher.poll_once()
+        assert errors == 0
+        assert alerts == ["💸 Campaign *Camp 7* (#7) is out of budget"]
+
+        alerts, _ = watcher.poll_once()
+        assert alerts == []
+        assert CampaignStub.not_modified == 20 and CampaignStub.full == 20
+
+        CampaignStub.campaigns["3"]["out_of_budget"] = True
+        CampaignStub.campaigns["7"]["out_of_budget"] = False
+        CampaignStub.campaigns["9"]["status"] = "paused"
+        alerts, _ = watcher.poll_once()
+        print("\n".join(alerts))
+        assert sorted(alerts) == sorted([
+            "💸 Campaign *Camp 3* (#3) is out of budget",
+            "✅ Campaign *Camp 7* (#7) has budget again",
+            "🔄 Campaign *Camp 9* (#9): status `active` → `paused`",
+        ])
+        assert CampaignStub.full == 23
+        assert len(slack.posts) == 4
+    finally:
+        server.shutdown()
+    print("✅ Alerts only on transitions, unchanged pages answered 304\n")
+
+
+def test_one_poller_per_cycle():
+    first = CampaignWatcher(FakeSlack(), "C1", [], ensure_login=lambda: True)
+    second = CampaignWatcher(FakeSlack(), "C1", [], ensure_login=lambda: True)
+    second.owner = "other-worker"
+    assert first.claim_cycle()
+    assert not second.claim_cycle()
+    assert first.claim_cycle()
+    first.release_cycle()
+    assert second.claim_cycle()
+    second.release_cycle()
+    print("✅ One worker polls per cycle\n")
+
+
+def test_open_breaker_releases_lease():
+    """A worker whose breaker is open hands the poll over instead of holding the lease until it expires"""
+    first = CampaignWatcher(FakeSlack(), "C1", [], ensure_login=lambda: True)
+    second = CampaignWatcher(FakeSlack(), "C1", [], ensure_login=lambda: True)
+    first.owner, second.owner = "breaker-open-worker", "healthy-worker"
+    assert first.run_cycle()
+    assert not second.run_cycle()
+
+    tripped = CircuitBreaker("test-open", min_calls=1)
+    tripped.record_failure(reason="server error 503")
+    saved = appgrowth.BREAKER
+    appgrowth.BREAKER = tripped
+    try:
+        assert not first.run_cycle()
+    finally:
+        appgrowth.BREAKER = saved
+    assert second.run_cycle()
+    assert not first.claim_cycle()
+    print("✅ Open breaker releases the poll lease\n")
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_alerts_on_transitions_only()
+    test_one_poller_per_cycle()
+    test_open_breaker_releases_lease()
+    teardown_module()
+    print("🎉 All campaign watch tests passed!")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Test recording AppGrowth exchanges into a cassette (secrets scrubbed) and replaying them offline"""
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import appgrowth
+import cassette
+
+PAGE = ('<table id="segments-table"><thead></thead><tbody>'
+        + "".join(f"<tr><td>{i}</td>{'<td>x</td>' * 13}</tr>" for i in range(1, 51))
+        + "</tbody></table>").encode()
+AUTH_FORM = b'<form><input type="hidden" name="csrf_token" value="live-token-123"></form>'
+
+
+class AppGrowthStub(BaseHTTPRequestHandler):
+    latency = 0.05
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b"", headers=None):
+        time.sleep(self.latency)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/auth"):
+            self._reply(200, AUTH_FORM, {"Set-Cookie": "session=live-session-cookie; Path=/; HttpOnly"})
+        elif self.path.startswith("/segments/"):
+            self._reply(200, gzip.compress(PAGE), {"Content-Encoding": "gzip", "Content-Type": "text/html"})
+        else:
+            self._reply(404)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply(302, headers={"Location": "/segments/"})
+
+
+def record(path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AppGrowthStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    session = requests.Session()
+    session.mount("http://", cassette.RecordingAdapter(path, secrets=["bot@example.com", "hunter22"]))
+    try:
+        session.get(f"{base}/auth/")
+        session.post(f"{base}/auth/", data={"csrf_token": "live-token-123", "username": "bot@example.com",
+                                            "password": "hunter22", "remember": "y"}, allow_redirects=False)
+        with session.get(f"{base}/segments/", stream=True) as r:
+            assert b"".join(r.iter_content(1024)) == PAGE
+    finally:
+        server.shutdown()
+
+
+def test_recording_scrubs_secrets():
+    path = os.path.join(tempfile.mkdtemp(prefix="cassette-"), "rec.jsonl")
+    record(path)
+    with open(path) as f:
+        raw = f.read()
+    for secret in ("live-token-123", "live-session-cookie", "bot@example.com", "hunter22"):
+        assert secret not in raw, secret
+    entries = cassette.load_cassette(path)
+    assert [(e["method"], e["url"], e["status"]) for e in entries] == [
+        ("GET", "/auth/", 200), ("POST", "/auth/", 302), ("GET", "/segments/", 200),
+    ]
+    listing = entries[2]
+    assert listing["body"] == PAGE.decode() and listing["content_encoding"] == "gzip"
+    assert 0 < listing["wire_bytes"] < len(PAGE) and "Content-Encoding" not in listing["headers"]
+    assert entries[0]["headers"]["Set-Cookie"].startswith("session=scrubbed")
+    assert all(e["duration"] >= AppGrowthStub.latency for e in entries)
+    print(f"Recorded: {json.dumps(entries[1]['request'])}")
+    print("✅ Cassette recorded with secrets scrubbed\n")
+
+
+def test_appgrowth_runs_on_replay():
+    """Login and the streamed listing work offline against a recorded cassette, at scaled latency"""
+    path = os.path.join(tempfile.mkdtemp(prefix="cassette-"), "rec.jsonl")
+    record(path)
+    entries = cassette.load_cassette(path)
+
+    adapter = cassette.ReplayAdapter(entries, speed=0)
+    account = appgrowth.AppGrowthAccount("bot@example.com", "hunter22")
+    account.session.mount("http://", adapter)
+    saved = appgrowth.BASE, appgrowth.SESSION, appgrowth.LISTING_PAGINATION
+    appgrowth.BASE = "http://appgrowth.invalid"
+    appgrowth.SESSION, appgrowth.LISTING_PAGINATION = account.session, "off"
+    try:
+        assert account.login(max_attempts=1)
+        rows = list(appgrowth.iter_segments())
+        # Requests that were never recorded fail like a dead network
+        try:
+            account.session.get(f"{appgrowth.BASE}/campaigns/7")
+            raise AssertionError("unrecorded request answered")
+        except requests.ConnectionError:
+            pass
+    finally:
+        appgrowth.BASE, appgrowth.SESSION, appgrowth.LISTING_PAGINATION = saved
+    assert [row["id"] for row in rows] == list(range(1, 51))
+
+    slow = cassette.ReplayAdapter(entries, speed=2)
+    session = requests.Session()
+    session.mount("http://", slow)
+    started = time.perf_counter()
+    session.get("http://appgrowth.invalid/auth/")
+    session.get("http://appgrowth.invalid/auth/")  # wraps around to the same recording
+    assert time.perf_counter() - started >= 4 * AppGrowthStub.latency
+    print(f"Replayed {len(rows)} listing rows, stats: {cassette.stats(entries)}")
+    print("✅ Replay serves recorded exchanges\n")
+
+
+if __name__ == "__main__":
+    test_recording_scrubs_secrets()
+    test_appgrowth_runs_on_replay()
+    print("🎉 All cassette tests passed!")
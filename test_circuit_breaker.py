@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Test the AppGrowth circuit breaker state machine"""
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock):
+    return CircuitBreaker("test", window=10, min_calls=4, failure_rate=0.5,
+                          slow_call_seconds=5, slow_rate=0.75, open_seconds=30, clock=clock)
+
+
+def test_opens_on_error_rate():
+    """Half of the window failing opens the circuit; calls then fail fast"""
+    clock = Clock()
+    breaker = make_breaker(clock)
+    for failed in (False, True, False, True):
+        assert breaker.allow()
+        breaker.record_failure(reason="timeout") if failed else breaker.record_success()
+    assert breaker.state == OPEN
+    try:
+        breaker.before_call()
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError as e:
+        assert 29 < e.retry_in <= 30
+    print("✅ Opens on error rate\n")
+
+
+def test_opens_on_latency():
+    clock = Clock()
+    breaker = make_breaker(clock)
+    for elapsed in (6, 7, 1, 9):
+        breaker.record_success(elapsed)
+    assert breaker.state == OPEN
+    assert "slower" in breaker.last_reason
+    print("✅ Opens on slow calls\n")
+
+
+def test_half_open_probe():
+    """One probe after the open period; failure doubles the wait, success closes"""
+    clock = Clock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.now = 31
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_failure(reason="probe failed")
+    assert breaker.state == OPEN
+    assert 59 < breaker.retry_in() <= 60
+
+    clock.now = 92
+    assert breaker.allow()
+    breaker.record_success(0.2)
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+    print("✅ Half-open probe\n")
+
+
+if __name__ == "__main__":
+    test_opens_on_error_rate()
+    test_opens_on_latency()
+    test_half_open_probe()
+    print("🎉 All circuit breaker tests passed!")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Test the memory/thread introspection used by the /admin endpoint"""
+
+import threading
+import tracemalloc
+
+from introspection import MemoryWatch, rss_bytes, thread_summary
+
+_leak = []
+
+
+def test_thread_summary():
+    stop = threading.Event()
+    threads = [threading.Thread(target=stop.wait, name=f"Thread-{100 + i}", daemon=True) for i in range(3)]
+    for t in threads:
+        t.start()
+    try:
+        summary = thread_summary()
+    finally:
+        stop.set()
+    print(f"Threads: {summary}")
+    assert summary["by_name"]["Thread"] >= 3
+    assert summary["daemon"] >= 3
+    print("✅ Thread summary\n")
+
+
+def test_growth_between_snapshots():
+    """An allocation site that keeps growing shows up at the top of the diff"""
+    watch = MemoryWatch(frames=1)
+    started_here = not tracemalloc.is_tracing()
+    tracemalloc.start(1)
+    try:
+        watch.take_snapshot()
+        _leak.extend(bytearray(1024) for _ in range(2000))
+        watch.take_snapshot()
+        report = watch.report()
+    finally:
+        _leak.clear()
+        if started_here:
+            tracemalloc.stop()
+    print(f"Top growth: {report['top_growth'][:3]}")
+    assert report["top_growth"][0]["site"].startswith("test_introspection.py")
+    assert report["top_growth"][0]["size_diff_kib"] >= 2000
+    assert len(report["rss_history_mib"]) == 2
+    assert rss_bytes() > 0
+    print("✅ Growth between snapshots\n")
+
+
+if __name__ == "__main__":
+    test_thread_summary()
+    test_growth_between_snapshots()
+    print("🎉 All introspection tests passed!")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Test the known-apps cache used to reject typo'd bundle IDs in the modal"""
+
+import shutil
+import tempfile
+
+import appgrowth
+import shared_state
+from campaign_watch import CampaignWatcher
+from known_apps import KnownApps, row_apps
+
+
+def setup_module():
+    """Own state dir for this module; restored by teardown_module"""
+    global _saved
+    _saved = shared_state.STATE_DIR
+    shared_state.STATE_DIR = tempfile.mkdtemp(prefix="appgrowth-apps-")
+
+
+def teardown_module():
+    shutil.rmtree(shared_state.STATE_DIR, ignore_errors=True)
+    shared_state.STATE_DIR = _saved
+
+
+def test_apps_from_segment_options():
+    with open("segments.html", encoding="utf-8") as f:
+        rows = appgrowth.parse_segments(f.read())
+    apps = set()
+    for row in rows:
+        apps.update(row_apps(row))
+    # Tags count both as written and as the bare store id
+    assert apps == {"1523297725_iOS", "1523297725"}
+    assert set(row_apps({"name": "bloom_com.typo_USA_7d", "options": {"app": "com.easybrain.sudoku"}})) == {"com.easybrain.sudoku"}
+    print("✅ Apps read from app/tag options\n")
+
+
+def test_unknown_ids_after_load():
+    known = KnownApps()
+    assert known.unknown(["com.anything"]) == []  # nothing to compare against yet
+
+    rows = [{"options": {"app": f"com.example.app{i}"}} for i in range(1000)]
+    passed = list(known.collect(iter(rows)))
+    assert passed == rows and known.loaded and len(known) == 1000
+    assert "com.example.app7" in known
+    assert known.unknown(["com.example.app7", "com.exmaple.app7", "com.example.app1000"]) == [
+        "com.exmaple.app7", "com.example.app1000",
+    ]
+    known.add("com.example.app1000")
+    assert known.unknown(["com.example.app1000"]) == []
+    print("✅ Unknown IDs reported after the first load\n")
+
+
+def test_failed_refresh_keeps_previous_set():
+    known = KnownApps()
+    list(known.collect(iter([{"options": {"app": "com.kept.app"}}])))
+
+    def broken_listing():
+        yield {"options": {"app": "com.partial.app"}}
+        raise ValueError("segments table not found")
+
+    try:
+        list(known.collect(broken_listing()))
+    except ValueError:
+        pass
+    assert "com.kept.app" in known and "com.partial.app" not in known
+    print("✅ A failed listing keeps the previous set\n")
+
+
+def test_campaign_apps_included():
+    watcher = CampaignWatcher(client=None, channel="C1", campaign_ids=[], ensure_login=lambda: True)
+    info = {"title": "Sudoku US", "status": "active", "out_of_budget": False, "app": "com.easybrain.sudoku"}
+    watcher._save("42", info, None, None, changed=True)
+    known = KnownApps()
+    list(known.collect(iter([{"options": {"tag": "1523297725_iOS"}}])))
+    assert "com.easybrain.sudoku" in known and "1523297725_iOS" in known
+    print("✅ Campaign apps are known too\n")
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_apps_from_segment_options()
+    test_unknown_ids_after_load()
+    test_failed_refresh_keeps_previous_set()
+    test_campaign_apps_included()
+    teardown_module()
+    print("🎉 All known apps tests passed!")
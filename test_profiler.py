@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test the sampling profiler: busy and waiting threads land in the right profile"""
+
+import os
+import tempfile
+import threading
+import time
+
+from profiler import Profile, ProfileBusyError, record_profile
+
+
+def busy(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def waiting(stop):
+    stop.wait()
+
+
+def test_cpu_and_wall():
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=busy, args=(stop,), name="busy"),
+        threading.Thread(target=waiting, args=(stop,), name="waiting"),
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)  # let the waiting thread finish starting up: that CPU isn't waiting
+    try:
+        profile = Profile(interval=0.005).run(0.5)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    wall_threads = {stack.split(";", 1)[0] for stack in profile.wall}
+    cpu_threads = {stack.split(";", 1)[0] for stack in profile.cpu}
+    print(f"{profile.samples} samples, wall threads {wall_threads}, cpu threads {cpu_threads}")
+    assert {"busy", "waiting"} <= wall_threads
+    assert "waiting" not in cpu_threads
+    assert any("test_profiler:busy" in stack for stack in profile.cpu)
+    assert profile.overhead < profile.elapsed * 0.5
+    print(profile.summary())
+    print("✅ CPU and wall profiles\n")
+
+
+def test_folded_output():
+    stop = threading.Event()
+    waiter = threading.Thread(target=waiting, args=(stop,), name="waiting")
+    waiter.start()
+    try:
+        profile = Profile(interval=0.005).run(0.05)
+    finally:
+        stop.set()
+        waiter.join()
+    path = profile.write_folded(os.path.join(tempfile.mkdtemp(), "profile.folded"))
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.startswith("waiting;") and line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    print("✅ Folded output\n")
+
+
+def test_one_profile_at_a_time():
+    stop = threading.Event()
+    runner = threading.Thread(target=record_profile, args=(5,), kwargs={"stop": stop})
+    runner.start()
+    time.sleep(0.05)
+    try:
+        record_profile(1)
+        assert False, "second profile started"
+    except ProfileBusyError:
+        pass
+    finally:
+        stop.set()
+        runner.join()
+    print("✅ One profile at a time\n")
+
+
+if __name__ == "__main__":
+    test_cpu_and_wall()
+    test_folded_output()
+    test_one_profile_at_a_time()
+    print("🎉 All profiler tests passed!")
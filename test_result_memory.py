@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of a job does not grow with its size.
+
+Runs the whole lifecycle of a job — streamed plan into the queue, every
+task leased and completed, Slack summary, full results spilled to CSV —
+under tracemalloc. Run directly for the full table (up to 62,500 segments).
+"""
+
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import batch
+import shared_state
+from countries import ALL_VALID_COUNTRY_CODES
+from results import results_path, spill_results
+from segment_plan import SEGMENT_TYPE_VALUES, iter_segment_plan
+from task_queue import SQLiteTaskQueue
+
+
+def setup_module():
+    """Own state dir for this module; restored by teardown_module"""
+    global _saved
+    _saved = shared_state.STATE_DIR
+    shared_state.STATE_DIR = tempfile.mkdtemp(prefix="appgrowth-results-")
+
+
+def teardown_module():
+    shutil.rmtree(shared_state.STATE_DIR, ignore_errors=True)
+    shared_state.STATE_DIR = _saved
+
+
+def run_job(n_apps):
+    """Returns (segments, peak traced bytes, seconds)"""
+    queue = SQLiteTaskQueue("bench_results")
+    apps = [f"com.bench.app{i}" for i in range(n_apps)]
+    countries = sorted(ALL_VALID_COUNTRY_CODES)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    job_id = queue.create_job("C1", "U1", iter_segment_plan(apps, countries, SEGMENT_TYPE_VALUES))
+    queue.finish_loading(job_id)
+    job = None
+    while (task := queue.lease("w1")) is not None:
+        job, _ = queue.complete(task, "w1", task.id % 7 != 0, None if task.id % 7 else "server error")
+    summary = batch.format_job_summary(queue, job)
+    spill_results(queue, job)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert "📄 Full list" in summary
+    with open(results_path(job_id)) as f:
+        assert sum(1 for _ in f) == job["total"] + 1
+    assert queue.task_counts(job_id) == {}
+    return job["total"], peak, time.perf_counter() - started
+
+
+def test_peak_memory_is_constant():
+    small_total, small_peak, _ = run_job(1)
+    large_total, large_peak, _ = run_job(4)
+    print(f"{small_total} segments: {small_peak / 1024:.0f} KiB, {large_total}: {large_peak / 1024:.0f} KiB")
+    assert large_total == 4 * small_total
+    # 4x the segments, same peak (allowing for allocator noise)
+    assert large_peak < small_peak * 1.5 + 64 * 1024
+    print("✅ Peak memory independent of job size\n")
+
+
+if __name__ == "__main__":
+    setup_module()
+    print(f"{'segments':>10} {'peak KiB':>10} {'seconds':>8}")
+    for n_apps in (1, 4, 10, 50):
+        total, peak, seconds = run_job(n_apps)
+        print(f"{total:>10} {peak / 1024:>10.0f} {seconds:>8.1f}")
+    test_peak_memory_is_constant()
+    teardown_module()
+    print("🎉 Result memory benchmark passed!")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Test segments listing parser and the cached segment-name index"""
+
+import time
+
+from appgrowth import parse_segments
+from segment_catalog import SegmentCatalog
+from segment_plan import generate_segment_name, iter_segment_plan
+
+
+def test_parse_segments_listing():
+    """Parse the saved /segments/ snapshot (truncated mid-row on purpose)"""
+    with open("segments.html", encoding="utf-8") as f:
+        rows = parse_segments(f.read())
+
+    print(f"Parsed rows: {[row['id'] for row in rows]}")
+    assert [row["id"] for row in rows] == [14220, 14221, 12614], "Unexpected rows"
+    assert rows[0]["name"] == "1523297725_iOS_CPA(131)_abdoul_V4_100k"
+    assert rows[0]["type"] == "AbdoulSegment"
+    assert rows[0]["options"]["country"] == "USA"
+    assert rows[0]["options"]["tag"] == "1523297725_iOS"
+    assert rows[2]["options"]["flavor"] == "uid"
+    print("✅ Listing parsed")
+
+
+def test_count_existing():
+    """Existing-duplicate estimate matches a brute-force check over planned names"""
+    bundle_ids = ["com.easybrain.sudoku", "com.easybrain.nonogram"]
+    countries = ["USA", "GBR", "DEU"]
+    segment_types = ["RetainedAtLeast_7", "ActiveUsers_0.95"]
+
+    catalog = SegmentCatalog()
+    catalog.load_rows([
+        {"name": "bloom_com.easybrain.sudoku_USA_7d"},
+        {"name": "bloom_com.easybrain.sudoku_USA_95"},
+        {"name": "bloom_com.easybrain.sudoku_FRA_95"},  # country not planned
+        {"name": "bloom_com.easybrain.nonogram_GBR_80"},  # type not planned
+        {"name": "1523297725_iOS_CPA(131)_abdoul_V4_100k"},  # not a bot segment
+    ])
+    catalog.add("bloom_com.easybrain.nonogram_DEU_7d")
+
+    planned = [name for *_, name in iter_segment_plan(bundle_ids, countries, segment_types)]
+    expected = sum(1 for name in planned if catalog.contains(name))
+    existing = catalog.count_existing(bundle_ids, countries, segment_types)
+    print(f"Existing: {existing} (brute force: {expected}) of {len(planned)} planned")
+    assert existing == expected == 3, "Existing count mismatch"
+    print("✅ Existing count matches")
+
+
+def test_count_existing_large_plan():
+    """Preview stays fast for thousands of apps × all countries"""
+    bundle_ids = [f"com.example.app{i}" for i in range(5000)]
+    countries = ["USA", "GBR", "DEU", "FRA", "ITA", "ESP", "JPN", "KOR", "CAN", "AUS"]
+    segment_types = ["RetainedAtLeast_1", "RetainedAtLeast_7", "RetainedAtLeast_30", "ActiveUsers_0.80", "ActiveUsers_0.95"]
+
+    catalog = SegmentCatalog()
+    catalog.load_rows({"name": f"bloom_com.example.app{i}_USA_7d"} for i in range(0, 5000, 2))
+
+    started = time.time()
+    existing = catalog.count_existing(bundle_ids, countries, segment_types)
+    elapsed = time.time() - started
+    print(f"Existing: {existing} of {len(bundle_ids) * len(countries) * len(segment_types)} in {elapsed * 1000:.1f}ms")
+    assert existing == 2500
+    assert elapsed < 0.3, "Preview too slow"
+    print("✅ Large plan counted quickly")
+
+
+def bot_row(app_id, country, seg_type, value, name=None):
+    options = {"app": app_id, "country": country, "flavor": "uid"}
+    options["age" if seg_type == "RetainedAtLeast" else "audience"] = str(value)
+    return {"name": name or generate_segment_name(app_id, country, seg_type, value), "type": seg_type, "options": options}
+
+
+def test_diff_plan():
+    """New / already exists / name exists with other options"""
+    catalog = SegmentCatalog()
+    catalog.load_rows([
+        bot_row("com.easybrain.sudoku", "USA", "RetainedAtLeast", 7),
+        bot_row("com.easybrain.sudoku", "GBR", "ActiveUsers", "0.80", name="bloom_com.easybrain.sudoku_GBR_95"),
+        {"name": "bloom_com.easybrain.sudoku_DEU_7d"},  # no options: counted as existing
+    ])
+    diff = catalog.diff_plan(["com.easybrain.sudoku", "com.easybrain.nonogram"], ["usa", "GBR", "DEU"],
+                             ["RetainedAtLeast_7", "ActiveUsers_0.95"])
+    print(diff.format())
+    assert (diff.total, diff.new, diff.existing, diff.conflicts) == (12, 9, 2, 1)
+    assert diff.new_by_app == {"com.easybrain.sudoku": 3, "com.easybrain.nonogram": 6}
+    assert diff.conflict_samples == [("bloom_com.easybrain.sudoku_GBR_95", "value 0.80 (planned 0.95)")]
+    print("✅ Plan diff")
+
+
+def test_diff_plan_100k():
+    """A 100k-segment plan diffs in well under a second"""
+    bundle_ids = [f"com.example.app{i}" for i in range(400)]
+    countries = [f"C{i:02d}" for i in range(50)]
+    segment_types = ["RetainedAtLeast_1", "RetainedAtLeast_7", "RetainedAtLeast_30", "ActiveUsers_0.80", "ActiveUsers_0.95"]
+
+    catalog = SegmentCatalog()
+    catalog.load_rows(bot_row(app_id, country, "RetainedAtLeast", 7) for app_id in bundle_ids[::2] for country in countries)
+
+    started = time.perf_counter()
+    diff = catalog.diff_plan(bundle_ids, countries, segment_types)
+    elapsed = time.perf_counter() - started
+    print(f"{diff.total} planned: {diff.new} new, {diff.existing} existing in {elapsed * 1000:.0f}ms")
+    assert diff.total == 100000 and diff.existing == 10000 and diff.conflicts == 0
+    assert elapsed < 0.5, "Plan diff too slow"
+    print("✅ 100k plan diffed quickly")
+
+
+if __name__ == "__main__":
+    test_parse_segments_listing()
+    test_count_existing()
+    test_count_existing_large_plan()
+    test_diff_plan()
+    test_diff_plan_100k()
+    print("\n🎉 All catalog tests passed!")
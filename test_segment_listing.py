@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Test the /segments/ listing fetch: paging detection, parallel pages, fallback to one response"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import appgrowth
+
+
+def setup_module():
+    """The tests point BASE at a stub and shrink the page size; restored by teardown_module"""
+    global _saved
+    _saved = appgrowth.BASE, appgrowth.LISTING_PAGE_SIZE
+
+
+def teardown_module():
+    appgrowth.BASE, appgrowth.LISTING_PAGE_SIZE = _saved
+    appgrowth._pagination_cache.clear()
+
+
+def row_html(i):
+    cells = [str(i), f"bloom_com.test.app{i}_USA_7d", "t", "RetainedAtLeast", "age: 7<br>country: USA",
+             "0", "0", "2025-01-01", "2025-01-01", "", "0", "$0.00", "$0.00", ""]
+    return "<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>"
+
+
+class ListingStub(BaseHTTPRequestHandler):
+    total = 1000
+    paging = True
+    latency = 0.0
+    fail_page = None
+    requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        ListingStub.requests += 1
+        query = parse_qs(urlparse(self.path).query)
+        ids = range(self.total)
+        if self.paging and "page" in query and "per_page" in query:
+            page, size = int(query["page"][0]), int(query["per_page"][0])
+            if page == self.fail_page:
+                self.send_response(500)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            ids = ids[(page - 1) * size: page * size]
+            time.sleep(self.latency)
+        else:
+            time.sleep(self.latency * 4)
+        body = ('<table id="segments-table"><thead></thead><tbody>'
+                + "".join(row_html(i) for i in ids) + "</tbody></table>").encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(**attrs):
+    handler = type("Stub", (ListingStub,), attrs)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    appgrowth.BASE = f"http://127.0.0.1:{server.server_address[1]}"
+    appgrowth._pagination_cache.clear()
+    return server
+
+
+def test_parallel_pages():
+    appgrowth.LISTING_PAGE_SIZE = 100
+    server = serve(latency=0.2)
+    try:
+        assert appgrowth.listing_page_params() == ("page", "per_page")
+        started = time.time()
+        rows = list(appgrowth.iter_segments())
+        elapsed = time.time() - started
+    finally:
+        server.shutdown()
+    print(f"{len(rows)} rows in {elapsed:.2f}s")
+    assert [row["id"] for row in rows] == list(range(1000))
+    # 11 pages in 3 waves of LISTING_CONCURRENCY instead of one after another (2.2s)
+    assert elapsed < 1.2
+    print("✅ Parallel pages merged in order\n")
+
+
+def test_no_paging_uses_one_response():
+    server = serve(paging=False, total=50)
+    try:
+        rows = list(appgrowth.iter_segments())
+    finally:
+        server.shutdown()
+    assert len(rows) == 50
+    assert appgrowth.listing_page_params() is None
+    print("✅ Server without paging: one response\n")
+
+
+def test_failed_page_falls_back():
+    appgrowth.LISTING_PAGE_SIZE = 100
+    server = serve(fail_page=7)
+    try:
+        rows = list(appgrowth.iter_segments())
+    finally:
+        server.shutdown()
+    assert sorted(row["id"] for row in rows) == list(range(1000))
+    print("✅ Failed page falls back to the full listing without duplicates\n")
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_parallel_pages()
+    test_no_paging_uses_one_response()
+    test_failed_page_falls_back()
+    teardown_module()
+    print("🎉 All listing tests passed!")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Test bulk rebuild/delete/edit: selection from the listing, diffing, bounded parallel run, report"""
+
+import csv
+import shutil
+import tempfile
+import threading
+import time
+
+import appgrowth
+import shared_state
+from appgrowth import AppGrowthAccount, parse_segments
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from segment_ops import BulkReport, EditPlan, SegmentSelector, diff_options, normalize_option, run_bulk, select_segments
+
+
+def setup_module():
+    """Own state dir for this module; restored by teardown_module"""
+    global _saved
+    _saved = shared_state.STATE_DIR
+    shared_state.STATE_DIR = tempfile.mkdtemp(prefix="appgrowth-ops-")
+
+
+def teardown_module():
+    shutil.rmtree(shared_state.STATE_DIR, ignore_errors=True)
+    shared_state.STATE_DIR = _saved
+
+
+def listing_rows():
+    with open("segments.html", encoding="utf-8") as f:
+        return parse_segments(f.read())
+
+
+def fake_rows(n):
+    return [{"id": 1000 + i, "name": f"bloom_com.test.app_C{i:03d}_7d"} for i in range(n)]
+
+
+def test_selector():
+    rows = listing_rows()
+    assert [r["id"] for r in select_segments(SegmentSelector.parse(["*"]), rows)] == [14220, 14221, 12614]
+    usa = SegmentSelector.parse(["*", "country=usa"])
+    assert all(r["options"]["country"] == "USA" for r in select_segments(usa, rows))
+    assert list(select_segments(SegmentSelector.parse(["bloom_*"]), rows)) == []
+    for bad in ([], ["a", "b"], ["*", "size=1"]):
+        try:
+            SegmentSelector.parse(bad)
+            assert False, bad
+        except ValueError:
+            pass
+    print("✅ Selector\n")
+
+
+def test_bounded_parallel_run():
+    """Never more than `concurrency` calls in flight; every row lands in the CSV"""
+    lock = threading.Lock()
+    state = {"now": 0, "max": 0}
+
+    def operation(row):
+        with lock:
+            state["now"] += 1
+            state["max"] = max(state["max"], state["now"])
+        time.sleep(0.01)
+        with lock:
+            state["now"] -= 1
+        return (False, "status 500") if row["id"] % 10 == 0 else (True, "rebuilt")
+
+    report = run_bulk(BulkReport("rebuild"), fake_rows(60), operation, concurrency=4)
+    print(f"Max in flight: {state['max']}, counts: {report.counts}")
+    assert 1 < state["max"] <= 4
+    assert report.counts["done"] == 54 and report.counts["failed"] == 6
+    with open(report.path) as f:
+        assert len(list(csv.reader(f))) == 61
+    assert "Failures" in report.format("rebuilt")
+    print("✅ Bounded parallel run\n")
+
+
+def test_open_circuit_skips_rest():
+    def operation(row):
+        if row["id"] >= 1005:
+            raise CircuitOpenError("appgrowth", 60)
+        return True, "deleted"
+
+    report = run_bulk(BulkReport("delete"), fake_rows(50), operation, concurrency=1)
+    assert report.counts["done"] == 5
+    assert report.counts["skipped"] == 45
+    print("✅ Open circuit skips the rest\n")
+
+
+def test_edit_diff():
+    assert normalize_option("audience", "0.9") == "0.90"
+    assert normalize_option("age", "14") == "14"
+    for key, bad in (("audience", "1.5"), ("audience", "x"), ("age", "0")):
+        try:
+            normalize_option(key, bad)
+            assert False, (key, bad)
+        except ValueError:
+            pass
+    assert diff_options({"audience": "0.9", "flavor": "uid"}, {"audience": "0.90"}) == {}
+    assert diff_options({"flavor": "uid"}, {"flavor": "bmid"}) == {"flavor": ("uid", "bmid")}
+    options = {}
+    selector = SegmentSelector.parse(["*", "country=USA", "flavor=bmid"], options)
+    assert selector.country == "USA" and options == {"flavor": "bmid"}
+    print("✅ Edit diffing\n")
+
+
+def test_edit_plan():
+    """Only segments that differ are submitted; bot names follow the edited value"""
+    rows = listing_rows()
+    plan = EditPlan(rows, {"flavor": "bmid"})
+    assert [r["id"] for r in plan.changes] == [12614]
+    assert plan.changes[0]["diff"] == {"flavor": ("uid", "bmid")}
+    assert plan.changes[0]["new_options"]["segment"] == rows[2]["options"]["segment"]
+    assert [r["id"] for r in plan.unchanged] == [14220, 14221]
+
+    bot = {"id": 1, "name": "bloom_com.test.app_USA_95", "title": "t", "type": "ActiveUsers",
+           "options": {"app": "com.test.app", "country": "USA", "audience": "0.95"}}
+    plan = EditPlan([bot], {"audience": "0.90"})
+    assert plan.changes[0]["new_name"] == "bloom_com.test.app_USA_90"
+    plan = EditPlan([bot], {"age": "14"})
+    assert plan.changes == [] and len(plan.skipped) == 1
+
+    # Renames within one plan must not collide with each other
+    retained = [
+        {"id": i, "name": f"bloom_com.test.app_USA_{days}d", "title": "t", "type": "RetainedAtLeast",
+         "options": {"app": "com.test.app", "country": "USA", "age": str(days)}}
+        for i, days in enumerate((1, 7, 30))
+    ]
+    plan = EditPlan(retained, {"age": "14"})
+    assert [r["new_name"] for r in plan.changes] == ["bloom_com.test.app_USA_14d"]
+    assert [reason for _row, reason in plan.skipped] == [
+        "`bloom_com.test.app_USA_14d` already targeted by `bloom_com.test.app_USA_1d`",
+    ] * 2
+
+    report = BulkReport("edit")
+    EditPlan(rows, {"flavor": "bmid"}).record_untouched(report)
+    assert report.counts["unchanged"] == 2
+    print("✅ Edit plan\n")
+
+
+def test_action_status_checks():
+    """Edit succeeds only on a redirect away from /auth; a re-rendered form (200) is a failure"""
+
+    class Response:
+        def __init__(self, status, location=""):
+            self.status_code, self.headers = status, {"Location": location}
+
+    account = AppGrowthAccount("bot@example.com", "secret")
+    account.get_csrf = lambda force=False: "token"
+    saved = appgrowth.BREAKER
+    appgrowth.BREAKER = CircuitBreaker("test", min_calls=1000)
+    try:
+        for action, status, location, expected in (
+            ("edit", 302, "/segments/", (True, "updated")),
+            ("edit", 200, "", (False, "edit rejected by the form")),
+            ("edit", 302, "/auth/?next=/segments/1/edit", (False, "session expired")),
+            ("delete", 204, "", (True, "deleted")),
+            ("rebuild", 200, "", (True, "rebuilt")),
+        ):
+            account.session.request = lambda *a, **kw: Response(status, location)
+            assert account.segment_action(1, action, {"title": "t"}) == expected, (action, status)
+    finally:
+        appgrowth.BREAKER = saved
+    print("✅ Segment action statuses\n")
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_selector()
+    test_bounded_parallel_run()
+    test_open_circuit_skips_rest()
+    test_edit_diff()
+    test_edit_plan()
+    test_action_status_checks()
+    teardown_module()
+    print("🎉 All segment ops tests passed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Test the columnar segment table behind /appgrowth stats"""
+
+import random
+import time
+
+import appgrowth
+from segment_catalog import SegmentCatalog
+from segment_stats import SegmentTable, format_stats, parse_number
+
+
+def synthetic_rows(n, apps=200, seed=7):
+    rng = random.Random(seed)
+    countries = ("USA", "GBR", "DEU", "FRA", "JPN")
+    types = ("RetainedAtLeast", "ActiveUsers")
+    for i in range(n):
+        app, country = f"com.example.app{rng.randrange(apps)}", rng.choice(countries)
+        yield {
+            "id": i, "name": f"bloom_{app}_{country}_{i}", "type": rng.choice(types),
+            "options": {"app": app, "country": country},
+            "size": str(rng.randrange(100000)), "file_size": "1.5 MB", "installs": f"{rng.randrange(5000):,}",
+            "profit": f"${rng.random() * 500:,.2f}", "profit_per_mb": "$0.10",
+        }
+
+
+def test_parse_number():
+    cases = {"$1,234.50": 1234.5, "12K": 12000, "3 MB": 3 * 2**20, "": 0, "-": 0, "$0.00": 0, "42": 42}
+    for text, expected in cases.items():
+        assert parse_number(text) == expected, (text, parse_number(text))
+    print("✅ Listing numbers parsed\n")
+
+
+def test_listing_page_rows():
+    """Rows of the saved /segments/ page: app from the tag option when the name isn't the bot's"""
+    with open("segments.html", encoding="utf-8") as f:
+        table = SegmentTable.from_rows(appgrowth.parse_segments(f.read()))
+    assert len(table) == 3
+    assert table.labels["app"][:1] == ["1523297725_iOS"]
+    assert format_stats(table, "1523297725_iOS").startswith("📈 *Stats for `1523297725_iOS`*: 2 segments")
+    assert format_stats(table, "com.nothing.here") is None
+    print("✅ Saved listing loaded\n")
+
+
+def test_aggregates_match_row_by_row():
+    rows = list(synthetic_rows(5000))
+    table = SegmentTable.from_rows(rows)
+    mask = table.select("com.example.app1*")
+    expected = {}
+    for row in rows:
+        if row["options"]["app"].startswith("com.example.app1"):
+            profit = expected.setdefault(row["options"]["country"], 0.0)
+            expected[row["options"]["country"]] = profit + parse_number(row["profit"])
+    groups = {label: profit for label, _count, _installs, profit in table.group_by("country", mask)}
+    assert groups.keys() == expected.keys()
+    assert all(abs(groups[c] - expected[c]) < 1e-6 for c in expected)
+    best = max((r for r in rows if r["options"]["app"].startswith("com.example.app1")), key=lambda r: parse_number(r["profit"]))
+    assert table.top(mask, limit=1)[0][0] == best["name"]
+    print("✅ Group-bys and top-N match a row-by-row computation\n")
+
+
+def test_100k_segments_under_a_second():
+    table = SegmentTable.from_rows(synthetic_rows(100_000))
+    for query in ("com.example.app42", "bloom_*_USA_*", "app1"):
+        started = time.perf_counter()
+        text = format_stats(table, query)
+        elapsed = time.perf_counter() - started
+        print(f"   {query}: {elapsed * 1000:.0f} ms")
+        assert text and elapsed < 1.0
+    print("✅ 100k segments report in under a second\n")
+
+
+def test_catalog_refresh_builds_table():
+    catalog = SegmentCatalog()
+    listing = appgrowth.iter_segments
+    appgrowth.iter_segments = lambda: synthetic_rows(50)
+    try:
+        assert catalog.refresh()
+    finally:
+        appgrowth.iter_segments = listing
+    assert len(catalog) == 50 and len(catalog.table) == 50
+    print("✅ One listing scrape fills both the index and the stats table\n")
+
+
+if __name__ == "__main__":
+    test_parse_number()
+    test_listing_page_rows()
+    test_aggregates_match_row_by_row()
+    test_100k_segments_under_a_second()
+    test_catalog_refresh_builds_table()
+    print("🎉 All segment stats tests passed!")
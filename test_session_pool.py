@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Test sharding segment creation across the AppGrowth account pool"""
+
+import threading
+import time
+
+import requests
+
+import appgrowth
+from appgrowth import AppGrowthAccount, SessionPool
+from circuit_breaker import CircuitBreaker
+
+
+def setup_module():
+    """Account failures in these tests must not trip the shared AppGrowth breaker; restored by teardown_module"""
+    global _saved
+    _saved = appgrowth.BREAKER, appgrowth.ACCOUNT_MIN_INTERVAL
+    appgrowth.BREAKER = CircuitBreaker("test", min_calls=1000)
+
+
+def teardown_module():
+    appgrowth.BREAKER, appgrowth.ACCOUNT_MIN_INTERVAL = _saved
+
+
+class FakeAccount(AppGrowthAccount):
+    """Account that never touches the network"""
+
+    def __init__(self, username, login_ok=True, create_ok=True):
+        super().__init__(username, "secret")
+        self.login_ok = login_ok
+        self.create_ok = create_ok
+        self.names = []
+
+    def login(self, max_attempts=3):
+        self.logged_in = self.login_ok
+        if not self.login_ok:
+            self.disabled_until = time.time() + appgrowth.LOGIN_LOCKOUT_SECONDS
+        return self.login_ok
+
+    def create_segment(self, name, title, app, country, value=0.95, seg_type="ActiveUsers"):
+        self.names.append(name)
+        self._record(self.create_ok, None if self.create_ok else "server error 500", server_fault=True)
+        return self.create_ok
+
+
+def test_load_is_sharded():
+    """Concurrent creations spread over every account, one request per account at a time"""
+    appgrowth.ACCOUNT_MIN_INTERVAL = 0.01
+    accounts = [FakeAccount(f"bot{i}") for i in range(3)]
+    pool = SessionPool(accounts)
+    assert pool.login_all()
+
+    def create(i):
+        assert pool.create_segment(name=f"seg{i}", title="t", app="a", country="USA")
+
+    threads = [threading.Thread(target=create, args=(i,)) for i in range(30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    counts = [len(a.names) for a in accounts]
+    print(f"Per account: {counts}")
+    assert sum(counts) == 30
+    assert all(n > 0 for n in counts)
+    print("✅ Load sharded across accounts\n")
+
+
+def test_unhealthy_accounts_leave_rotation():
+    """A locked-out account and a failing account stop receiving work"""
+    appgrowth.ACCOUNT_MIN_INTERVAL = 0.0
+    locked = FakeAccount("locked", login_ok=False)
+    flaky = FakeAccount("flaky", create_ok=False)
+    good = FakeAccount("good")
+    pool = SessionPool([locked, flaky, good])
+    assert pool.login_all()
+
+    results = [pool.create_segment(name=f"seg{i}", title="t", app="a", country="USA") for i in range(12)]
+
+    status = {s["username"]: s for s in pool.status()}
+    print(f"Status: {status}")
+    assert locked.names == []
+    assert len(flaky.names) == appgrowth.MAX_CONSECUTIVE_FAILURES
+    assert not status["flaky"]["healthy"]
+    assert results.count(True) == 12 - appgrowth.MAX_CONSECUTIVE_FAILURES
+    print("✅ Unhealthy accounts skipped\n")
+
+
+def test_locked_account_retried_elsewhere():
+    """An account that cannot log in hands its segment to a healthy account instead of failing it"""
+    appgrowth.ACCOUNT_MIN_INTERVAL = 0.0
+    locked = FakeAccount("locked", login_ok=False)
+    good = FakeAccount("good")
+    pool = SessionPool([locked, good])
+    pool._rr = -1  # the locked account comes first in the rotation
+
+    assert pool.create_segment(name="seg0", title="t", app="a", country="USA")
+    assert locked.names == [] and good.names == ["seg0"] and not locked.healthy
+
+    # Nobody can log in: failure, without waiting for a healthy account
+    pool = SessionPool([FakeAccount("locked1", login_ok=False), FakeAccount("locked2", login_ok=False)])
+    started = time.time()
+    assert pool.create_segment(name="seg1", title="t", app="a", country="USA") is False
+    assert time.time() - started < 1
+    print("✅ Locked account's segment retried on a healthy account\n")
+
+
+def test_pool_spacing_hook():
+    """One account: the off-peak spacing from the batch budget, not ACCOUNT_MIN_INTERVAL, paces it"""
+    appgrowth.ACCOUNT_MIN_INTERVAL = 0.1
+    pool = SessionPool([FakeAccount("solo")])
+    assert pool.login_all()
+
+    def elapsed(n=5):
+        started = time.time()
+        for i in range(n):
+            assert pool.create_segment(name=f"seg{i}", title="t", app="a", country="USA")
+        return time.time() - started
+
+    peak = elapsed()
+    pool.spacing = lambda: 0.02
+    offpeak = elapsed()
+    pool.spacing = lambda: None  # budget without an account interval: the default again
+    assert pool.account_interval() == 0.1
+    print(f"5 calls: {peak:.2f}s default spacing, {offpeak:.2f}s off-peak spacing")
+    assert peak >= 0.35 and offpeak < 0.3
+    print("✅ Per-account spacing follows the budget\n")
+
+
+def _response(status, body=b""):
+    response = requests.Response()
+    response.status_code, response._content = status, body
+    return response
+
+
+class OutageSession(requests.Session):
+    """AppGrowth that serves the login form but answers 503 to the login POST"""
+
+    def get(self, url, **kwargs):
+        return _response(200, b'<form><input name="csrf_token" value="t"></form>')
+
+    def post(self, url, **kwargs):
+        return _response(503)
+
+
+def test_login_outage_keeps_accounts():
+    """A 503 on POST /auth/ is an outage: the breaker counts failures, no account is locked out"""
+    saved = appgrowth.BREAKER, appgrowth.LOGIN_RETRY_BACKOFF
+    appgrowth.BREAKER = CircuitBreaker("test-outage", min_calls=3)
+    appgrowth.LOGIN_RETRY_BACKOFF = 0
+    try:
+        accounts = [AppGrowthAccount(f"outage{i}", "secret") for i in range(2)]
+        for account in accounts:
+            account.session = OutageSession()
+        pool = SessionPool(accounts)
+        assert pool.create_segment(name="seg", title="t", app="a", country="USA") is False
+        assert all(account.healthy for account in accounts), "Outage must not lock accounts out"
+        # Three failed login attempts opened the breaker (a 503 used to count as a success)
+        assert not appgrowth.BREAKER.is_closed and appgrowth.BREAKER.last_reason == "login: login status 503"
+    finally:
+        appgrowth.BREAKER, appgrowth.LOGIN_RETRY_BACKOFF = saved
+    print("✅ Login outage leaves accounts in rotation\n")
+
+
+def test_accounts_spec():
+    accounts = appgrowth._parse_accounts("bot1:pw1\nbot2:p:w2  broken")
+    assert [(a.username, a.password) for a in accounts] == [("bot1", "pw1"), ("bot2", "p:w2")]
+    assert len(appgrowth._parse_accounts("")) == 1
+    print("✅ Accounts spec parsed\n")
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_load_is_sharded()
+    test_unhealthy_accounts_leave_rotation()
+    test_locked_account_retried_elsewhere()
+    test_pool_spacing_hook()
+    test_login_outage_keeps_accounts()
+    test_accounts_spec()
+    teardown_module()
+    print("🎉 All session pool tests passed!")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Test persisting the AppGrowth cookie jar and resuming the session after a restart"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from cryptography.fernet import Fernet
+
+import appgrowth
+import session_store
+import shared_state
+from appgrowth import AppGrowthAccount
+from circuit_breaker import CircuitBreaker
+
+
+def setup_module():
+    """Own state dir, key and breaker for this module; restored by teardown_module"""
+    global _saved
+    _saved = shared_state.STATE_DIR, session_store.SESSION_ENCRYPTION_KEY, appgrowth.BREAKER, appgrowth.BASE
+    shared_state.STATE_DIR = tempfile.mkdtemp(prefix="appgrowth-sessions-")
+    session_store.SESSION_ENCRYPTION_KEY = Fernet.generate_key().decode()
+    appgrowth.BREAKER = CircuitBreaker("test", min_calls=1000)
+
+
+def teardown_module():
+    shutil.rmtree(shared_state.STATE_DIR, ignore_errors=True)
+    shared_state.STATE_DIR, session_store.SESSION_ENCRYPTION_KEY, appgrowth.BREAKER, appgrowth.BASE = _saved
+
+
+class AppGrowthStub(BaseHTTPRequestHandler):
+    """/segments/new answers 200 only with the valid remember cookie, else redirects to /auth"""
+    valid = "remember_token=ok"
+    logins = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/segments/new") and self.valid in self.headers.get("Cookie", ""):
+            body = b'<input name="csrf_token" value="tok123">'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.startswith("/auth"):
+            body = b'<form><input name="csrf_token" value="login-tok"></form>'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_response(302)
+            self.send_header("Location", "/auth/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        AppGrowthStub.logins += 1
+        self.send_response(302)
+        self.send_header("Location", "/")
+        self.send_header("Set-Cookie", "remember_token=ok; Path=/; Max-Age=3600")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AppGrowthStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    appgrowth.BASE = f"http://127.0.0.1:{server.server_address[1]}"
+    return server
+
+
+def test_roundtrip_encrypted():
+    jar = requests.cookies.RequestsCookieJar()
+    jar.set("remember_token", "secret-value", domain="example.com", path="/", expires=time.time() + 3600)
+    jar.set("old", "x", domain="example.com", path="/", expires=time.time() - 1)
+    assert session_store.save_cookies("bot1", jar)
+    with open(session_store._path("bot1"), "rb") as f:
+        raw = f.read()
+    assert b"secret-value" not in raw and b"bot1" not in raw
+    assert oct(os.stat(session_store._path("bot1")).st_mode & 0o777) == "0o600"
+
+    restored = requests.cookies.RequestsCookieJar()
+    assert session_store.load_cookies("bot1", restored)
+    assert restored.get("remember_token") == "secret-value"
+    assert restored.get("old") is None
+    print("✅ Encrypted round trip\n")
+
+
+def test_rotated_key_discards_file():
+    jar = requests.cookies.RequestsCookieJar()
+    jar.set("remember_token", "v", domain="example.com", path="/")
+    session_store.save_cookies("bot2", jar)
+    key = session_store.SESSION_ENCRYPTION_KEY
+    session_store.SESSION_ENCRYPTION_KEY = Fernet.generate_key().decode()
+    try:
+        assert not session_store.load_cookies("bot2", requests.cookies.RequestsCookieJar())
+        assert not os.path.exists(session_store._path("bot2"))
+    finally:
+        session_store.SESSION_ENCRYPTION_KEY = key
+    print("✅ Rotated key discards the saved session\n")
+
+
+def test_resume_after_restart():
+    """The second process start reuses the cookie: no login POST, CSRF already cached"""
+    server = start_stub()
+    try:
+        AppGrowthStub.logins = 0
+        first = AppGrowthAccount("bot3", "pw")
+        assert not first.resume()
+        assert first.login()
+        assert AppGrowthStub.logins == 1
+
+        restarted = AppGrowthAccount("bot3", "pw")
+        assert restarted.resume()
+        assert restarted.logged_in and restarted.csrf == "tok123"
+        assert AppGrowthStub.logins == 1
+
+        AppGrowthStub.valid = "remember_token=rotated-on-server"
+        rejected = AppGrowthAccount("bot3", "pw")
+        assert not rejected.resume()
+        assert not os.path.exists(session_store._path("bot3"))
+    finally:
+        AppGrowthStub.valid = "remember_token=ok"
+        server.shutdown()
+    print("✅ Session resumed after restart\n")
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_roundtrip_encrypted()
+    test_rotated_key_discards_file()
+    test_resume_after_restart()
+    teardown_module()
+    print("🎉 All session store tests passed!")
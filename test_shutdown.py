@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Test graceful shutdown: hooks, checkpoints and restoring them"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import batch
+import shared_state
+import task_queue
+from shutdown import ShutdownCoordinator
+from task_queue import SQLiteTaskQueue
+
+
+def setup_module():
+    """Own state dir and process-wide queue for this module; restored by teardown_module"""
+    global _saved
+    _saved = shared_state.STATE_DIR, task_queue._queue
+    shared_state.STATE_DIR = tempfile.mkdtemp(prefix="appgrowth-shutdown-")
+    task_queue._queue = None
+
+
+def teardown_module():
+    shutil.rmtree(shared_state.STATE_DIR, ignore_errors=True)
+    shared_state.STATE_DIR, task_queue._queue = _saved
+
+
+class FakeClient:
+    def __init__(self):
+        self.messages = []
+
+    def chat_postEphemeral(self, **kwargs):
+        self.messages.append(kwargs["text"])
+
+
+def test_hooks_run_once_with_deadline():
+    coordinator = ShutdownCoordinator()
+    calls = []
+    coordinator.on_shutdown(lambda deadline: calls.append(("drain", deadline)))
+    coordinator.on_shutdown(lambda deadline: 1 / 0)  # a failing hook does not stop the others
+    coordinator.on_shutdown(lambda deadline: calls.append(("report", deadline)))
+    coordinator.shutdown("SIGTERM", budget=5)
+    coordinator.shutdown("SIGTERM", budget=5)
+    assert coordinator.stopping.is_set()
+    assert [name for name, _ in calls] == ["drain", "report"]
+    assert 4 < calls[0][1] - time.monotonic() <= 5
+    print("✅ Hooks run once\n")
+
+
+def test_checkpoint_compact_and_restored():
+    """Remaining work is grouped per app/type and re-queued if the job is missing from the store"""
+    queue = SQLiteTaskQueue("tasks")
+    tasks = [
+        (app, country, "RetainedAtLeast", 7, f"bloom_{app}_{country}_7d")
+        for app in ("com.first", "com.second") for country in ("USA", "GBR", "DEU")
+    ]
+    job_id = queue.create_job("C1", "U1", iter(tasks), scope="📱 Apps: 2")
+    queue.finish_loading(job_id)
+    task = queue.lease("w1")
+    queue.complete(task, "w1", True)
+
+    remaining = batch.write_checkpoint(queue, queue.job(job_id))
+    path = os.path.join(shared_state.STATE_DIR, "checkpoints", f"{job_id}.json")
+    with open(path) as f:
+        checkpoint = json.load(f)
+    assert remaining == 5
+    assert checkpoint["remaining"] == [
+        {"app": "com.first", "seg_type": "RetainedAtLeast", "value": 7, "countries": ["GBR", "DEU"]},
+        {"app": "com.second", "seg_type": "RetainedAtLeast", "value": 7, "countries": ["USA", "GBR", "DEU"]},
+    ]
+
+    # Same job id unknown to a fresh store: the checkpoint becomes a new job
+    checkpoint["job"]["id"] = "lostjob1"
+    os.remove(path)
+    with open(os.path.join(shared_state.STATE_DIR, "checkpoints", "lostjob1.json"), "w") as f:
+        json.dump(checkpoint, f)
+    client = FakeClient()
+    batch.resume_interrupted(client)
+    restored = [job for job in queue.jobs(since=0) if "lostjob1" in job["scope"]]
+    assert len(restored) == 1 and restored[0]["total"] == 5
+    assert os.listdir(os.path.join(shared_state.STATE_DIR, "checkpoints")) == []
+    print("✅ Checkpoint written and restored\n")
+
+
+def test_failed_restore_keeps_checkpoint():
+    """A checkpoint whose restore fails is set aside as .failed instead of being deleted"""
+    directory = os.path.join(shared_state.STATE_DIR, "checkpoints")
+    os.makedirs(directory, exist_ok=True)
+    checkpoint = {
+        "job": {"id": "lostjob2", "channel": "C1", "user": "U1", "scope": "", "total": 1, "created": 0,
+                "failed": 0, "run_at": 0},
+        "written_at": time.time(),
+        "remaining": [{"app": "com.first", "seg_type": "RetainedAtLeast", "value": 7, "countries": ["USA"]}],
+    }
+    with open(os.path.join(directory, "lostjob2.json"), "w") as f:
+        json.dump(checkpoint, f)
+
+    def broken_submit(*args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    saved = batch.submit_segment_batch
+    batch.submit_segment_batch = broken_submit
+    try:
+        batch.resume_interrupted(FakeClient())
+    finally:
+        batch.submit_segment_batch = saved
+    assert os.listdir(directory) == ["lostjob2.json.failed"]
+    with open(os.path.join(directory, "lostjob2.json.failed")) as f:
+        assert json.load(f) == checkpoint
+    os.remove(os.path.join(directory, "lostjob2.json.failed"))
+    print("✅ Failed restore keeps the checkpoint\n")
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_hooks_run_once_with_deadline()
+    test_checkpoint_compact_and_restored()
+    test_failed_restore_keeps_checkpoint()
+    teardown_module()
+    print("🎉 All shutdown tests passed!")
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Test the leased segment task queue (SQLite stand-in)"""
+
+import inspect
+import shutil
+import tempfile
+import threading
+import time
+
+import shared_state
+import task_queue
+from task_queue import SQLiteTaskQueue, TaskQueue
+
+
+def setup_module():
+    """Own state dir for this module; restored by teardown_module"""
+    global _saved
+    _saved = shared_state.STATE_DIR
+    shared_state.STATE_DIR = tempfile.mkdtemp(prefix="appgrowth-queue-")
+
+
+def teardown_module():
+    shutil.rmtree(shared_state.STATE_DIR, ignore_errors=True)
+    shared_state.STATE_DIR = _saved
+
+
+def make_tasks(n, app="com.easybrain.sudoku"):
+    return ((app, f"C{i:02d}", "RetainedAtLeast", 7, f"bloom_{app}_C{i:02d}_7d") for i in range(n))
+
+
+def test_every_task_leased_once():
+    """Concurrent workers never lease the same task and exactly one finishes the job"""
+    queue = SQLiteTaskQueue("test_leases")
+    job_id = queue.create_job("C1", "U1", make_tasks(60))
+    queue.finish_loading(job_id)
+
+    leased, finished = [], []
+    lock = threading.Lock()
+
+    def worker(owner):
+        q = SQLiteTaskQueue("test_leases")
+        while True:
+            task = q.lease(owner)
+            if task is None:
+                return
+            job, done = q.complete(task, owner, ok=task.id % 2 == 0)
+            with lock:
+                leased.append(task.id)
+                if done:
+                    finished.append(job)
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"Leased {len(leased)} tasks, unique {len(set(leased))}, finished calls {len(finished)}")
+    assert len(leased) == len(set(leased)) == 60, "Task leased twice"
+    assert len(finished) == 1, "Job must be finished exactly once"
+    assert finished[0]["created"] + finished[0]["failed"] == 60
+    assert queue.job(job_id)["state"] == task_queue.DONE
+    print("✅ Each task leased once\n")
+
+
+def test_expired_lease_is_reclaimed():
+    """A dead worker's task is picked up by another worker; its late result is ignored"""
+    queue = SQLiteTaskQueue("test_expiry")
+    job_id = queue.create_job("C1", "U1", make_tasks(1))
+    queue.finish_loading(job_id)
+
+    dead = queue.lease("dead-machine", visibility_timeout=0.1)
+    assert queue.lease("alive") is None, "Task leased while lease still valid"
+    time.sleep(0.2)
+    again = queue.lease("alive")
+    print(f"Reclaimed task {again.id} (attempt {again.attempts})")
+    assert again.id == dead.id and again.attempts == 2
+
+    job, done = queue.complete(dead, "dead-machine", ok=True)
+    assert job is None and not done, "Stale owner result must be ignored"
+    job, done = queue.complete(again, "alive", ok=True)
+    assert done and job["created"] == 1
+    print("✅ Expired lease reclaimed\n")
+
+
+def test_last_expiry_finishes_job():
+    """A task that runs out of attempts through expired leases still closes its job, once"""
+    queue = SQLiteTaskQueue("test_expiry_final")
+    job_id = queue.create_job("C1", "U1", make_tasks(1))
+    queue.finish_loading(job_id)
+
+    for attempt in range(task_queue.MAX_ATTEMPTS):
+        assert queue.lease(f"dead{attempt}", visibility_timeout=0.05) is not None
+        time.sleep(0.1)
+    drained = []
+    assert queue.lease("alive", drained=drained) is None
+    assert [job["id"] for job in drained] == [job_id] and drained[0]["failed"] == 1
+    job = queue.job(job_id)
+    assert job["state"] == task_queue.DONE and queue.task_counts(job_id) == {"failed": 1}
+    assert queue.leased_count("dead") == 0, "Failed task must not keep its lease owner"
+    drained = []
+    assert queue.lease("alive", drained=drained) is None and drained == []
+    print("✅ Job closed after the last expired lease\n")
+
+
+def test_round_robin_between_jobs():
+    """Two jobs share workers instead of the first one starving the second"""
+    queue = SQLiteTaskQueue("test_fairness")
+    first = queue.create_job("C1", "U1", make_tasks(10, "com.first.app"))
+    queue.finish_loading(first)
+    second = queue.create_job("C1", "U1", make_tasks(10, "com.second.app"))
+    queue.finish_loading(second)
+
+    order = []
+    for _ in range(6):
+        task = queue.lease("w")
+        order.append(task.job_id)
+        queue.complete(task, "w", ok=True)
+    print(f"Lease order: {order}")
+    assert order.count(first) == order.count(second) == 3
+    print("✅ Jobs interleaved\n")
+
+
+def test_global_rate_slots():
+    """Rate slots are spaced by the interval no matter who reserves them"""
+    queue = SQLiteTaskQueue("test_rate")
+    waits = [queue.reserve_rate_slot("appgrowth", 0.5) for _ in range(4)]
+    print(f"Waits: {[round(w, 2) for w in waits]}")
+    assert waits[0] < 0.05
+    assert all(abs(waits[i] - 0.5 * i) < 0.05 for i in range(4))
+    print("✅ Rate slots spaced\n")
+
+
+def test_park_and_resume():
+    """Parking holds back the whole job without finishing it; unpark_all resumes it"""
+    queue = SQLiteTaskQueue("test_park")
+    job_id = queue.create_job("C1", "U1", make_tasks(5))
+    queue.finish_loading(job_id)
+
+    task = queue.lease("w1")
+    queue.complete(task, "w1", True)
+    task = queue.lease("w1")
+    job, parked, first = queue.park(task, "w1", "AppGrowth unavailable")
+    assert (parked, first) == (4, True)
+    assert job["state"] == task_queue.RUNNING
+    assert queue.lease("w1") is None
+    assert queue.has_parked()
+
+    resumed = queue.unpark_all()
+    assert [(j["id"], n) for j, n in resumed] == [(job_id, 4)]
+    finished = False
+    while (task := queue.lease("w1")) is not None:
+        assert task.attempts == 1  # a parked attempt does not count against MAX_ATTEMPTS
+        job, finished = queue.complete(task, "w1", True)
+    assert finished and job["created"] == 5
+    print("✅ Park and resume\n")
+
+
+def test_pause_and_cancel():
+    """A paused job yields its leases to other jobs; cancel skips what is queued and drains what is leased"""
+    queue = SQLiteTaskQueue("test_control")
+    first = queue.create_job("C1", "U1", make_tasks(4, "com.first"))
+    queue.finish_loading(first)
+    second = queue.create_job("C1", "U2", make_tasks(2, "com.second"))
+    queue.finish_loading(second)
+
+    in_flight = queue.lease("w1")
+    assert in_flight.job_id == first
+    assert queue.pause_job(first, True)["paused"] == 1
+    assert {queue.lease("w2").job_id, queue.lease("w3").job_id} == {second}
+    assert queue.lease("w4") is None
+
+    # The task leased before the pause is handed back at the checkpoint
+    job, finished = queue.checkpoint(in_flight, "w1")
+    assert not finished and queue.task_counts(first) == {task_queue.PENDING: 4}
+
+    assert queue.pause_job(first, False)["paused"] == 0
+    in_flight = queue.lease("w1")
+    assert queue.checkpoint(in_flight, "w1") is None
+    job, finished = queue.cancel_job(first)
+    assert not finished and job["cancelled"] == 1
+    job, finished = queue.complete(in_flight, "w1", True)
+    assert finished and job["created"] == 1
+    assert queue.task_counts(first) == {task_queue.CREATED: 1, task_queue.CANCELLED: 3}
+    assert queue.cancel_job(first) == (None, False)
+    print("✅ Pause and cancel\n")
+
+
+def test_scheduled_job_waits_for_run_at():
+    """No task of a scheduled job is leased before its start; the first lease after it is flagged once"""
+    queue = SQLiteTaskQueue("test_schedule")
+    later = queue.create_job("C1", "U1", make_tasks(2, "com.later"), run_at=time.time() + 0.3)
+    queue.finish_loading(later)
+    now = queue.create_job("C1", "U1", make_tasks(1, "com.now"))
+    queue.finish_loading(now)
+
+    task = queue.lease("w")
+    assert task.job_id == now and not task.starts_job
+    queue.complete(task, "w", ok=True)
+    assert queue.lease("w") is None
+    assert queue.job(later)["started_at"] == 0
+
+    time.sleep(0.35)
+    first, second = queue.lease("w"), queue.lease("w")
+    assert first.job_id == second.job_id == later
+    assert first.starts_job and not second.starts_job
+    assert queue.job(later)["started_at"] > 0
+    print("✅ Scheduled job started on time\n")
+
+
+def test_interface_matches_implementation():
+    """Every TaskQueue method is abstract and SQLiteTaskQueue implements it with the same signature"""
+    try:
+        TaskQueue()
+        raise AssertionError("TaskQueue must not be instantiable")
+    except TypeError:
+        pass
+    for name in TaskQueue.__abstractmethods__:
+        expected = inspect.signature(getattr(TaskQueue, name))
+        assert inspect.signature(getattr(SQLiteTaskQueue, name)) == expected, name
+    assert not SQLiteTaskQueue.__abstractmethods__
+    print(f"✅ {len(TaskQueue.__abstractmethods__)} interface methods implemented\n")
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_every_task_leased_once()
+    test_expired_lease_is_reclaimed()
+    test_last_expiry_finishes_job()
+    test_round_robin_between_jobs()
+    test_global_rate_slots()
+    test_park_and_resume()
+    test_pause_and_cancel()
+    test_scheduled_job_waits_for_run_at()
+    test_interface_matches_implementation()
+    teardown_module()
+    print("🎉 All task queue tests passed!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Test compressed AppGrowth responses and wire vs decoded byte accounting"""
+
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import appgrowth
+import metrics
+
+PAGE = ('<table id="segments-table"><thead></thead><tbody>'
+        + "".join(f"<tr>{'<td>1</td>' * 14}</tr>" for _ in range(200))
+        + "</tbody></table>").encode()
+
+
+class CompressingStub(BaseHTTPRequestHandler):
+    accept_encoding = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        CompressingStub.accept_encoding = self.headers.get("Accept-Encoding", "")
+        body, encoding = PAGE, None
+        if "br" in self.accept_encoding:
+            import brotli
+            body, encoding = brotli.compress(PAGE), "br"
+        elif "gzip" in self.accept_encoding:
+            body, encoding = gzip.compress(PAGE), "gzip"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_compressed_and_counted():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CompressingStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    appgrowth.BASE = base
+    pagination, appgrowth.LISTING_PAGINATION = appgrowth.LISTING_PAGINATION, "off"
+    metrics.TRANSFER.clear()
+    try:
+        session = appgrowth._new_session()
+        r = session.get(f"{base}/segments/14220/edit")
+        assert r.content == PAGE
+        rows = list(appgrowth.iter_segments())
+    finally:
+        appgrowth.LISTING_PAGINATION = pagination
+        server.shutdown()
+
+    assert CompressingStub.accept_encoding == appgrowth.ACCEPT_ENCODING
+    assert len(rows) == 200
+    transfer = metrics.transfer_snapshot()
+    print(f"Accept-Encoding: {appgrowth.ACCEPT_ENCODING}, transfer: {transfer}")
+    edit = transfer["endpoints"]["GET /segments/{id}/edit"]
+    listing = transfer["endpoints"]["GET /segments/"]
+    for counters in (edit, listing):
+        assert counters["responses"] == 1
+        assert counters["decoded_bytes"] == len(PAGE)
+        assert 0 < counters["wire_bytes"] < len(PAGE) / 5
+    assert "identity" not in listing["encodings"]
+    print("✅ Compressed responses decoded and counted\n")
+
+
+if __name__ == "__main__":
+    test_compressed_and_counted()
+    print("🎉 All transfer tests passed!")